@@ -1,27 +1,39 @@
 import streamlit as st
-import ccxt
-import pandas as pd
-import google.generativeai as genai
-import json
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import os
+import uuid
 from datetime import datetime
 import time
 
 # --- PDF LIBRARY ---
 try:
-    from fpdf import FPDF
+    from wave_counter.report import ReportBuilder
 except ImportError:
-    st.error("❌ 'fpdf' library not found! Please add 'fpdf' to your requirements.txt file.")
+    st.error("❌ 'fpdf2' library not found! Please add 'fpdf2' to your requirements.txt file.")
     st.stop()
 
 # --- IMPORT KNOWLEDGE BASE ---
 try:
-    from knowledge import ELLIOTT_KNOWLEDGE
+    from wave_counter.knowledge import ELLIOTT_KNOWLEDGE
 except ImportError:
-    st.error("❌ 'knowledge.py' file not found! Please upload it to GitHub.")
+    st.error("❌ 'wave_counter/knowledge.py' file not found! Please upload it to GitHub.")
     st.stop()
 
+from wave_counter.data import backfill_history, bars_to_df, load_analysis_frames
+from wave_counter.store import CandleStore
+from wave_counter.analysis_cache import AnalysisCache
+from wave_counter.journal import AnalysisJournal
+from wave_counter.jobs import ACTIVE, JobQueue
+from wave_counter.llm import FakeBackend, GeminiBackend, ModelManager
+from wave_counter.fibonacci import fib_confluence
+from wave_counter.levels import sr_levels
+from wave_counter.elliott import PATTERN_WAVES, RULES, current_counts, validate_count
+from wave_counter.pivots import zigzag
+from wave_counter.chart import build_chart
+from wave_counter.analysis import MODEL_NAME, analyze_deep_wave
+from wave_counter.live import LiveMonitor
+from wave_counter.chat import ChatSession
+from wave_counter.trace import METRICS_PATH, TRACER, span
+
 # ==========================================
 # 1. CONFIGURATION
 # ==========================================
@@ -47,18 +59,38 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- API KEY ---
-if "GOOGLE_API_KEY" in st.secrets:
+# WAVE_LLM_BACKEND=fake runs offline against llm.FakeBackend (no key needed).
+LLM_BACKEND = os.environ.get("WAVE_LLM_BACKEND", "gemini")
+if LLM_BACKEND == "fake":
+    API_KEY = None
+elif "GOOGLE_API_KEY" in st.secrets:
     API_KEY = st.secrets["GOOGLE_API_KEY"]
 else:
     API_KEY = st.sidebar.text_input("Enter Google API Key", type="password")
 
-if not API_KEY:
+if not API_KEY and LLM_BACKEND != "fake":
     st.warning("⚠️ API Key Required. Add it to Streamlit Secrets or Sidebar.")
     st.stop()
+st.session_state.api_key = API_KEY  # reused by pages/1_Scanner.py
+
+@st.cache_resource
+def get_model_manager(api_key, backend):
+    """
+    One ModelManager per process and key: each model / system instruction pair
+    is built once (with the knowledge base context-cached server-side when
+    possible) and reused across reruns and sessions.
+    """
+    if backend == "fake":
+        return ModelManager(FakeBackend())
+    return ModelManager(GeminiBackend(api_key))
 
 try:
-    genai.configure(api_key=API_KEY)
-    MODEL_NAME = 'gemini-3-pro-preview' 
+    MODELS = get_model_manager(API_KEY, LLM_BACKEND)
+    PROMPT_MODES = {
+        "⚡ Swing Pivots + Tail": "pivots",
+        "📦 Compact Candles (CSV)": "compact",
+        "🧾 Full Candles (JSON)": "candles",
+    }
 except Exception as e:
     st.error(f"API Configuration Error: {e}")
     st.stop()
@@ -71,207 +103,105 @@ if "ai_data" not in st.session_state: st.session_state.ai_data = None
 if "df_micro" not in st.session_state: st.session_state.df_micro = None
 if "last_update" not in st.session_state: st.session_state.last_update = None
 if "chat_history" not in st.session_state: st.session_state.chat_history = []
+if "chat" not in st.session_state: st.session_state.chat = None
+if "data_source" not in st.session_state: st.session_state.data_source = None
+if "fib" not in st.session_state: st.session_state.fib = None
+if "levels" not in st.session_state: st.session_state.levels = None
+if "live" not in st.session_state: st.session_state.live = None
+if "jobs" not in st.session_state: st.session_state.jobs = {}  # job id -> what to do with its result
+if "session_id" not in st.session_state: st.session_state.session_id = uuid.uuid4().hex[:8]
+
+@st.cache_resource
+def get_candle_store():
+    return CandleStore()
+
+@st.cache_resource
+def get_analysis_cache():
+    return AnalysisCache()
+
+@st.cache_resource
+def get_journal():
+    return AnalysisJournal()
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+@st.cache_resource
+def get_report_builder():
+    return ReportBuilder()
 
 # --- CACHING ADDED FOR SPEED ---
-@st.cache_data(ttl=300) # Data stays in memory for 300 seconds (5 mins)
-def get_crypto_data(symbol, timeframe, limit=1000):
+# In-memory cache on top of the on-disk CandleStore: after the TTL only the
+# candles newer than the last stored one are downloaded.
+@st.cache_data(ttl=300)
+def get_analysis_frames(symbol, micro_tf):
     """
-    Fetches crypto data using multiple exchanges with Caching.
+    Loads 1W/200, 1D/300 and micro/1000 concurrently as one MultiTimeframeBundle.
     """
-    exchanges_to_try = [
-        ccxt.binance(),
-        ccxt.okx(),
-        ccxt.kraken(),
-        ccxt.kucoin()
-    ]
-
-    for exchange in exchanges_to_try:
-        try:
-            exchange.enableRateLimit = True
-            bars = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-            if bars:
-                df = pd.DataFrame(bars, columns=['time', 'open', 'high', 'low', 'close', 'volume'])
-                df['time'] = pd.to_datetime(df['time'], unit='ms')
-                return df
-        except Exception as e:
-            continue
-    return pd.DataFrame()
+    return load_analysis_frames(symbol, micro_tf, store=get_candle_store())
 
-def analyze_deep_wave(symbol, micro_tf, df_1w, df_1d, df_micro, language, previous=None):
-    
-    lang_inst = "Explain in English."
-    if language == "Singlish":
-        lang_inst = "Explain in 'Singlish' (Sinhala mixed with English). Use technical terms freely."
+@st.cache_data(ttl=3600)
+def get_deep_history(symbol, timeframe, exchange_id):
+    """
+    Backfills the full history of one exchange into the candle store and returns it.
+    Gaps found in the stored series are in df.attrs['gaps'].
+    """
+    store = get_candle_store()
+    report = backfill_history(store, exchange_id, symbol, timeframe)
+    df = bars_to_df(store.load(exchange_id, symbol, timeframe), exchange_id)
+    df.attrs['gaps'] = report.gaps
+    return df
 
-    json_1w = df_1w.tail(30).to_json(orient="records", date_format='iso')
-    json_1d = df_1d.tail(60).to_json(orient="records", date_format='iso')
+# --- RENDER HELPERS (shared by the streamed preview and the final page) ---
+def render_macro(macro):
+    st.markdown(f"""
+    <div class='metric-card'>
+        <h3>{macro.get('trend')} - {macro.get('current_structure')}</h3>
+        <p style='color:#bbb;'>{macro.get('detailed_breakdown')}</p>
+        <small>🔑 Key Levels: {macro.get('key_levels')}</small>
+    </div>
+    """, unsafe_allow_html=True)
 
-    cols = ['open', 'high', 'low', 'close', 'volume']
-    micro_subset = df_micro.tail(300).copy()
-    micro_subset[cols] = micro_subset[cols].round(4)
-    json_micro = micro_subset.to_json(orient="records", date_format='iso')
+def render_micro(micro):
+    m1, m2 = st.columns(2)
+    with m1:
+        st.markdown(f"""
+        <div class='deep-analysis-box'>
+            <b>🌊 Current Wave Degree:</b> {micro.get('current_wave_degree')}<br>
+            <b>📍 Status:</b> {micro.get('wave_count_status')}
+        </div>
+        """, unsafe_allow_html=True)
+    with m2:
+        st.markdown(f"""
+        <div class='deep-analysis-box'>
+            <b>📐 Fib Confluence:</b> {micro.get('fib_confluence')}<br>
+            <b>📊 Volume:</b> {micro.get('volume_validation')}
+        </div>
+        """, unsafe_allow_html=True)
 
-    task = "### TASK: DETAILED ELLIOTT WAVE STRUCTURE ANALYSIS"
-    
-    scalp_instruction = ""
-    if micro_tf in ['1m', '3m', '5m']:
-        scalp_instruction = """
-        **⚠️ SCALPING MODE ACTIVE (1m-5m):**
-        - You are provided with 300 candles of micro data.
-        - Analyze the immediate wave structure carefully.
-        - Check for Volume Divergence on the last wave.
-        - Ensure the trade direction aligns with the 1D Swing Trend.
-        """
-
-    prompt = f"""
-    You are a Master Elliott Wave Analyst.
-    {task}
-    
-    ### DATA INPUTS
-    * **1W (Trend Context):** {json_1w}
-    * **1D (Swing Context):** {json_1d}
-    * **MICRO ({micro_tf} - Last 300 Candles):** {json_micro}
-    
-    ### INSTRUCTIONS
-    1.  **Structure:** Analyze the provided 300 candles to determine the exact wave count.
-    2.  **Validations:** Check High/Low relationships, Fibonacci Time cycles, and Volume.
-    3.  **Consistency:** Ensure the Micro count fits into the 1D Swing structure.
-    4.  **rule** Only use elliott wave and support and resistance. also make sure give the datiled scenario in "trade_scenarios"
-    {scalp_instruction}
-    
-    ### LANGUAGE
-    {lang_inst}
-    
-    ### OUTPUT JSON FORMAT (MANDATORY)
-    {{
-        "macro_analysis": {{
-            "trend": "Bullish/Bearish",
-            "current_structure": "Primary Wave Count",
-            "detailed_breakdown": "History of the move.",
-            "key_levels": "Key Support/Res"
-        }},
-        "micro_analysis": {{
-            "timeframe": "{micro_tf}",
-            "current_wave_degree": "Degree (e.g. Sub-Minuette)",
-            "wave_count_status": "Status (e.g. Wave iii extending)",
-            "sub_wave_structure": "Internal structure description.",
-            "fib_confluence": "Fib levels aligned.",
-            "volume_validation": "Volume analysis."
-        }},
-        "trade_scenarios": [
-            {{
-                "name": "Primary Setup",
-                "trade_type": "Long/Short",
-                "probability": "High",
-                "summary": "Reasoning.",
-                "entry_zone": "0.00 - 0.00",
-                "target": 0.00,
-                "invalidation": 0.00,
-                "color": "#00E676"
-            }},
-            {{
-                "name": "Alternative",
-                "trade_type": "Long/Short",
-                "probability": "Low",
-                "summary": "Alt count.",
-                "entry_zone": "0.00 - 0.00",
-                "target": 0.00,
-                "invalidation": 0.00,
-                "color": "#FFAB00"
-            }}
-        ]
-    }}
-    """
-    
-    try:
-        model = genai.GenerativeModel(MODEL_NAME, system_instruction=ELLIOTT_KNOWLEDGE)
-        response = model.generate_content(prompt, generation_config={"temperature": 0.2, "response_mime_type": "application/json"})
-        return json.loads(response.text)
-    except Exception as e:
-        st.error(f"AI Analysis Error: {e}")
-        return None
-
-# --- PDF GENERATOR FUNCTION (FIXED) ---
-def create_pdf(macro, micro, scenarios, symbol, tf):
-    class PDF(FPDF):
-        def header(self):
-            self.set_font('Arial', 'B', 15)
-            self.cell(0, 10, 'Elliott Wave AI - Analysis Report', 0, 1, 'C')
-            self.ln(10)
-            
-    # --- Text Cleaning Helper ---
-    # මෙය මගින් Emojis සහ සිංහල අකුරු ඉවත් කර PDF එක Crash වීම වලක්වයි
-    def clean_text(text):
-        if text:
-            # Latin-1 වලට හරවන්න උත්සාහ කරයි. බැරි අකුරු (Emojis/Sinhala) '?' ලකුණෙන් ආදේශ කරයි.
-            return str(text).encode('latin-1', 'replace').decode('latin-1')
-        return ""
-    
-    pdf = PDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=11)
-    
-    # 1. Header Info
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, clean_text(f"Symbol: {symbol}  |  Timeframe: {tf}"), 0, 1)
-    pdf.cell(0, 10, clean_text(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}"), 0, 1)
-    pdf.line(10, 35, 200, 35)
-    pdf.ln(5)
-    
-    # 2. Macro Analysis
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "1. Macro Trend (1W/1D)", 0, 1)
-    pdf.set_font("Arial", size=10)
-    
-    # Multi-cell භාවිතා කරන විට clean_text අනිවාර්යයි
-    macro_text = (
-        f"Trend: {macro.get('trend')}\n"
-        f"Structure: {macro.get('current_structure')}\n"
-        f"Details: {macro.get('detailed_breakdown')}\n"
-        f"Key Levels: {macro.get('key_levels')}"
-    )
-    pdf.multi_cell(0, 7, clean_text(macro_text))
-    pdf.ln(5)
-    
-    # 3. Micro Analysis
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, clean_text(f"2. Micro Structure ({tf})"), 0, 1)
-    pdf.set_font("Arial", size=10)
-    
-    micro_text = (
-        f"Wave Degree: {micro.get('current_wave_degree')}\n"
-        f"Status: {micro.get('wave_count_status')}\n"
-        f"Structure: {micro.get('sub_wave_structure')}\n"
-        f"Volume: {micro.get('volume_validation')}"
-    )
-    pdf.multi_cell(0, 7, clean_text(micro_text))
-    pdf.ln(5)
-    
-    # 4. Scenarios
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "3. Trade Setups", 0, 1)
-    
-    for s in scenarios:
-        pdf.set_font("Arial", 'B', 10)
-        pdf.set_text_color(0, 0, 139) # Dark Blue
-        pdf.cell(0, 10, clean_text(f"> {s.get('name')} ({s.get('trade_type')})"), 0, 1)
-        pdf.set_text_color(0, 0, 0) # Black
-        pdf.set_font("Arial", size=10)
-        
-        scenario_text = (
-            f"Reasoning: {s.get('summary')}\n"
-            f"Entry: {s.get('entry_zone')}\n"
-            f"Target: {s.get('target')}\n"
-            f"Invalidation: {s.get('invalidation')}"
-        )
-        pdf.multi_cell(0, 7, clean_text(scenario_text))
-        pdf.ln(2)
-        
-    pdf.ln(10)
-    pdf.set_font("Arial", 'I', 8)
-    pdf.cell(0, 10, "Generated by Deep Wave AI. Not financial advice.", 0, 1, 'C')
+    st.info(f"**📝 Sub-Wave Structure:** {micro.get('sub_wave_structure')}")
+
+def render_scenario(s):
+    pattern = str(s.get('pattern', 'impulse')).lower()
+    if pattern not in PATTERN_WAVES:
+        rule_check = "➖ Not checked"
+    else:
+        broken = validate_count(s.get('wave_points') or [], pattern)
+        rule_check = "✅ Passes cardinal rules" if not broken else "❌ " + "; ".join(RULES[r] for r in broken)
+    st.markdown(f"""
+    <div class='scenario-card' style='border-left: 5px solid {s.get('color')};'>
+        <h3>{s.get('name')} ({s.get('trade_type')})</h3>
+        <p>{s.get('summary')}</p>
+        <div style='background:#111; padding:10px; border-radius:5px;'>
+            🔵 Entry: {s.get('entry_zone')}<br>
+            🟢 Target: {s.get('target')}<br>
+            🔴 Invalidation: {s.get('invalidation')}<br>
+            🧮 Rule Check ({pattern}): {rule_check}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
 
-    return pdf.output(dest='S').encode('latin-1', 'replace')
 # ==========================================
 # 3. UI LAYOUT
 # ==========================================
@@ -292,8 +222,19 @@ with st.sidebar:
         index=0 
     )
     
+    stream_output = st.checkbox("📡 Stream Results", value=True)
+    prompt_data = st.selectbox("Prompt Data", list(PROMPT_MODES), index=0)
+    deep_history = st.checkbox("📚 Deep History (full 1W/1D backfill)", value=False)
+    
     run = st.button("🚀 Analyze Structure", type="primary")
     
+    # Live mode: poll new candles, re-run the AI only on a new pivot / invalidation
+    live_mode = st.toggle("🔴 Live Mode", value=False)
+    live_every = st.selectbox("Poll Every", [15, 30, 60, 120], index=1, format_func=lambda s: f"{s}s", disabled=not live_mode)
+    auto_reanalyze = st.checkbox("🤖 Auto Re-Analyze on Trigger", value=True, disabled=not live_mode)
+    cache_stats = get_analysis_cache().stats()
+    st.caption(f"🗄️ Analysis cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['entries']} stored)")
+    
     st.divider()
     
     with st.expander("💬 Chat about Structure", expanded=True):
@@ -308,25 +249,24 @@ with st.sidebar:
                 
                 with st.spinner("AI thinking..."):
                     try:
-                        mod = genai.GenerativeModel(MODEL_NAME)
-                        context_summary = {
-                            "macro": st.session_state.ai_data.get('macro_analysis'),
-                            "micro": st.session_state.ai_data.get('micro_analysis'),
-                            "scenarios": st.session_state.ai_data.get('trade_scenarios')
-                        }
-                        context_str = json.dumps(context_summary)
-                        res = mod.generate_content(f"You are an Elliott Wave expert. Context: {context_str}. User Question: {q}. Language: {lang}")
-                        
-                        st.session_state.chat_history.append({"role": "assistant", "content": res.text})
-                        st.chat_message("assistant").write(res.text)
+                        # One chat session per analysis: context sent once, history token-bounded
+                        if st.session_state.chat is None:
+                            st.session_state.chat = ChatSession(MODELS.get(MODEL_NAME, ELLIOTT_KNOWLEDGE), st.session_state.ai_data)
+                        answer = st.chat_message("assistant").write_stream(st.session_state.chat.ask(q, lang))
+                        st.session_state.chat_history.append({"role": "assistant", "content": answer})
                         
                     except Exception as e:
                         st.error(f"Chat Error: {e}")
+            
+            if st.session_state.chat is not None and st.session_state.chat.stats:
+                last = st.session_state.chat.stats[-1]
+                st.caption(f"⏱️ {last['seconds']}s · ~{last['tokens']} prompt tokens · {len(st.session_state.chat.stats)} turns")
         else:
             st.info("⚠️ Please run an analysis first to enable chat.")
         
         if st.button("Clear Chat"): 
             st.session_state.chat_history = []
+            st.session_state.chat = None
             st.rerun()
 
 # ==========================================
@@ -335,30 +275,173 @@ with st.sidebar:
 
 st.title(f"🌊 {sym} Deep Analysis ({tf})")
 
+# --- BACKGROUND ANALYSES ---
+def submit_analysis(ctx, label, stream=False, refresh=False):
+    """
+    Queues analyze_deep_wave on the frames in ctx; ctx is kept in
+    session_state until the job finishes (see apply_result).
+    refresh=True skips the analysis cache (see analyze_deep_wave).
+    """
+    models, cache, journal = MODELS, get_analysis_cache(), get_journal()
+    mode = PROMPT_MODES[prompt_data]
+    
+    def work(job):
+        return analyze_deep_wave(
+            models, ctx["symbol"], ctx["timeframe"], ctx["d1w"], ctx["d1d"], ctx["dm"], lang,
+            prompt_mode=mode, confluence=ctx["fib"], levels=ctx["levels"], cache=cache, journal=journal,
+            on_section=job.progress if stream else None, refresh=refresh,
+            cancelled=lambda: job.cancelled,
+        )
+    
+    job_id = get_job_queue().submit(work, label=label, session=st.session_state.session_id)
+    st.session_state.jobs[job_id] = {**ctx, "label": label, "status": "queued"}
+    return job_id
+
+def apply_result(ctx, ai):
+    if ctx["kind"] == "live" and st.session_state.live is not None:
+        monitor = st.session_state.live
+        monitor.rebase(monitor.df, ai.get('trade_scenarios'))
+        st.session_state.last_update = f"{datetime.now():%H:%M:%S} (live: {ctx['reason']})"
+    else:
+        st.session_state.df_micro = ctx["dm"]
+        st.session_state.df_1w = ctx["d1w"]
+        st.session_state.df_1d = ctx["d1d"]
+        st.session_state.data_source = ctx["dm"].attrs.get('exchange')
+        st.session_state.live = LiveMonitor(ctx["symbol"], ctx["timeframe"], ctx["dm"], ai.get('trade_scenarios'), store=get_candle_store())
+        st.session_state.last_update = datetime.now().strftime("%H:%M:%S")
+        st.session_state.chat_history = []
+    st.session_state.ai_data = ai
+    st.session_state.fib = ctx["fib"]
+    st.session_state.levels = ctx["levels"]
+    st.session_state.chat = None
+
+def show_preview(sections, timeframe):
+    for key, index, value in sections:
+        if key == "macro_analysis":
+            st.markdown("### 🌍 Macro Structure (1W / 1D)")
+            render_macro(value)
+        elif key == "micro_analysis":
+            st.markdown(f"### 🔬 Micro Wave Analysis ({timeframe})")
+            render_micro(value)
+        elif key == "trade_scenarios" and index is not None:
+            render_scenario(value)
+
 if run:
     with st.spinner(f"📡 Fetching Data for {sym}..."):
-        d1w = get_crypto_data(sym, "1w", 200)
-        d1d = get_crypto_data(sym, "1d", 300)
-        dm = get_crypto_data(sym, tf, 1000) 
+        bundle = get_analysis_frames(sym, tf)
+        d1w, d1d, dm = bundle.weekly.df, bundle.daily.df, bundle.micro.df
         
-        if not dm.empty and not d1w.empty:
-            st.session_state.df_micro = dm
-            st.session_state.df_1w = d1w
-            st.session_state.df_1d = d1d
+        if bundle.ok:
+            if deep_history:
+                with st.spinner("📚 Backfilling 1W/1D history..."):
+                    deep_1w = get_deep_history(sym, "1w", bundle.weekly.exchange)
+                    deep_1d = get_deep_history(sym, "1d", bundle.daily.exchange or bundle.weekly.exchange)
+                if not deep_1w.empty: d1w = deep_1w
+                if not deep_1d.empty: d1d = deep_1d
+                for hist in (deep_1w, deep_1d):
+                    if hist.attrs.get('gaps'):
+                        st.warning(f"⚠️ {len(hist.attrs['gaps'])} gap(s) found in stored history.")
             
-            with st.spinner("🧠 AI Analyzing Elliott Waves (Last 300 Candles)..."):
-                ai = analyze_deep_wave(sym, tf, d1w, d1d, dm, lang)
-                if ai:
-                    st.session_state.ai_data = ai
-                    st.session_state.last_update = datetime.now().strftime("%H:%M:%S")
-                    st.session_state.chat_history = [] 
-                    st.rerun()
-                else:
-                    st.error("❌ AI Analysis Failed. Please try again.")
+            # The analysis runs as a background job; the jobs panel below
+            # polls it and moves the result into session_state.
+            frames = {"1W": d1w, "1D": d1d, tf: dm}
+            submit_analysis(
+                {"kind": "run", "symbol": sym, "timeframe": tf, "dm": dm, "d1w": d1w, "d1d": d1d,
+                 "fib": fib_confluence(frames, tf), "levels": sr_levels(frames, tf)},
+                label=f"{sym} {tf}", stream=stream_output,
+            )
         else:
             st.error(f"❌ Failed to fetch data for {sym}.")
+            for failed_tf, err in bundle.failures().items():
+                st.warning(f"⚠️ {failed_tf}: {err}")
             st.warning("⚠️ All exchanges failed. Please check the symbol and try again.")
 
+# --- LIVE MODE ---
+@st.fragment(run_every=live_every if live_mode else None)
+def live_panel():
+    """
+    Polls new candles into the LiveMonitor. A confirmed pivot or a crossed
+    invalidation triggers a fresh analysis (1W/1D frames are reused).
+    """
+    monitor = st.session_state.live
+    try:
+        monitor.poll()
+    except Exception as e:
+        st.warning(f"⚠️ Live update failed: {e}")
+    st.session_state.df_micro = monitor.df
+    
+    status = monitor.status()
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"🔴 {monitor.symbol} ({monitor.timeframe})", f"{status['close']:g}")
+    c2.metric("Last Confirmed Pivot", status['last_pivot'])
+    c3.metric("Last Candle", f"{status['time']:%H:%M}")
+    if not status['levels'].empty:
+        st.dataframe(status['levels'], hide_index=True, use_container_width=True)
+    for e in reversed(monitor.events[-5:]):
+        st.caption(f"{e['time']:%m-%d %H:%M} · {e['detail']}")
+    
+    if monitor.trigger is None:
+        return
+    if not auto_reanalyze:
+        st.info(f"🔔 {monitor.trigger}. Click Analyze Structure to refresh the count.")
+        return
+    reason, monitor.trigger = monitor.trigger, None
+    d1w, d1d = st.session_state.df_1w, st.session_state.df_1d
+    frames = {"1W": d1w, "1D": d1d, monitor.timeframe: monitor.df}
+    submit_analysis(
+        {"kind": "live", "symbol": monitor.symbol, "timeframe": monitor.timeframe, "dm": monitor.df,
+         "d1w": d1w, "d1d": d1d, "fib": fib_confluence(frames, monitor.timeframe),
+         "levels": sr_levels(frames, monitor.timeframe), "reason": reason},
+        label=f"{monitor.symbol} {monitor.timeframe} (live: {reason})",
+        # The trigger may fire inside the candle window of the analysis it
+        # invalidates; a cache hit would hand back that same analysis.
+        refresh=True,
+    )
+    st.rerun()  # full run, so the jobs panel starts polling
+
+@st.fragment(run_every=1.0 if any(j["status"] in ACTIVE for j in st.session_state.jobs.values()) else None)
+def jobs_panel():
+    """
+    Polls this session's jobs: shows progress (and the streamed sections),
+    copies finished results into session_state, keeps failures until dismissed.
+    """
+    queue = get_job_queue()
+    rows = queue.statuses(st.session_state.jobs)
+    finished = False
+    for job_id, ctx in list(st.session_state.jobs.items()):
+        job = rows.get(job_id)
+        if job is None:  # pruned or from a wiped queue
+            del st.session_state.jobs[job_id]
+            continue
+        finished |= ctx["status"] in ACTIVE and job["status"] not in ACTIVE
+        ctx["status"] = job["status"]
+        if job["status"] == "done":
+            del st.session_state.jobs[job_id]
+            apply_result(ctx, job["result"])
+        elif job["status"] in ACTIVE:
+            with st.container(border=True):
+                c1, c2 = st.columns([5, 1])
+                retry = f" · attempt {job['attempts']}" if job["attempts"] > 1 else ""
+                note = f" · {job['error']}" if job["status"] == "retrying" else ""
+                c1.caption(f"🧠 {ctx['label']} · {job['status']}{retry}{note}")
+                if c2.button("Cancel", key=f"cancel_{job_id}"):
+                    queue.cancel(job_id)
+                show_preview(queue.sections(job_id), ctx["timeframe"])
+        else:
+            c1, c2 = st.columns([5, 1])
+            if job["status"] == "cancelled":
+                c1.info(f"⏹️ {ctx['label']}: cancelled.")
+            else:
+                c1.error(f"AI Analysis Error ({ctx['label']}): {job['error']}")
+            if c2.button("Dismiss", key=f"dismiss_{job_id}"):
+                del st.session_state.jobs[job_id]
+                st.rerun()
+    if finished:
+        st.rerun()
+
+if st.session_state.jobs:
+    jobs_panel()
+
 # --- DISPLAY RESULTS ---
 if st.session_state.ai_data:
     data = st.session_state.ai_data
@@ -368,91 +451,84 @@ if st.session_state.ai_data:
     
     # Update Button
     c1, c2 = st.columns([5,1])
-    c1.caption(f"Last Update: {st.session_state.last_update}")
+    c1.caption(f"Last Update: {st.session_state.last_update}  |  Source: {st.session_state.data_source}")
+    if live_mode and st.session_state.live is not None:
+        live_panel()
     
     # --- PDF DOWNLOAD BUTTON ---
-    try:
-        pdf_bytes = create_pdf(macro, micro, scenarios, sym, tf)
-        c2.download_button(
-            label="📥 Download PDF",
-            data=pdf_bytes,
-            file_name=f"{sym}_{tf}_Analysis.pdf",
-            mime="application/pdf"
-        )
-    except Exception as e:
-        c2.error(f"PDF Error: {e}")
+    # Built only on click (in the report worker pool) and memoized per analysis.
+    df_report = st.session_state.df_micro
+    c2.download_button(
+        label="📥 Download PDF",
+        data=lambda: get_report_builder().get(data, sym, tf, df_report),
+        file_name=f"{sym.replace('/', '_')}_{tf}_Analysis.pdf",
+        mime="application/pdf",
+        on_click="ignore",
+    )
     
     # --- 1. MACRO BREAKDOWN ---
     st.markdown("### 🌍 Macro Structure (1W / 1D)")
-    st.markdown(f"""
-    <div class='metric-card'>
-        <h3>{macro.get('trend')} - {macro.get('current_structure')}</h3>
-        <p style='color:#bbb;'>{macro.get('detailed_breakdown')}</p>
-        <small>🔑 Key Levels: {macro.get('key_levels')}</small>
-    </div>
-    """, unsafe_allow_html=True)
+    render_macro(macro)
     
     # --- 2. MICRO DEEP DIVE ---
     st.markdown(f"### 🔬 Micro Wave Analysis ({tf})")
-    
-    m1, m2 = st.columns(2)
-    with m1:
-        st.markdown(f"""
-        <div class='deep-analysis-box'>
-            <b>🌊 Current Wave Degree:</b> {micro.get('current_wave_degree')}<br>
-            <b>📍 Status:</b> {micro.get('wave_count_status')}
-        </div>
-        """, unsafe_allow_html=True)
-    with m2:
-        st.markdown(f"""
-        <div class='deep-analysis-box'>
-            <b>📐 Fib Confluence:</b> {micro.get('fib_confluence')}<br>
-            <b>📊 Volume:</b> {micro.get('volume_validation')}
-        </div>
-        """, unsafe_allow_html=True)
-
-    st.info(f"**📝 Sub-Wave Structure:** {micro.get('sub_wave_structure')}")
+    render_micro(micro)
 
     # --- 3. CHART & SCENARIOS ---
     tab1, tab2 = st.tabs(["📈 Chart (Price + Volume)", "🛠 Trade Setup"])
     
     with tab1:
-        if st.session_state.df_micro is not None:
-            df = st.session_state.df_micro.tail(300)
+        frames = {tf: st.session_state.df_micro, "1D": st.session_state.get("df_1d"), "1W": st.session_state.get("df_1w")}
+        cc1, cc2 = st.columns([2, 3])
+        chart_tf = cc1.radio("Frame", [k for k, v in frames.items() if v is not None], horizontal=True)
+        window = cc2.select_slider("Bars", ["300", "1000", "3000", "All"], value="All")
+        if frames.get(chart_tf) is not None:
+            df = frames[chart_tf] if window == "All" else frames[chart_tf].tail(int(window))
             
-            fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
-            
-            fig.add_trace(go.Candlestick(x=df['time'], open=df['open'], high=df['high'], low=df['low'], close=df['close'], name="Price"), row=1, col=1)
-            colors = ['#00E676' if r['close'] >= r['open'] else '#FF5252' for i, r in df.iterrows()]
-            fig.add_trace(go.Bar(x=df['time'], y=df['volume'], marker_color=colors, name="Volume"), row=2, col=1)
-            
-            if scenarios:
-                prim = scenarios[0]
-                try:
-                    fig.add_hline(y=float(prim['target']), line_dash="dash", line_color="#00E676", row=1, col=1, annotation_text="TP")
-                    fig.add_hline(y=float(prim['invalidation']), line_dash="dot", line_color="#FF5252", row=1, col=1, annotation_text="Invalidation")
-                except: pass
-            
-            fig.update_layout(height=600, template="plotly_dark", title=f"{sym} {tf} Analysis", xaxis_rangeslider_visible=False)
-            st.plotly_chart(fig, use_container_width=True)
+            piv = zigzag(df)
+            fig = build_chart(
+                df, f"{sym} {chart_tf} Analysis", pivots=piv, counts=current_counts(piv, top=1),
+                scenarios=scenarios, fib=st.session_state.fib if chart_tf == tf else None,
+                levels=st.session_state.levels,
+            )
+            with span("chart.render", bars=len(df)):
+                st.plotly_chart(fig, use_container_width=True)
         
     with tab2:
         if scenarios:
             for s in scenarios:
-                st.markdown(f"""
-                <div class='scenario-card' style='border-left: 5px solid {s.get('color')};'>
-                    <h3>{s.get('name')} ({s.get('trade_type')})</h3>
-                    <p>{s.get('summary')}</p>
-                    <div style='background:#111; padding:10px; border-radius:5px;'>
-                        🔵 Entry: {s.get('entry_zone')}<br>
-                        🟢 Target: {s.get('target')}<br>
-                        🔴 Invalidation: {s.get('invalidation')}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                render_scenario(s)
+        if st.session_state.levels is not None:
+            st.markdown("#### 🧱 Support / Resistance (computed locally)")
+            st.dataframe(st.session_state.levels["levels"].head(8), hide_index=True, use_container_width=True)
 
 # --- DISCLAIMER ---
 st.markdown("---")
 st.caption("⚠️ **Disclaimer:** This application provides technical analysis based on Elliott Wave Theory using AI. Cryptocurrency trading involves high risk. This is not financial advice. Please do your own research before trading.")
 
+# --- DIAGNOSTICS (rendered last so it includes this run's spans) ---
+with st.sidebar:
+    with st.expander("📈 Diagnostics", expanded=False):
+        stages = TRACER.summary()
+        if stages:
+            st.dataframe(stages, hide_index=True, use_container_width=True)
+            rates = TRACER.hit_rates()
+            if rates:
+                st.caption(" · ".join(f"{name}: {h}/{h + m} hits" for name, (h, m, _) in rates.items()))
+            attempts = TRACER.recent(12, "fetch.exchange")
+            if attempts:
+                st.caption("Recent exchange attempts")
+                st.dataframe(
+                    [{k: a.get(k) for k in ("exchange", "timeframe", "status", "seconds", "bars")} for a in attempts],
+                    hide_index=True, use_container_width=True,
+                )
+            d1, d2 = st.columns(2)
+            d1.download_button("Spans (JSONL)", TRACER.to_jsonl(), file_name="wave_trace.jsonl", on_click="ignore")
+            d2.download_button("Metrics (Prom)", TRACER.prometheus_text(), file_name="wave_metrics.prom", on_click="ignore")
+        else:
+            st.caption("No traced stages yet.")
+
+if METRICS_PATH:
+    TRACER.write_prometheus(METRICS_PATH)
+
 
@@ -0,0 +1,155 @@
+"""
+Offline benchmark harness (pytest-benchmark).
+
+    pip install -e .[dev]
+    python -m pytest benchmarks --benchmark-autosave      # run + save to .benchmarks/
+    python -m pytest benchmarks --benchmark-compare       # compare with the last saved run
+    python -m pytest benchmarks --benchmark-compare=0001 --benchmark-compare-fail=median:10%
+
+Candles come from benchmarks/fixtures (recorded with record_fixtures.py);
+without a recording a seeded random walk of the same shape is used (the
+report header lists which). Without pytest-benchmark installed the
+benchmarks are not collected.
+Exchanges are replayed from those candles, the LLM is llm.FakeBackend.
+WAVE_BENCH_LLM_LATENCY / WAVE_BENCH_EXCHANGE_LATENCY add simulated latency (s).
+"""
+import asyncio
+import functools
+import gzip
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from wave_counter.data import bars_to_df
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    collect_ignore_glob = ["test_*.py"]
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SYMBOL = "BTC/USDT"
+TF_MS = {"1m": 60_000, "15m": 900_000, "1h": 3_600_000, "1d": 86_400_000, "1w": 604_800_000}
+LLM_LATENCY = float(os.environ.get("WAVE_BENCH_LLM_LATENCY", "0"))
+EXCHANGE_LATENCY = float(os.environ.get("WAVE_BENCH_EXCHANGE_LATENCY", "0"))
+
+
+def fixture_path(exchange_id, symbol, timeframe):
+    return os.path.join(FIXTURES, f"{exchange_id}-{symbol.replace('/', '_')}-{timeframe}.json.gz")
+
+
+def synthetic_bars(n, timeframe, seed=7, start_price=30000.0, end_ms=None):
+    """
+    Seeded geometric random walk in ccxt row format. It ends at the current
+    bar (end_ms=None) so the store's incremental sync path is exercised.
+    """
+    rng = np.random.default_rng(seed)
+    step = TF_MS[timeframe]
+    if end_ms is None:
+        end_ms = int(time.time() * 1000) // step * step
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.002, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(3, 0.6, n)
+    times = end_ms - step * np.arange(n)[::-1]
+    return [[int(t), o, h, l, c, v] for t, o, h, l, c, v in zip(times, open_, high, low, close, volume)]
+
+
+@functools.lru_cache(maxsize=None)
+def load_bars(timeframe, n, exchange_id="binance", symbol=SYMBOL):
+    """
+    Newest `n` recorded candles of the exchange (else of binance), or
+    synthetic ones when nothing long enough was recorded. Cached, so the
+    replayed exchanges cost no file reads inside a timed call; don't mutate.
+    """
+    for source in dict.fromkeys([exchange_id, "binance"]):
+        path = fixture_path(source, symbol, timeframe)
+        if os.path.exists(path):
+            with gzip.open(path, "rt") as f:
+                bars = json.load(f)
+            if len(bars) >= n:
+                return bars[-n:]
+    return synthetic_bars(n, timeframe)
+
+
+def pytest_report_header(config):
+    from record_fixtures import SERIES
+    recorded = {tf: os.path.exists(fixture_path("binance", SYMBOL, tf)) for tf, _ in SERIES}
+    return "candles: " + ", ".join(f"{tf} {'recorded' if ok else 'synthetic'}" for tf, ok in recorded.items())
+
+
+@pytest.fixture(scope="session")
+def frames():
+    """
+    The analysis frame set: 1W/200, 1D/300, 15m/1000.
+    """
+    return {
+        "1W": bars_to_df(load_bars("1w", 200), "binance"),
+        "1D": bars_to_df(load_bars("1d", 300), "binance"),
+        "15m": bars_to_df(load_bars("15m", 1000), "binance"),
+    }
+
+
+@pytest.fixture(scope="session")
+def long_frame():
+    return bars_to_df(load_bars("1m", 10000), "binance")
+
+
+class ReplayExchange:
+    """
+    Stands in for a ccxt.async_support exchange class, serving fixture candles.
+    """
+    latency = {}
+
+    def __init__(self, config=None):
+        self.id = type(self).__name__
+        self.markets = None
+
+    async def load_markets(self, reload=False):
+        base, quote = SYMBOL.split("/")
+        self.markets = {SYMBOL: {"id": base + quote, "symbol": SYMBOL, "base": base, "quote": quote, "spot": True}}
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        await asyncio.sleep(self.latency.get(self.id, EXCHANGE_LATENCY))
+        bars = load_bars(timeframe, limit or 500, self.id, symbol)
+        if since is not None:
+            bars = [b for b in bars if b[0] >= since]
+        return bars
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def replay_exchanges(monkeypatch, tmp_path):
+    """
+    Routes every exchange in data.EXCHANGE_IDS to ReplayExchange behind a
+    fresh ExchangePool (run fetch coroutines with exchanges.get_pool().run).
+    Set per exchange latency on the returned class, e.g. cls.latency = {"binance": 0.05}.
+    """
+    ccxt_async = pytest.importorskip("ccxt.async_support")
+    from wave_counter import exchanges
+    from wave_counter.data import EXCHANGE_IDS
+
+    cls = type("Replay", (ReplayExchange,), {"latency": {}})
+    for exchange_id in EXCHANGE_IDS:
+        monkeypatch.setattr(ccxt_async, exchange_id, type(exchange_id, (cls,), {}))
+    pool = exchanges.ExchangePool(exchanges.RoutingIndex(str(tmp_path / "routes.sqlite")))
+    monkeypatch.setattr(exchanges, "_default", pool)
+    yield cls
+    pool.close()
+
+
+@pytest.fixture
+def fake_models():
+    from wave_counter.llm import FakeBackend, ModelManager
+    return ModelManager(FakeBackend(latency=LLM_LATENCY))
@@ -0,0 +1,56 @@
+"""
+Records the OHLCV fixtures the benchmarks replay (needs network access).
+
+    python benchmarks/record_fixtures.py [--exchanges binance okx] [--symbol BTC/USDT]
+
+Each series is paged forward with `since`, so the 10k 1m series works on
+exchanges that cap a request at 1000 candles.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FIXTURES, SYMBOL, fixture_path  # noqa: E402
+
+# (timeframe, candles) covering the frames and the long chart series.
+SERIES = [("1w", 200), ("1d", 300), ("15m", 1000), ("1m", 10000)]
+
+
+def record(exchange_id, symbol, timeframe, n, page=1000):
+    import ccxt
+    exchange = getattr(ccxt, exchange_id)({'enableRateLimit': True})
+    step = exchange.parse_timeframe(timeframe) * 1000
+    since = exchange.milliseconds() - n * step
+    bars = []
+    while len(bars) < n:
+        chunk = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=min(page, n - len(bars)))
+        chunk = [b for b in chunk if not bars or b[0] > bars[-1][0]]
+        if not chunk:
+            break
+        bars.extend(chunk)
+        since = chunk[-1][0] + step
+    return bars[-n:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--exchanges", nargs="+", default=["binance"])
+    parser.add_argument("--symbol", default=SYMBOL)
+    args = parser.parse_args(argv)
+
+    os.makedirs(FIXTURES, exist_ok=True)
+    for exchange_id in args.exchanges:
+        for timeframe, n in SERIES:
+            bars = record(exchange_id, args.symbol, timeframe, n)
+            path = fixture_path(exchange_id, args.symbol, timeframe)
+            with gzip.open(path, "wt") as f:
+                json.dump(bars, f)
+            print(f"{path}: {len(bars)} candles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from wave_counter.elliott import current_counts
+from wave_counter.pivots import zigzag
+
+pytest.importorskip("plotly")
+from wave_counter.chart import WEBGL_ABOVE, build_chart  # noqa: E402
+
+# ==========================================
+# CHART BUILD + SERIALIZATION
+# ==========================================
+# Figure construction plus to_json, which is what Streamlit ships to the browser.
+
+
+@pytest.mark.parametrize("bars", [300, 1000, 10000])
+def test_build_chart(benchmark, long_frame, bars):
+    df = long_frame.tail(bars).reset_index(drop=True)
+    pivots = zigzag(df)
+    counts = current_counts(pivots, top=1)
+
+    def run():
+        return build_chart(df, "BTC/USDT", pivots=pivots, counts=counts).to_json()
+
+    payload = benchmark(run)
+    benchmark.extra_info["bytes"] = len(payload)
+    price, volume = json.loads(payload)["data"][:2]
+    # Long series switch to a WebGL close line; both keep the volume bars.
+    assert price["type"] == ("scattergl" if bars > WEBGL_ABOVE else "candlestick") and volume["type"] == "bar"
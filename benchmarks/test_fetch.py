@@ -0,0 +1,70 @@
+import pytest
+
+from wave_counter.data import bars_to_df, load_frames_async, race_ohlcv
+from wave_counter.exchanges import get_pool
+from wave_counter.resample import derive_from_store, resample_bars
+from wave_counter.store import CandleStore
+
+from conftest import load_bars, synthetic_bars
+
+# ==========================================
+# FETCH: replayed exchanges, no network
+# ==========================================
+
+
+@pytest.mark.parametrize("slow_first", [False, True], ids=["primary-fast", "primary-slow"])
+def test_race_ohlcv(benchmark, replay_exchanges, slow_first):
+    if slow_first:
+        replay_exchanges.latency = {"binance": 0.2, "okx": 0.02}
+    exchange_id, bars = benchmark(lambda: get_pool().run(race_ohlcv("BTC/USDT", "15m", 1000, hedge_delay=0.05)))
+    assert bars and exchange_id == ("okx" if slow_first else "binance")
+
+
+def test_load_frames(benchmark, replay_exchanges):
+    bundle = benchmark(lambda: get_pool().run(load_frames_async("BTC/USDT", "15m", hedge_delay=0)))
+    assert bundle.ok and [len(r.df) for r in bundle.results()] == [200, 300, 1000]
+
+
+def test_load_frames_from_store(benchmark, replay_exchanges, tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    get_pool().run(load_frames_async("BTC/USDT", "15m", hedge_delay=0, store=store))
+    bundle = benchmark(lambda: get_pool().run(load_frames_async("BTC/USDT", "15m", hedge_delay=0, store=store)))
+    assert bundle.ok
+
+
+def test_store_load(benchmark, tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    store.upsert("binance", "BTC/USDT", "1m", load_bars("1m", 10000))
+    bars = benchmark(store.load, "binance", "BTC/USDT", "1m", 10000)
+    assert len(bars) == 10000
+
+
+def test_store_latest(benchmark, tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    bars = load_bars("1m", 10000)
+    for exchange_id in ("binance", "okx"):
+        store.upsert(exchange_id, "BTC/USDT", "1m", bars[:-1] if exchange_id == "okx" else bars)
+    assert benchmark(store.latest, "BTC/USDT", "1m", cap=1000) == ("binance", bars[-1][0], 1000)
+
+
+def test_bars_to_df(benchmark):
+    bars = load_bars("1m", 10000)
+    assert len(benchmark(bars_to_df, bars, "binance")) == 10000
+
+
+def test_resample_1h_from_1m(benchmark):
+    bars = load_bars("1m", 10000)
+    hourly = benchmark(resample_bars, bars, "1h", "1m")
+    # Each full hour aggregates exactly its 60 minutes.
+    first = next(i for i, b in enumerate(bars) if b[0] == hourly[0][0])
+    minutes = bars[first:first + 60]
+    assert hourly[0] == [minutes[0][0], minutes[0][1], max(b[2] for b in minutes),
+                         min(b[3] for b in minutes), minutes[-1][4], pytest.approx(sum(b[5] for b in minutes))]
+    assert all(b[0] % 3_600_000 == 0 for b in hourly)
+
+
+def test_derive_1w_from_store(benchmark, tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    store.upsert("binance", "BTC/USDT", "1d", synthetic_bars(1500, "1d"))
+    exchange_id, bars = benchmark(derive_from_store, store, "BTC/USDT", "1w", 200, bases=["1d"], max_stale_ms=None)
+    assert len(bars) == 200 and all((b[0] - 4 * 86_400_000) % 604_800_000 == 0 for b in bars)
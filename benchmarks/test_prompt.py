@@ -0,0 +1,28 @@
+import pytest
+
+from wave_counter.analysis import analyze_deep_wave, build_prompt
+from wave_counter.prompt import estimate_tokens
+
+# ==========================================
+# PROMPT SIZE + END-TO-END ANALYSIS (fake LLM)
+# ==========================================
+# Prompt size is recorded in extra_info, so saved runs track bytes/tokens
+# next to the timings.
+
+
+@pytest.mark.parametrize("mode", ["pivots", "compact", "candles"])
+def test_build_prompt(benchmark, frames, mode):
+    prompt = benchmark(build_prompt, "BTC/USDT", "15m", frames["1W"], frames["1D"], frames["15m"], "English", mode)
+    benchmark.extra_info["bytes"] = len(prompt.encode("utf-8"))
+    benchmark.extra_info["tokens"] = estimate_tokens(prompt)
+    # Every mode carries the newest micro close and the locally computed inputs.
+    assert f'{frames["15m"]["close"].iloc[-1]:.6g}' in prompt
+    assert "FIB CONFLUENCE" in prompt and "SUPPORT / RESISTANCE" in prompt
+
+
+def test_analyze_deep_wave(benchmark, frames, fake_models):
+    result = benchmark(
+        analyze_deep_wave, fake_models, "BTC/USDT", "15m",
+        frames["1W"], frames["1D"], frames["15m"], "English",
+    )
+    assert result["trade_scenarios"]
@@ -0,0 +1,18 @@
+import pytest
+
+from wave_counter.llm import FAKE_ANALYSIS
+
+pytest.importorskip("fpdf")
+from wave_counter.report import build_report  # noqa: E402
+
+# ==========================================
+# PDF REPORT
+# ==========================================
+
+
+@pytest.mark.parametrize("with_chart", [False, True], ids=["text", "chart"])
+def test_build_report(benchmark, frames, with_chart):
+    df = frames["15m"] if with_chart else None
+    pdf = benchmark(build_report, FAKE_ANALYSIS, "BTC/USDT", "15m", df)
+    benchmark.extra_info["bytes"] = len(pdf)
+    assert pdf.startswith(b"%PDF-")
@@ -0,0 +1,64 @@
+import numpy as np
+
+from wave_counter.elliott import RULES, enumerate_counts, validate_count
+from wave_counter.fibonacci import fib_confluence
+from wave_counter.levels import sr_levels
+from wave_counter.pivots import ZigZagTracker, zigzag
+
+# ==========================================
+# LOCAL STRUCTURE: pivots, counts, confluence, levels
+# ==========================================
+
+
+def check_pivots(pivots, df):
+    # Swings alternate H/L, sit on the bar's high/low, and only the last is open.
+    kinds = pivots["kind"].to_numpy()
+    assert len(pivots) > 2 and (kinds[1:] != kinds[:-1]).all()
+    column = np.where(kinds == "H", "high", "low")
+    at_bar = [df[c].iloc[i] for c, i in zip(column, pivots["idx"])]
+    assert np.allclose(pivots["price"], at_bar)
+    assert pivots["confirmed"].iloc[:-1].all()
+
+
+def test_zigzag(benchmark, frames):
+    check_pivots(benchmark(zigzag, frames["15m"]), frames["15m"])
+
+
+def test_zigzag_10k(benchmark, long_frame):
+    check_pivots(benchmark(zigzag, long_frame), long_frame)
+
+
+def test_tracker_push(benchmark, long_frame):
+    tracker = ZigZagTracker.from_frame(long_frame.iloc[:-1])
+    assert np.allclose(tracker.pivots()["price"], zigzag(long_frame.iloc[:-1])["price"])
+    last = long_frame.iloc[-1]
+    benchmark(tracker.push, last["time"], last["high"], last["low"], last["close"], last["volume"])
+
+
+def test_enumerate_counts(benchmark, frames):
+    pivots = zigzag(frames["15m"])
+    counts = benchmark(enumerate_counts, pivots)
+    # Every enumerated count passes the scalar validator and is ranked best first.
+    assert not counts.empty and counts["score"].is_monotonic_decreasing
+    assert all(not validate_count(list(r.points), r.pattern) for r in counts.itertuples())
+
+
+def test_validate_count(benchmark, frames):
+    points = zigzag(frames["1D"])["price"].tail(6).tolist()
+    assert set(benchmark(validate_count, points)) <= set(RULES)
+
+
+def test_fib_confluence(benchmark, frames):
+    conf = benchmark(fib_confluence, frames, "15m")
+    zones = conf["zones"]
+    assert not zones.empty and zones["strength"].is_monotonic_decreasing
+    assert (zones["low"] <= zones["price"]).all() and (zones["price"] <= zones["high"]).all()
+
+
+def test_sr_levels(benchmark, frames):
+    sr = benchmark(sr_levels, frames, "15m")
+    levels = sr["levels"]
+    assert not levels.empty and levels["score"].is_monotonic_decreasing
+    assert abs(sr["profile"]["volume"].sum() - 1) < 1e-9
+    last_close = frames["15m"]["close"].iloc[-1]
+    assert ((levels["kind"] == "support") == (levels["price"] <= last_close)).all()
@@ -0,0 +1,92 @@
+import os
+
+import streamlit as st
+
+from wave_counter.analysis_cache import AnalysisCache
+from wave_counter.journal import AnalysisJournal
+from wave_counter.llm import FakeBackend, GeminiBackend, ModelManager
+from wave_counter.scanner import scan_watchlist
+from wave_counter.store import CandleStore
+
+# ==========================================
+# WATCHLIST SCANNER PAGE
+# ==========================================
+st.set_page_config(page_title="Elliott Wave Scanner", layout="wide", page_icon="📋")
+
+LLM_BACKEND = os.environ.get("WAVE_LLM_BACKEND", "gemini")
+if LLM_BACKEND == "fake":
+    API_KEY = None
+elif "GOOGLE_API_KEY" in st.secrets:
+    API_KEY = st.secrets["GOOGLE_API_KEY"]
+else:
+    API_KEY = st.session_state.get("api_key") or st.sidebar.text_input("Enter Google API Key", type="password")
+
+@st.cache_resource
+def get_model_manager(api_key, backend):
+    if backend == "fake":
+        return ModelManager(FakeBackend())
+    return ModelManager(GeminiBackend(api_key))
+
+@st.cache_resource
+def get_candle_store():
+    return CandleStore()
+
+@st.cache_resource
+def get_analysis_cache():
+    return AnalysisCache()
+
+@st.cache_resource
+def get_journal():
+    return AnalysisJournal()
+
+if "scan_results" not in st.session_state: st.session_state.scan_results = None
+
+st.title("📋 Watchlist Scanner")
+st.caption("Every symbol is pre-screened locally (ZigZag + Elliott counts + Fib confluence); only the top setups go to the AI.")
+
+with st.sidebar:
+    st.header("📋 Watchlist")
+    watchlist = st.text_area("Symbols (one per line)", "BTC/USDT\nETH/USDT\nSOL/USDT\nBNB/USDT\nXRP/USDT")
+    timeframes = st.multiselect("Timeframes", ["1m", "5m", "15m", "30m", "1h", "4h"], default=["15m"])
+    lang = st.radio("Language", ["English", "Singlish"], horizontal=True)
+    top_n = st.number_input("AI Analyses (Top N)", min_value=0, max_value=50, value=5)
+    llm_workers = st.slider("Parallel AI Requests", 1, 8, 3)
+    per_exchange = st.slider("Requests per Exchange", 1, 10, 4)
+    run = st.button("🔍 Scan Watchlist", type="primary", disabled=not timeframes)
+
+if run:
+    symbols = list(dict.fromkeys(s.strip().upper() for s in watchlist.replace(",", "\n").splitlines() if s.strip()))
+    models = None
+    if top_n > 0:
+        if not API_KEY and LLM_BACKEND != "fake":
+            st.warning("⚠️ API Key Required for AI analyses. Set Top N to 0 for a local-only scan.")
+            st.stop()
+        models = get_model_manager(API_KEY, LLM_BACKEND)
+
+    progress = st.progress(0.0, text="Fetching & screening...")
+
+    def on_progress(done, total, label):
+        progress.progress(done / total, text=f"AI {done}/{total}: {label}")
+
+    try:
+        st.session_state.scan_results = scan_watchlist(
+            symbols, timeframes, models, lang, int(top_n), per_exchange, llm_workers,
+            store=get_candle_store(), cache=get_analysis_cache(), journal=get_journal(), on_progress=on_progress,
+        )
+    except Exception as e:
+        st.error(f"Scan Error: {e}")
+    progress.empty()
+
+table = st.session_state.scan_results
+if table is not None:
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Scanned", len(table))
+    c2.metric("AI Analyses", int(table['llm_s'].notna().sum()))
+    c3.metric("Errors", int(table['error'].notna().sum()))
+    st.dataframe(
+        table, use_container_width=True, hide_index=True,
+        column_config={
+            "screen_score": st.column_config.ProgressColumn("Screen Score", min_value=0.0, max_value=1.0, format="%.2f"),
+            "last_close": st.column_config.NumberColumn("Last Close", format="%.6g"),
+        },
+    )
@@ -0,0 +1,57 @@
+import streamlit as st
+
+from wave_counter.backtest import GROUP_BY, HORIZON, hit_rates, run_backtest
+from wave_counter.journal import AnalysisJournal
+from wave_counter.store import CandleStore
+
+# ==========================================
+# SCENARIO BACKTEST PAGE
+# ==========================================
+st.set_page_config(page_title="Scenario Backtest", layout="wide", page_icon="🎯")
+
+@st.cache_resource
+def get_candle_store():
+    return CandleStore()
+
+@st.cache_resource
+def get_journal():
+    return AnalysisJournal()
+
+st.title("🎯 Scenario Backtest")
+st.caption("Every journaled analysis is replayed against the candles that followed it: did each trade scenario hit its target or its invalidation first?")
+
+with st.sidebar:
+    st.header("🎯 Backtest")
+    horizon = st.number_input("Horizon (bars)", min_value=10, max_value=5000, value=HORIZON, step=50)
+    require_entry = st.checkbox("Require entry-zone fill", value=True)
+    group_by = st.multiselect("Group By", ["timeframe", "probability", "language", "prompt_mode", "model", "prompt_version", "symbol"], default=list(GROUP_BY))
+    run = st.button("▶️ Run Backtest", type="primary", disabled=not group_by)
+
+journal = get_journal()
+st.metric("Journaled Analyses", len(journal))
+
+if run:
+    try:
+        with st.spinner("Replaying candles..."):
+            results = run_backtest(journal, get_candle_store(), int(horizon), require_entry)
+        st.session_state.backtest_results = results
+    except Exception as e:
+        st.error(f"Backtest Error: {e}")
+
+results = st.session_state.get("backtest_results")
+if results is not None:
+    if results.empty:
+        st.info("No scenarios with numeric target / invalidation levels yet.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        decided = results['outcome'].isin(["target", "invalidation"])
+        c1.metric("Scenarios", len(results))
+        c2.metric("Decided", int(decided.sum()))
+        c3.metric("Hit Rate", f"{(results.loc[decided, 'outcome'] == 'target').mean():.0%}" if decided.any() else "n/a")
+        st.subheader("Hit Rates")
+        st.dataframe(
+            hit_rates(results, group_by), use_container_width=True, hide_index=True,
+            column_config={"hit_rate": st.column_config.ProgressColumn("Hit Rate", min_value=0.0, max_value=1.0, format="%.2f")},
+        )
+        with st.expander("All Scenarios"):
+            st.dataframe(results.drop(columns=["key"]), use_container_width=True, hide_index=True)
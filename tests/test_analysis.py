@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from wave_counter.analysis import analyze_deep_wave
+from wave_counter.analysis_cache import AnalysisCache
+from wave_counter.journal import AnalysisJournal
+from wave_counter.llm import FAKE_ANALYSIS, FakeBackend, ModelManager
+
+# ==========================================
+# ANALYSIS CACHE: refresh after invalidation
+# ==========================================
+
+
+def walk(n, freq, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    return pd.DataFrame({
+        'time': pd.date_range("2024-01-01", periods=n, freq=freq),
+        'open': open_, 'high': np.maximum(open_, close) * 1.002, 'low': np.minimum(open_, close) * 0.998,
+        'close': close, 'volume': rng.random(n) * 10,
+    })
+
+
+def test_refresh_bypasses_cache(tmp_path):
+    answers = []
+
+    def responder(prompt, config):
+        answers.append(len(answers) + 1)
+        return json.dumps({**FAKE_ANALYSIS, "answer": answers[-1]})
+
+    models = ModelManager(FakeBackend(responder=responder))
+    cache, journal = AnalysisCache(str(tmp_path / "cache.sqlite")), AnalysisJournal(str(tmp_path / "journal.sqlite"))
+    frames = walk(200, "7D", 1), walk(300, "1D", 2), walk(1000, "15min", 3)
+
+    def analyze(**kw):
+        return analyze_deep_wave(models, "BTC/USDT", "15m", *frames, "English", cache=cache, journal=journal, **kw)
+
+    assert analyze()["answer"] == 1
+    assert analyze()["answer"] == 1  # same candles: cache hit
+    # Live mode re-analyzes the same candles once the cached count is invalidated.
+    assert analyze(refresh=True)["answer"] == 2
+    assert analyze()["answer"] == 2  # the fresh answer replaced the cached one
+    assert len(answers) == 2 and len(journal) == 2
+
+
+def test_abandoned_attempt_writes_nothing(tmp_path):
+    models = ModelManager(FakeBackend())
+    cache, journal = AnalysisCache(str(tmp_path / "cache.sqlite")), AnalysisJournal(str(tmp_path / "journal.sqlite"))
+    frames = walk(200, "7D", 1), walk(300, "1D", 2), walk(1000, "15min", 3)
+    ai = analyze_deep_wave(models, "BTC/USDT", "15m", *frames, "English", cache=cache, journal=journal,
+                           cancelled=lambda: True)
+    assert ai["trade_scenarios"]
+    assert len(journal) == 0 and cache.stats()["entries"] == 0
@@ -0,0 +1,117 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from wave_counter import data
+from wave_counter.backtest import evaluate, hit_rates, run_backtest
+from wave_counter.journal import AnalysisJournal
+from wave_counter.live import scenario_levels
+from wave_counter.scenarios import parse_level, parse_zone, trade_levels
+from wave_counter.store import CandleStore
+
+# ==========================================
+# SCENARIO LEVELS + BACKTEST OUTCOMES
+# ==========================================
+
+HOUR = 3_600_000
+T0 = 1_700_000_000_000 // HOUR * HOUR
+# (high, low) per hourly bar; the analysis is made on bar 9.
+PATH = [(101, 99)] * 10 + [(103, 101), (106, 104), (111, 108), (100, 90)] + [(96, 94)] * 6
+
+
+def test_parse_zone_and_level():
+    assert parse_zone("100 - 101") == (100.0, 101.0)
+    assert parse_zone("~0.52") == (0.52, 0.52)
+    assert parse_zone("$1,250.5 to 1,240") == (1240.0, 1250.5)
+    assert parse_zone(42) == (42.0, 42.0)
+    assert np.isnan(parse_zone("n/a")).all() and np.isnan(parse_zone(None)).all()
+    assert parse_level("$1,250") == 1250.0
+    assert np.isnan(parse_level("110 - 120"))
+
+
+def test_trade_levels_side():
+    assert trade_levels({"trade_type": "Long", "target": 90, "invalidation": 80}) == (1, 90.0, 80.0)
+    assert trade_levels({"trade_type": "Short Scalp", "target": "90", "invalidation": "95"}) == (-1, 90.0, 95.0)
+    # No trade type: the side follows target vs invalidation.
+    assert trade_levels({"target": 80, "invalidation": 90})[0] == -1
+    assert trade_levels({"target": "n/a", "invalidation": 90}) is None
+    assert trade_levels({"target": 90, "invalidation": 90}) is None
+    # Live mode reads scenarios the same way.
+    levels = scenario_levels([{"name": "P", "target": "$150", "invalidation": "90"}, {"target": "n/a"}])
+    assert [(lv["side"], lv["target"], lv["invalidation"]) for lv in levels] == [(1, 150.0, 90.0)]
+
+
+def test_evaluate_bar_spanning_both_levels_is_invalidation():
+    one = np.array([0])
+    outcome, bars, _ = evaluate(one, np.array([1]), np.array([1]), np.array([np.nan]), np.array([np.nan]),
+                                np.array([11.0]), np.array([9.0]), np.array([12.0]), np.array([8.0]))
+    assert outcome[0] == 1 and bars[0] == 1
+
+
+def test_run_backtest(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.sqlite"))
+    store.upsert("binance", "BTC/USDT", "1h", [
+        [T0 + i * HOUR, (h + l) / 2, h, l, (h + l) / 2, 1.0] for i, (h, l) in enumerate(PATH)
+    ])
+    analysed = pd.DataFrame({'time': pd.to_datetime([T0 + 9 * HOUR], unit="ms"), 'close': [100.0]})
+    analysed.attrs['exchange'] = "binance"
+    scenarios = [
+        {"name": "long", "trade_type": "Long", "entry_zone": "100 - 102", "target": 110, "invalidation": 95},
+        {"name": "short", "trade_type": "Short", "entry_zone": "105", "target": 92, "invalidation": 110},
+        {"name": "far", "entry_zone": "300-310", "target": 200, "invalidation": 50},
+        {"name": "open", "trade_type": "Long", "target": "$1,000", "invalidation": 50},
+        {"name": "range", "trade_type": "Long", "target": "110-120", "invalidation": 95},
+    ]
+    journal = AnalysisJournal(str(tmp_path / "journal.sqlite"))
+    journal.record("k1", {"trade_scenarios": scenarios}, "BTC/USDT", "1h", analysed, "English", "pivots", "m", "4")
+
+    results = run_backtest(journal, store).set_index("name")
+    assert list(results.index) == ["long", "short", "far", "open"]  # "range" has no single target
+    assert results["outcome"].to_dict() == {
+        "long": "target", "short": "invalidation", "far": "no_entry", "open": "open",
+    }
+    assert results.loc["long", ["entry_bar", "bars"]].tolist() == [1, 3]
+    assert results.loc["short", ["entry_bar", "bars"]].tolist() == [2, 3]
+    assert (results["replayed"] == len(PATH) - 10).all()
+
+    # Without an entry requirement the short's stop comes first as well,
+    # and the far scenario is judged from the first bar on.
+    loose = run_backtest(journal, store, require_entry=False).set_index("name")
+    assert loose.loc["far", "outcome"] == "open" and loose.loc["short", "bars"] == 3
+
+
+def test_run_backtest_excludes_analyses_without_exchange(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.sqlite"))
+    store.upsert("binance", "BTC/USDT", "1h", [
+        [T0 + i * HOUR, (h + l) / 2, h, l, (h + l) / 2, 1.0] for i, (h, l) in enumerate(PATH)
+    ])
+    journal = AnalysisJournal(str(tmp_path / "journal.sqlite"))
+    scenario = {"name": "long", "trade_type": "Long", "entry_zone": "100 - 102", "target": 110, "invalidation": 95}
+    for key, exchange_id in (("k1", "binance"), ("k2", None)):
+        analysed = pd.DataFrame({'time': pd.to_datetime([T0 + 9 * HOUR], unit="ms"), 'close': [100.0]})
+        analysed.attrs['exchange'] = exchange_id
+        journal.record(key, {"trade_scenarios": [scenario]}, "BTC/USDT", "1h", analysed, "English", "pivots", "m", "4")
+
+    results = run_backtest(journal, store)
+    assert results["key"].tolist() == ["k1"] and results["outcome"].tolist() == ["target"]
+    assert results.attrs["excluded"] == 1
+    assert hit_rates(results)["hit_rate"].tolist() == [1.0]
+
+
+def test_refresh_pages_forward_to_now(tmp_path, monkeypatch):
+    # An exchange serving at most 1000 hourly bars per request, up to now.
+    now = int(time.time() * 1000) // HOUR * HOUR
+    served, calls = [[t, 1.0, 1.0, 1.0, 1.0, 1.0] for t in range(now - 2500 * HOUR, now + 1, HOUR)], []
+
+    def fetch_since(exchange_id, symbol, timeframe, since, limit=1000, store=None):
+        calls.append(since)
+        bars = [b for b in served if b[0] >= since][:limit]
+        store.upsert(exchange_id, symbol, timeframe, bars)
+        return bars
+
+    monkeypatch.setattr(data, "fetch_since", fetch_since)
+    store = CandleStore(str(tmp_path / "candles.sqlite"))
+    data.fetch_forward(store, "binance", "BTC/USDT", "1h", served[0][0])
+    assert len(calls) == 3
+    assert store.timestamps("binance", "BTC/USDT", "1h").tolist() == [b[0] for b in served]
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from wave_counter.jobs import ACTIVE, JobQueue
+
+# ==========================================
+# JOB QUEUE: status transitions, retry, timeout, cancel
+# ==========================================
+
+
+def wait_for(queue, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.status(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"{job_id} stuck in {queue.status(job_id)['status']}")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"), max_workers=2, timeout=2, retries=0, backoff=0.2)
+
+
+def test_done(queue):
+    started = threading.Event()
+    release = threading.Event()
+
+    def work(job):
+        started.set()
+        release.wait(5)
+        return {"answer": job.attempt}
+
+    job_id = queue.submit(work, label="ok", session="s1")
+    assert started.wait(5)
+    assert queue.status(job_id)["status"] == "running"
+    release.set()
+    job = wait_for(queue, job_id, ("done",))
+    assert job["result"] == {"answer": 1} and job["attempts"] == 1 and job["error"] is None
+    assert [j["id"] for j in queue.jobs(session="s1")] == [job_id]
+
+
+def test_retry_after_failure(queue):
+    calls = []
+
+    def flaky(job):
+        calls.append(job.attempt)
+        if job.attempt == 1:
+            raise ValueError("boom")
+        return "ok"
+
+    job_id = queue.submit(flaky, retries=1)
+    retrying = wait_for(queue, job_id, ("retrying", "done"))
+    assert retrying["status"] == "retrying" and retrying["error"] == "ValueError: boom"
+    job = wait_for(queue, job_id, ("done",))
+    assert job["result"] == "ok" and job["attempts"] == 2 and calls == [1, 2]
+
+
+def test_failure_after_retries(queue):
+    def broken(job):
+        raise RuntimeError(f"attempt {job.attempt}")
+
+    job = wait_for(queue, queue.submit(broken, retries=1), ("failed",))
+    assert job["attempts"] == 2 and job["error"] == "RuntimeError: attempt 2"
+
+
+def test_timeout_abandons_attempt(queue):
+    release = threading.Event()
+    seen = []
+
+    def hang(job):
+        release.wait(5)
+        seen.append(job.cancelled)
+        return "late"
+
+    job = wait_for(queue, queue.submit(hang, timeout=0.2), ("failed",))
+    assert job["error"] == "timed out after 0.2s" and job["result"] is None
+    assert queue.hung() == 1
+    release.set()
+    deadline = time.monotonic() + 5
+    while queue.hung() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert queue.hung() == 0 and seen == [True]  # the late attempt saw it was abandoned
+    assert queue.status(job["id"])["result"] is None  # and its result was dropped
+
+
+def test_hung_attempts_are_bounded(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_workers=2, timeout=0.2, retries=0, max_hung=1)
+    release = threading.Event()
+    calls = []
+
+    def hang(job):
+        calls.append(job.id)
+        release.wait(5)
+
+    first = wait_for(queue, queue.submit(hang), ("failed",))
+    second = wait_for(queue, queue.submit(hang), ("failed",))
+    assert first["error"].startswith("timed out")
+    assert second["error"] == "RuntimeError: 1 timed-out attempts still running"
+    assert calls == [first["id"]]  # no thread was started for the second job
+    release.set()
+
+
+def test_cancel_queued_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_workers=1, timeout=5, retries=0)
+    release = threading.Event()
+    ran = []
+    blocker = queue.submit(lambda job: release.wait(5))
+    queued = queue.submit(lambda job: ran.append(job.id))
+    assert queue.status(queued)["status"] == "queued"
+    assert queue.cancel(queued)
+    release.set()
+    assert wait_for(queue, queued, ("cancelled",))["attempts"] == 0
+    assert wait_for(queue, blocker, ("done",))
+    assert ran == [] and not queue.cancel(queued)
+
+
+def test_cancel_running_stream(queue):
+    streaming = threading.Event()
+
+    def stream(job):
+        for i in range(500):
+            job.progress("trade_scenarios", i, {"name": i})  # raises once cancelled
+            streaming.set()
+            time.sleep(0.01)
+        return "finished"
+
+    job_id = queue.submit(stream)
+    assert streaming.wait(5)
+    assert queue.sections(job_id)
+    queue.cancel(job_id)
+    job = wait_for(queue, job_id, ("cancelled",))
+    assert job["result"] is None and job["status"] not in ACTIVE
+
+
+def test_restart_fails_interrupted_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path, timeout=1, retries=0, backoff=0.1)
+    # A job left running by a process that died an hour ago.
+    with queue._connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, label, status, attempts, created, updated) VALUES ('dead', 'x', 'running', 1, ?, ?)",
+            (time.time() - 3600, time.time() - 3600),
+        )
+    job = JobQueue(path, timeout=1, retries=0, backoff=0.1).status("dead")
+    assert job["status"] == "failed" and job["error"] == "interrupted (process restarted)"
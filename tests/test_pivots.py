@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from wave_counter.analysis import analyze_deep_wave, build_prompt
+from wave_counter.llm import FakeBackend, ModelManager
+from wave_counter.pivots import pivot_prompt, zigzag
+
+# ==========================================
+# PIVOT PROMPT: missing frames
+# ==========================================
+
+
+def walk(n, freq, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    return pd.DataFrame({
+        'time': pd.date_range("2024-01-01", periods=n, freq=freq),
+        'open': open_, 'high': np.maximum(open_, close) * 1.002, 'low': np.minimum(open_, close) * 0.998,
+        'close': close, 'volume': rng.random(n) * 10,
+    })
+
+
+def test_pivot_prompt_empty_frame():
+    assert zigzag(pd.DataFrame()).empty
+    assert pivot_prompt(pd.DataFrame()) == {"pivots": [], "recent_candles": []}
+
+
+def test_pivot_prompt_keeps_tail():
+    df = walk(200, "1D")
+    payload = pivot_prompt(df, tail=5)
+    assert len(payload["recent_candles"]) == 5 and payload["pivots"]
+    assert payload["recent_candles"][-1][0] == df['time'].iloc[-1].strftime('%Y-%m-%dT%H:%M')
+
+
+def test_prompt_without_daily_frame():
+    # A failed 1D fetch leaves an empty frame; the bundle still counts as ok.
+    weekly, micro = walk(200, "7D"), walk(1000, "15min")
+    for mode in ("pivots", "compact", "candles"):
+        prompt = build_prompt("BTC/USDT", "15m", weekly, pd.DataFrame(), micro, "English", mode)
+        assert "1D (Swing Context)" in prompt
+
+    ai = analyze_deep_wave(ModelManager(FakeBackend()), "BTC/USDT", "15m", weekly, pd.DataFrame(), micro, "English")
+    assert ai["trade_scenarios"]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wave_counter import exchanges
+from wave_counter.analysis import build_prompt
+from wave_counter.data import price_tick
+from wave_counter.prompt import encode_candles
+
+# ==========================================
+# COMPACT ENCODING: market tick precision
+# ==========================================
+
+
+class MarketsClient:
+    precisionMode = 4  # ccxt TICK_SIZE
+
+    async def load_markets(self, reload=False):
+        return {"BTC/USDT": {"symbol": "BTC/USDT", "base": "BTC", "quote": "USDT", "spot": True,
+                             "precision": {"price": 0.1}}}
+
+
+def frame(n, freq, exchange_id="binance"):
+    close = 30000 + np.cumsum(np.random.default_rng(1).normal(0, 10, n)) + 0.123456
+    df = pd.DataFrame({
+        'time': pd.date_range("2024-01-01", periods=n, freq=freq),
+        'open': close, 'high': close + 5, 'low': close - 5, 'close': close, 'volume': 1.0,
+    })
+    df.attrs['exchange'] = exchange_id
+    return df
+
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    pytest.importorskip("ccxt")
+    pool = exchanges.ExchangePool(exchanges.RoutingIndex(str(tmp_path / "routes.sqlite")))
+    monkeypatch.setattr(exchanges, "_default", pool)
+    yield pool
+    pool.close()
+
+
+def test_tick_size_from_loaded_markets(pool):
+    df = frame(50, "15min")
+    assert price_tick("BTC/USDT", df) is None  # markets not loaded: decimals are inferred
+    pool.run(pool._load_markets(MarketsClient(), "binance"))
+    assert pool.tick_size("binance", "btc-usdt") == 0.1
+    assert pool.tick_size("binance", "BTCUSDT") == 0.1  # compact pair, resolved like market_symbol
+    assert price_tick("BTC/USDT", df) == 0.1
+    rows = encode_candles(df, price_tick("BTC/USDT", df)).splitlines()[1:]
+    assert all(len(v.split(".")[1]) == 1 for v in rows[0].split(",")[:4])
+
+
+def test_compact_prompt_uses_tick(pool):
+    pool.run(pool._load_markets(MarketsClient(), "binance"))
+    weekly, daily, micro = frame(100, "7D"), frame(100, "1D"), frame(500, "15min")
+    prompt = build_prompt("BTC/USDT", "15m", weekly, daily, micro, "English", "compact")
+    last = micro['close'].iloc[-1]
+    assert f"{last:.1f}" in prompt and f"{last:.2f}" not in prompt  # inferred would be 2
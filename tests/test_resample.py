@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import numpy as np
+
+from wave_counter.data import _fetch_latest
+from wave_counter.resample import derive_from_store, resample_bars, timeframe_ms, verify
+from wave_counter.store import CandleStore
+
+# ==========================================
+# RESAMPLE: higher timeframes from the store
+# ==========================================
+
+DAY = 86_400_000
+
+
+def bars(n, timeframe, seed=7, end=None):
+    """
+    n ccxt-style rows whose last bar is the one open at `end` (default now).
+    """
+    step = timeframe_ms(timeframe)
+    end = int(time.time() * 1000) if end is None else end
+    ts = end // step * step - step * np.arange(n)[::-1]
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    high, low = np.maximum(open_, close) * 1.002, np.minimum(open_, close) * 0.998
+    return [[int(t), *map(float, row)] for t, row in zip(ts, zip(open_, high, low, close, rng.random(n) * 10))]
+
+
+def stored(tmp_path, base="1d", n=1500):
+    store = CandleStore(str(tmp_path / "candles.sqlite"))
+    store.upsert("binance", "BTC/USDT", base, bars(n, base))
+    return store
+
+
+def test_resample_aggregates_each_bucket():
+    minutes = bars(120, "1m", end=1_700_000_000_000)
+    quarters = resample_bars(minutes, "15m", "1m", now=1_700_000_000_000)
+    first = next(i for i, b in enumerate(minutes) if b[0] == quarters[0][0])
+    chunk = minutes[first:first + 15]
+    assert quarters[0][:5] == [chunk[0][0], chunk[0][1], max(b[2] for b in chunk),
+                               min(b[3] for b in chunk), chunk[-1][4]]
+    assert np.isclose(quarters[0][5], sum(b[5] for b in chunk))
+
+
+def weeks_of(days):
+    """
+    Monday-open weekly candles built bar by bar, independently of resample_bars.
+    """
+    weeks = {}
+    for t, o, h, l, c, v in days:
+        start = (t - 4 * DAY) // (7 * DAY) * (7 * DAY) + 4 * DAY
+        if start not in weeks:
+            weeks[start] = [start, o, h, l, c, v]
+        else:
+            w = weeks[start]
+            w[2], w[3], w[4], w[5] = max(w[2], h), min(w[3], l), c, w[5] + v
+    return list(weeks.values())
+
+
+def test_derived_bars_match_native_candles(tmp_path):
+    store = stored(tmp_path)
+    native = weeks_of(store.load("binance", "BTC/USDT", "1d"))[1:-1]  # full, closed weeks
+    store.upsert("binance", "BTC/USDT", "1w", native)
+    exchange_id, weekly = derive_from_store(store, "BTC/USDT", "1w", 200, bases=["1d"], max_stale_ms=None)
+    assert exchange_id == "binance" and len(weekly) == 200
+    check = verify(weekly, native)
+    assert check["compared"] == 199 and check["mismatched"] == 0
+    # Derived rows are not written back: only the exchange's candles are stored.
+    assert store.load("binance", "BTC/USDT", "1w") == native
+
+
+def test_disagreeing_native_candles_block_derivation(tmp_path):
+    store = stored(tmp_path)
+    _, weekly = derive_from_store(store, "BTC/USDT", "1w", 200, bases=["1d"], max_stale_ms=None)
+    native = [[b[0], b[1], b[2] * 1.05, b[3], b[4], b[5]] for b in weekly]
+    store.upsert("binance", "BTC/USDT", "1w", native)
+    assert derive_from_store(store, "BTC/USDT", "1w", 200, bases=["1d"], max_stale_ms=None) is None
+
+
+def test_stale_or_short_base_is_not_used(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.sqlite"))
+    store.upsert("binance", "BTC/USDT", "1m", bars(3000, "1m", end=int(time.time() * 1000) - 3_600_000))
+    assert derive_from_store(store, "BTC/USDT", "15m", 100) is None  # last bar an hour old
+    store = stored(tmp_path / "short", n=300)
+    assert derive_from_store(store, "BTC/USDT", "1w", 200, bases=["1d"], max_stale_ms=None) is None
+    # A 1D base is too coarse to be fresh unless the caller has just synced it.
+    assert derive_from_store(stored(tmp_path / "long"), "BTC/USDT", "1w", 200) is None
+
+
+def test_fetch_latest_derives_without_network(tmp_path):
+    store = stored(tmp_path)
+    exchange_id, weekly = asyncio.run(_fetch_latest("BTC/USDT", "1w", 200, 0, store, synced=["1d"]))
+    assert exchange_id == "binance" and len(weekly) == 200
+    assert weekly[-1][0] <= int(time.time() * 1000) < weekly[-1][0] + 7 * DAY
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wave_counter import exchanges, scanner
+from wave_counter.data import TimeframeResult
+from wave_counter.llm import FakeBackend, ModelManager
+
+# ==========================================
+# SCANNER: partial fetch failures
+# ==========================================
+
+
+def frame(n, freq, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    return pd.DataFrame({
+        'time': pd.date_range("2024-01-01", periods=n, freq=freq),
+        'open': open_, 'high': np.maximum(open_, close) * 1.002, 'low': np.minimum(open_, close) * 0.998,
+        'close': close, 'volume': rng.random(n) * 10,
+    })
+
+
+def result(timeframe, limit, df=None):
+    if df is None:
+        return TimeframeResult(timeframe, limit, error="All exchanges failed")
+    return TimeframeResult(timeframe, limit, df=df, exchange="binance")
+
+
+@pytest.fixture
+def fetched(monkeypatch, tmp_path):
+    data = {
+        ("OK/USDT", "1w", 200): result("1w", 200, frame(200, "7D", 1)),
+        ("OK/USDT", "1d", 300): result("1d", 300, frame(300, "1D", 2)),
+        ("OK/USDT", "15m", 1000): result("15m", 1000, frame(1000, "15min", 3)),
+        ("NODAILY/USDT", "1w", 200): result("1w", 200, frame(200, "7D", 4)),
+        ("NODAILY/USDT", "1d", 300): result("1d", 300),
+        ("NODAILY/USDT", "15m", 1000): result("15m", 1000, frame(1000, "15min", 5)),
+        ("NOWEEKLY/USDT", "1w", 200): result("1w", 200),
+        ("NOWEEKLY/USDT", "1d", 300): result("1d", 300, frame(300, "1D", 6)),
+        ("NOWEEKLY/USDT", "15m", 1000): result("15m", 1000, frame(1000, "15min", 7)),
+    }
+
+    async def fetch(symbols, timeframes, store, per_exchange):
+        return data
+
+    pool = exchanges.ExchangePool(exchanges.RoutingIndex(str(tmp_path / "routes.sqlite")))
+    monkeypatch.setattr(exchanges, "_default", pool)
+    monkeypatch.setattr(scanner, "_fetch_watchlist", fetch)
+    yield data
+    pool.close()
+
+
+def test_scan_gates_on_bundle_readiness(fetched):
+    table = scanner.scan_watchlist(["OK/USDT", "NODAILY/USDT", "NOWEEKLY/USDT"], ["15m"],
+                                   ModelManager(FakeBackend()), top_n=3).set_index('symbol')
+
+    assert table.at["NOWEEKLY/USDT", 'error'] == "data unavailable: 1w All exchanges failed"
+    assert pd.isna(table.at["NOWEEKLY/USDT", 'llm_s'])
+    # A missing daily frame is screened and analyzed like a complete one.
+    for sym in ("OK/USDT", "NODAILY/USDT"):
+        assert pd.isna(table.at[sym, 'error']) and table.at[sym, 'trend']
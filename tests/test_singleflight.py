@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from wave_counter import singleflight
+from wave_counter.data import _fetch_latest
+from wave_counter.jobs import JobCancelled
+from wave_counter.singleflight import LeaseTable, SingleFlight
+from wave_counter.store import CandleStore
+from wave_counter.trace import TRACER
+
+# ==========================================
+# SINGLE-FLIGHT: threads, asyncio, cross-process leases
+# ==========================================
+
+
+def followers(kind):
+    return TRACER.counters[("singleflight", (("kind", kind), ("role", "follower")))]
+
+
+def wait_until(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def run_threads(flights, key, fn, n):
+    """
+    Starts one leader, then n - 1 callers of the same key; returns
+    (outcomes, release) where release() lets the leader's fn finish.
+    """
+    outcomes = [None] * n
+    gate = threading.Event()
+    kind = key.split(":", 1)[0]
+    before = followers(kind)
+
+    def call(i):
+        try:
+            outcomes[i] = ("ok", flights.run(key, lambda: fn(gate)))
+        except BaseException as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    threads[0].start()
+    wait_until(lambda: key in flights._calls)
+    for t in threads[1:]:
+        t.start()
+    wait_until(lambda: followers(kind) - before >= n - 1)
+
+    def release():
+        gate.set()
+        for t in threads:
+            t.join(5)
+    return outcomes, release
+
+
+def test_followers_share_the_leader_result():
+    flights, calls = SingleFlight(lease_path=None), []
+
+    def work(gate):
+        calls.append(1)
+        gate.wait(5)
+        return {"value": 42}
+
+    outcomes, release = run_threads(flights, "share:k", work, 6)
+    release()
+    assert len(calls) == 1
+    assert all(o == ("ok", {"value": 42}) for o in outcomes)
+    assert outcomes[0][1] is outcomes[-1][1]
+    assert "share:k" not in flights._calls
+
+
+def test_leader_failure_reaches_followers():
+    flights, calls = SingleFlight(lease_path=None), []
+
+    def work(gate):
+        calls.append(1)
+        gate.wait(5)
+        raise ValueError("model down")
+
+    outcomes, release = run_threads(flights, "fail:k", work, 4)
+    release()
+    assert len(calls) == 1
+    assert all(kind == "error" and str(e) == "model down" for kind, e in outcomes)
+    # The failure is not cached: the next call runs again.
+    assert flights.run("fail:k", lambda: "retried") == "retried"
+
+
+def test_cancelled_leader_hands_over_to_a_follower():
+    flights, calls = SingleFlight(lease_path=None), []
+
+    def work(gate):
+        calls.append(1)
+        if len(calls) == 1:
+            gate.wait(5)
+            raise JobCancelled("job")
+        return "from follower"
+
+    outcomes, release = run_threads(flights, "cancel:k", work, 2)
+    release()
+    assert outcomes[0][0] == "error" and isinstance(outcomes[0][1], JobCancelled)
+    assert outcomes[1] == ("ok", "from follower") and len(calls) == 2
+
+
+def test_async_callers_share_one_task():
+    flights, calls = SingleFlight(lease_path=None), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [1, 2, 3]
+
+    async def main():
+        callers = [asyncio.ensure_future(flights.run_async("fetch:k", fetch)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()  # one impatient caller must not cancel the others' fetch
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == [[1, 2, 3]] * 4 and len(calls) == 1
+
+
+def test_async_failure_reaches_every_caller():
+    flights = SingleFlight(lease_path=None)
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        raise ConnectionError("exchange down")
+
+    async def main():
+        return await asyncio.gather(*(flights.run_async("down:k", fetch) for _ in range(3)), return_exceptions=True)
+
+    assert [str(r) for r in asyncio.run(main())] == ["exchange down"] * 3
+
+
+def test_lease_table(tmp_path):
+    path = str(tmp_path / "leases.sqlite")
+    a, b = LeaseTable(path, ttl=60), LeaseTable(path, ttl=60)
+    assert a.acquire("k") and not b.acquire("k") and not a.acquire("k")
+    b.release("k")  # only the owner can release
+    assert not b.acquire("k")
+    a.release("k")
+    assert b.acquire("k")
+
+
+def test_waiter_rechecks_after_other_process_finishes(tmp_path):
+    path = str(tmp_path / "leases.sqlite")
+    other = LeaseTable(path, ttl=60)  # stands in for another process
+    assert other.acquire("analysis:k")
+    flights, calls, cache = SingleFlight(lease_path=path, poll=0.01), [], {}
+    result = []
+    t = threading.Thread(target=lambda: result.append(
+        flights.run("analysis:k", lambda: calls.append(1) or "computed", recheck=lambda: cache.get("k"))))
+    t.start()
+    time.sleep(0.05)
+    assert not result  # waiting on the other process
+    cache["k"] = "from other process"
+    other.release("analysis:k")
+    t.join(5)
+    assert result == ["from other process"] and calls == []
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["thread", "async"])
+def test_expired_lease_is_taken_over(tmp_path, use_async):
+    path = str(tmp_path / "leases.sqlite")
+    crashed = LeaseTable(path, ttl=0.2)  # a process that died holding the lease
+    assert crashed.acquire("ohlcv:k")
+    flights = SingleFlight(lease_path=path, poll=0.01)
+    started = time.monotonic()
+    if use_async:
+        async def fetch():
+            return "fetched"
+        result = asyncio.run(flights.run_async("ohlcv:k", fetch, recheck=lambda: None))
+    else:
+        result = flights.run("ohlcv:k", lambda: "fetched", recheck=lambda: None)
+    assert result == "fetched" and time.monotonic() - started >= 0.15
+    assert LeaseTable(path).acquire("ohlcv:k")  # released after the work
+
+
+def test_ohlcv_waiter_reads_the_synced_bars_back(tmp_path, monkeypatch):
+    path = str(tmp_path / "leases.sqlite")
+    flights, refused = SingleFlight(lease_path=path, poll=0.01), threading.Event()
+    acquire = flights.leases.acquire
+    flights.leases.acquire = lambda key: acquire(key) or refused.set()
+    monkeypatch.setattr(singleflight, "_default", flights)
+    store = CandleStore(str(tmp_path / "candles.sqlite"))
+    other = LeaseTable(path, ttl=60)  # another process syncing the same frame
+    assert other.acquire("ohlcv:BTC/USDT:15m:100:store")
+    step = 900_000
+    now = int(time.time() * 1000) // step * step
+    synced = [[now - step * i, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(99, -1, -1)]
+
+    async def main():
+        fetch = asyncio.ensure_future(_fetch_latest("BTC/USDT", "15m", 100, 0, store))
+        while not refused.is_set():  # waiting on the other process's lease
+            await asyncio.sleep(0.01)
+        assert not fetch.done()
+        store.upsert("binance", "BTC/USDT", "15m", synced)
+        other.release("ohlcv:BTC/USDT:15m:100:store")
+        return await fetch
+
+    assert asyncio.run(main()) == ("binance", synced)  # no exchange was asked
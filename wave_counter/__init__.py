@@ -0,0 +1,4 @@
+"""
+wave_counter: Elliott Wave analysis core (data, structure, prompts, LLM,
+reports). Submodules are imported on demand; nothing heavy loads here.
+"""
@@ -0,0 +1,255 @@
+import json
+import time
+
+from .analysis_cache import make_key, text_version
+from .data import price_tick
+from .elliott import counts_for_prompt, current_counts
+from .fibonacci import confluence_for_prompt, fib_confluence
+from .knowledge import ELLIOTT_KNOWLEDGE
+from .levels import levels_for_prompt, sr_levels
+from .llm import record_usage
+from .pivots import pivot_prompt, zigzag
+from .prompt import encode_candles, estimate_tokens, plan_candles
+from .singleflight import get_flights
+from .streaming import SectionStream, iter_text
+from .trace import span
+
+# ==========================================
+# ELLIOTT WAVE LLM ANALYSIS
+# ==========================================
+
+MODEL_NAME = 'gemini-3-pro-preview'
+# Bump PROMPT_VERSION when the analysis prompt template changes (invalidates cached analyses).
+PROMPT_VERSION = "4"
+KNOWLEDGE_VERSION = text_version(ELLIOTT_KNOWLEDGE)
+# Token budget for the candle data in prompt_mode="compact" (local estimate).
+PROMPT_TOKEN_BUDGET = 12000
+
+
+def analysis_key(symbol, micro_tf, df_1w, df_1d, df_micro, language, prompt_mode, model_name=MODEL_NAME):
+    """
+    Content address of one analysis: keyed by the last *closed* micro candle, so
+    repeats inside the same candle window map to the same result.
+    """
+    return make_key(
+        symbol=symbol, timeframe=micro_tf, language=language,
+        last_closed=df_micro['time'].iloc[-2] if len(df_micro) > 1 else None,
+        context=[len(df_1w), len(df_1d), len(df_micro)], prompt_mode=prompt_mode,
+        model=model_name, prompt_version=PROMPT_VERSION, knowledge_version=KNOWLEDGE_VERSION,
+    )
+
+
+def build_prompt(symbol, micro_tf, df_1w, df_1d, df_micro, language, prompt_mode="pivots", confluence=None,
+                 levels=None):
+    """
+    prompt_mode="pivots" sends ZigZag swing pivots of each whole frame plus a short
+    candle tail (see pivots.pivot_prompt); "compact" sends columnar candles sized to
+    PROMPT_TOKEN_BUDGET (see prompt.plan_candles); "candles" sends the raw JSON dumps.
+    confluence: a fibonacci.fib_confluence result; computed here when None.
+    levels: a levels.sr_levels result; computed here when None.
+    """
+    lang_inst = "Explain in English."
+    if language == "Singlish":
+        lang_inst = "Explain in 'Singlish' (Sinhala mixed with English). Use technical terms freely."
+
+    piv_1d, piv_micro = zigzag(df_1d), zigzag(df_micro)
+    if confluence is None:
+        confluence = fib_confluence(
+            {"1W": df_1w, "1D": df_1d, micro_tf: df_micro}, micro_tf,
+            pivots={"1D": piv_1d, micro_tf: piv_micro},
+        )
+    json_fib = json.dumps(confluence_for_prompt(confluence))
+    if levels is None:
+        levels = sr_levels(
+            {"1W": df_1w, "1D": df_1d, micro_tf: df_micro}, micro_tf,
+            pivots={"1D": piv_1d, micro_tf: piv_micro},
+        )
+    json_levels = json.dumps(levels_for_prompt(levels))
+    local_counts = json.dumps({
+        "1D": counts_for_prompt(current_counts(piv_1d)),
+        micro_tf: counts_for_prompt(current_counts(piv_micro)),
+    })
+
+    if prompt_mode == "pivots":
+        json_1w = json.dumps(pivot_prompt(df_1w, tail=5))
+        json_1d = json.dumps(pivot_prompt(df_1d, tail=10, pivots=piv_1d))
+        json_micro = json.dumps(pivot_prompt(df_micro, tail=30, pivots=piv_micro))
+        micro_label = f"MICRO ({micro_tf} - Swing Pivots of {len(df_micro)} Candles + Last 30 Candles)"
+        micro_desc = "the micro swing pivots (time, H/L, price, volume, leg volume) and recent candles"
+    elif prompt_mode == "compact":
+        frames = {"1W": df_1w, "1D": df_1d, "micro": df_micro}
+        # Prices are written at the market's tick precision when its markets are loaded.
+        ticks = {r: price_tick(symbol, df) for r, df in frames.items()}
+        rows = plan_candles(frames, PROMPT_TOKEN_BUDGET, ticks=ticks)
+        json_1w = "\n" + encode_candles(df_1w.tail(rows["1W"]), ticks["1W"])
+        json_1d = "\n" + encode_candles(df_1d.tail(rows["1D"]), ticks["1D"])
+        json_micro = "\n" + encode_candles(df_micro.tail(rows["micro"]), ticks["micro"])
+        micro_label = f"MICRO ({micro_tf} - Last {rows['micro']} Candles, CSV)"
+        micro_desc = f"{rows['micro']} candles of micro data (CSV: header gives start time and bar step in seconds)"
+    else:
+        json_1w = df_1w.tail(30).to_json(orient="records", date_format='iso')
+        json_1d = df_1d.tail(60).to_json(orient="records", date_format='iso')
+
+        cols = ['open', 'high', 'low', 'close', 'volume']
+        micro_subset = df_micro.tail(300).copy()
+        micro_subset[cols] = micro_subset[cols].round(4)
+        json_micro = micro_subset.to_json(orient="records", date_format='iso')
+        micro_label = f"MICRO ({micro_tf} - Last 300 Candles)"
+        micro_desc = "300 candles of micro data"
+
+    task = "### TASK: DETAILED ELLIOTT WAVE STRUCTURE ANALYSIS"
+    
+    scalp_instruction = ""
+    if micro_tf in ['1m', '3m', '5m']:
+        scalp_instruction = f"""
+        **⚠️ SCALPING MODE ACTIVE (1m-5m):**
+        - You are provided with {micro_desc}.
+        - Analyze the immediate wave structure carefully.
+        - Check for Volume Divergence on the last wave.
+        - Ensure the trade direction aligns with the 1D Swing Trend.
+        """
+
+    prompt = f"""
+    You are a Master Elliott Wave Analyst.
+    {task}
+    
+    ### DATA INPUTS
+    * **1W (Trend Context):** {json_1w}
+    * **1D (Swing Context):** {json_1d}
+    * **{micro_label}:** {json_micro}
+    * **FIB CONFLUENCE (computed locally, strongest first):** {json_fib}
+    * **SUPPORT / RESISTANCE (computed locally from swing pivots + volume profile, strongest first):** {json_levels}
+    * **LOCAL RULE-CHECKED COUNTS (best first, already pass the cardinal rules):** {local_counts}
+    
+    ### INSTRUCTIONS
+    1.  **Structure:** Analyze {micro_desc} to determine the exact wave count.
+    2.  **Validations:** Check High/Low relationships, Fibonacci Time cycles, and Volume.
+    3.  **Consistency:** Ensure the Micro count fits into the 1D Swing structure.
+    4.  **rule** Only use elliott wave and support and resistance. also make sure give the datiled scenario in "trade_scenarios"
+    5.  **Support / Resistance:** Do not derive levels from the candles; use the SUPPORT / RESISTANCE zones (touches, volume_pct, POC, value area) for "key_levels", entries, targets and invalidations.
+    6.  **Fibonacci:** Do not recompute Fibonacci levels; use the FIB CONFLUENCE zones and time targets in "fib_confluence".
+    7.  **Local Counts:** Prefer the rule-checked counts above; explain why if you reject them. Give each scenario's "pattern" (impulse/diagonal/zigzag/flat) and "wave_points" (prices of the origin and each wave end so far).
+    {scalp_instruction}
+    
+    ### LANGUAGE
+    {lang_inst}
+    
+    ### OUTPUT JSON FORMAT (MANDATORY)
+    {{
+        "macro_analysis": {{
+            "trend": "Bullish/Bearish",
+            "current_structure": "Primary Wave Count",
+            "detailed_breakdown": "History of the move.",
+            "key_levels": "Key Support/Res (from the computed zones)"
+        }},
+        "micro_analysis": {{
+            "timeframe": "{micro_tf}",
+            "current_wave_degree": "Degree (e.g. Sub-Minuette)",
+            "wave_count_status": "Status (e.g. Wave iii extending)",
+            "sub_wave_structure": "Internal structure description.",
+            "fib_confluence": "Which computed zones/time targets align with the count.",
+            "volume_validation": "Volume analysis."
+        }},
+        "trade_scenarios": [
+            {{
+                "name": "Primary Setup",
+                "trade_type": "Long/Short",
+                "probability": "High",
+                "summary": "Reasoning.",
+                "entry_zone": "0.00 - 0.00",
+                "target": 0.00,
+                "invalidation": 0.00,
+                "pattern": "impulse",
+                "wave_points": [0.00, 0.00, 0.00],
+                "color": "#00E676"
+            }},
+            {{
+                "name": "Alternative",
+                "trade_type": "Long/Short",
+                "probability": "Low",
+                "summary": "Alt count.",
+                "entry_zone": "0.00 - 0.00",
+                "target": 0.00,
+                "invalidation": 0.00,
+                "pattern": "impulse",
+                "wave_points": [0.00, 0.00, 0.00],
+                "color": "#FFAB00"
+            }}
+        ]
+    }}
+    """
+    return prompt
+
+
+def analyze_deep_wave(models, symbol, micro_tf, df_1w, df_1d, df_micro, language, previous=None,
+                      prompt_mode="pivots", confluence=None, cache=None, on_section=None, model_name=MODEL_NAME,
+                      journal=None, levels=None, refresh=False, cancelled=None):
+    """
+    Runs one Elliott Wave analysis and returns the parsed JSON dict.
+    Raises on model or JSON errors; callers decide how to report them.
+
+    models: an llm.ModelManager. See build_prompt for prompt_mode / confluence / levels.
+    cache: an AnalysisCache; hits skip the model call (see analysis_key).
+    refresh: skip the cached result and ask the model again (the new one
+    replaces it), e.g. after live mode saw the cached analysis invalidated.
+    journal: an AnalysisJournal; every result is logged there for backtesting.
+    cancelled(): when it returns True (e.g. a timed-out job attempt), the
+    result is still returned but not written to the cache or the journal.
+    Concurrent calls with the same analysis_key share one model call
+    (singleflight); only the caller that makes it gets on_section callbacks.
+    on_section(key, index, value): when given, the response is streamed and the
+    callback fires as soon as each section / trade scenario object is complete.
+    Traced as an "analysis" span with analysis.prompt / .llm / .parse inside.
+    """
+    with span("analysis", symbol=symbol, timeframe=micro_tf, prompt_mode=prompt_mode, model=model_name) as root:
+        cache_key = analysis_key(symbol, micro_tf, df_1w, df_1d, df_micro, language, prompt_mode, model_name)
+
+        # A refreshed answer is a new analysis of the same frames: journaled under its own key.
+        journal_key = f"{cache_key}:refresh:{time.time():.0f}" if refresh else cache_key
+
+        def owned():
+            return cancelled is None or not cancelled()
+
+        def done(result):
+            if journal is not None and owned():
+                journal.record(journal_key, result, symbol, micro_tf, df_micro, language, prompt_mode,
+                               model_name, PROMPT_VERSION)
+            return result
+
+        if cache is not None and not refresh:
+            cached = cache.get(cache_key)
+            root["cached"] = cached is not None
+            if cached is not None:
+                return done(cached)
+
+        def generate():
+            with span("analysis.prompt", prompt_mode=prompt_mode) as s:
+                prompt = build_prompt(symbol, micro_tf, df_1w, df_1d, df_micro, language, prompt_mode, confluence,
+                                      levels)
+                prompt_tokens = estimate_tokens(prompt)
+                s.update(bytes=len(prompt.encode("utf-8")), tokens=prompt_tokens)
+            model = models.get(model_name, ELLIOTT_KNOWLEDGE)
+            config = {"temperature": 0.2, "response_mime_type": "application/json"}
+            with span("analysis.llm", model=model_name, stream=on_section is not None) as s:
+                if on_section is None:
+                    response = model.generate_content(prompt, generation_config=config)
+                    text = response.text
+                else:
+                    sections = SectionStream()
+                    response = model.generate_content(prompt, generation_config=config, stream=True)
+                    for chunk in iter_text(response):
+                        for key, index, value in sections.feed(chunk):
+                            on_section(key, index, value)
+                    text = sections.text
+                record_usage(s, "analysis", response, prompt_tokens, text)
+            with span("analysis.parse", bytes=len(text)):
+                result = json.loads(text)
+            if cache is not None and owned():
+                cache.put(cache_key, result)
+            return result
+
+        # Another process holding the key has filled the cache by the time we get it.
+        if refresh:
+            return done(get_flights().run(f"analysis:{cache_key}:refresh", generate))
+        recheck = (lambda: cache.get(cache_key)) if cache is not None else None
+        return done(get_flights().run(f"analysis:{cache_key}", generate, recheck))
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .trace import count
+
+# ==========================================
+# CONTENT-ADDRESSED LLM RESULT CACHE
+# ==========================================
+
+CACHE_PATH = os.environ.get("WAVE_ANALYSIS_CACHE", os.path.join(".wave_cache", "analyses.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    key      TEXT PRIMARY KEY,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL,
+    payload  TEXT NOT NULL
+)
+"""
+
+
+def text_version(text):
+    """
+    Short content hash, used to version the prompt template / knowledge base.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def make_key(**parts):
+    """
+    sha256 over the sorted key parts, e.g. symbol, timeframe, last closed candle,
+    language, model and prompt version.
+    """
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    SQLite-backed cache of parsed analysis JSON with TTL and LRU size eviction.
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=1000, ttl=24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit):
+        count("cache", cache="analysis", result="hit" if hit else "miss")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM analyses WHERE key = ? AND created >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE analyses SET accessed = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?)", (key, now, now, json.dumps(value))
+            )
+            conn.execute("DELETE FROM analyses WHERE created < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM analyses WHERE key NOT IN "
+                "(SELECT key FROM analyses ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM analyses")
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from .scenarios import parse_zone, trade_levels
+
+# ==========================================
+# SCENARIO BACKTESTER (VECTORIZED)
+# ==========================================
+# Replays the candles after each journaled analysis and decides, per trade
+# scenario, whether the target or the invalidation was hit first.
+#
+# All scenarios are evaluated in one NumPy pass: the candle series of every
+# (exchange, symbol, timeframe) are concatenated, each scenario becomes a
+# [start, end) slice of that array, and a (scenarios x horizon) window of
+# highs/lows is compared against the levels. Like live mode, a bar that
+# spans both levels counts as the invalidation.
+
+HORIZON = 500   # bars replayed after each analysis
+CHUNK = 4096    # scenarios per window block (bounds memory at CHUNK x HORIZON)
+OUTCOMES = np.array(["target", "invalidation", "open", "no_entry"])
+GROUP_BY = ("timeframe", "probability", "language")
+
+
+def scenario_table(records):
+    """
+    One row per trade scenario of the journaled analyses (AnalysisJournal.rows()).
+    Scenarios without a numeric target and invalidation are dropped.
+    """
+    rows = []
+    for r in records:
+        for i, s in enumerate(r["payload"].get("trade_scenarios") or []):
+            levels = trade_levels(s)
+            if levels is None:
+                continue
+            side, target, invalidation = levels
+            entry_low, entry_high = parse_zone(s.get("entry_zone"))
+            rows.append({
+                "key": r["key"], "scenario": i, "name": s.get("name"),
+                "exchange": r["exchange"], "symbol": r["symbol"], "timeframe": r["timeframe"],
+                "language": r["language"], "prompt_mode": r["prompt_mode"], "model": r["model"],
+                "prompt_version": r["prompt_version"], "probability": str(s.get("probability") or "n/a"),
+                "side": side, "entry_low": entry_low, "entry_high": entry_high,
+                "target": target, "invalidation": invalidation, "as_of": r["as_of"],
+            })
+    return pd.DataFrame(rows)
+
+
+def evaluate(start, end, side, entry_low, entry_high, target, invalidation, high, low,
+             horizon=HORIZON, require_entry=True):
+    """
+    Core of the backtest on plain arrays. Scenario i replays bars
+    high/low[start[i]:min(end[i], start[i] + horizon)].
+
+    With require_entry the levels only count from the first bar that trades
+    through the entry zone (scenarios without a parsable zone start at once).
+    Returns (outcome index into OUTCOMES, bars to the outcome, entry bar);
+    bars are 1-based counts after the analysis, -1 when not reached.
+    """
+    n = len(start)
+    outcome = np.full(n, 2, dtype=np.int8)
+    bars = np.full(n, -1, dtype=np.int64)
+    entry_bar = np.full(n, -1, dtype=np.int64)
+    steps = np.arange(horizon)
+    last = max(len(high) - 1, 0)
+
+    for lo_i in range(0, n, CHUNK):
+        sl = slice(lo_i, lo_i + CHUNK)
+        idx = start[sl, None] + steps
+        valid = idx < end[sl, None]
+        idx = np.minimum(idx, last)
+        hi, lo = high[idx], low[idx]
+        up = side[sl, None] == 1
+
+        if require_entry:
+            touched = valid & (lo <= entry_high[sl, None]) & (hi >= entry_low[sl, None])
+            no_zone = np.isnan(entry_low[sl])
+            first_entry = np.where(touched.any(axis=1), touched.argmax(axis=1), horizon)
+            first_entry[no_zone] = 0
+        else:
+            first_entry = np.zeros(len(idx), dtype=np.int64)
+        live = valid & (steps >= first_entry[:, None])
+
+        hit_target = live & np.where(up, hi >= target[sl, None], lo <= target[sl, None])
+        hit_stop = live & np.where(up, lo <= invalidation[sl, None], hi >= invalidation[sl, None])
+        first_target = np.where(hit_target.any(axis=1), hit_target.argmax(axis=1), horizon)
+        first_stop = np.where(hit_stop.any(axis=1), hit_stop.argmax(axis=1), horizon)
+
+        out = np.full(len(idx), 2, dtype=np.int8)
+        out[first_target < first_stop] = 0
+        out[(first_stop <= first_target) & (first_stop < horizon)] = 1
+        out[first_entry >= horizon] = 3
+        outcome[sl] = out
+        bars[sl] = np.where(out == 0, first_target + 1, np.where(out == 1, first_stop + 1, -1))
+        entry_bar[sl] = np.where(out == 3, -1, first_entry + 1)
+    return outcome, bars, entry_bar
+
+
+def run_backtest(journal, store, horizon=HORIZON, require_entry=True, **filters):
+    """
+    Evaluates every journaled scenario against the candles in the CandleStore.
+    filters: symbol / timeframe / since, passed to journal.rows().
+    Returns the scenario table with outcome, bars and entry_bar columns.
+    Scenarios of analyses journaled without a source exchange have no candle
+    series to replay: they are left out and counted in attrs['excluded'].
+    """
+    table = scenario_table(journal.rows(**filters))
+    excluded = int(table["exchange"].isna().sum()) if not table.empty else 0
+    if excluded:
+        table = table[table["exchange"].notna()].reset_index(drop=True)
+    if table.empty:
+        results = table.assign(outcome=[], bars=[], entry_bar=[], replayed=[])
+        results.attrs["excluded"] = excluded
+        return results
+
+    starts = np.zeros(len(table), dtype=np.int64)
+    ends = np.zeros(len(table), dtype=np.int64)
+    highs, lows, offset = [], [], 0
+    for (exchange, symbol, tf), group in table.groupby(["exchange", "symbol", "timeframe"], sort=False):
+        ts, high, low = store.arrays_since(exchange, symbol, tf, int(group["as_of"].min()))
+        # Replay starts at the first candle opened after the analysed one.
+        rows = group.index.to_numpy()
+        starts[rows] = offset + np.searchsorted(ts, group["as_of"].to_numpy(), side="right")
+        ends[rows] = offset + len(ts)
+        highs.append(high)
+        lows.append(low)
+        offset += len(ts)
+
+    high = np.concatenate(highs) if offset else np.zeros(1)
+    low = np.concatenate(lows) if offset else np.zeros(1)
+    outcome, bars, entry_bar = evaluate(
+        starts, ends, table["side"].to_numpy(), table["entry_low"].to_numpy(float),
+        table["entry_high"].to_numpy(float), table["target"].to_numpy(float),
+        table["invalidation"].to_numpy(float), high, low, horizon, require_entry,
+    )
+    results = table.assign(outcome=OUTCOMES[outcome], bars=bars, entry_bar=entry_bar, replayed=ends - starts)
+    results.attrs["excluded"] = excluded
+    return results
+
+
+def hit_rates(results, by=GROUP_BY):
+    """
+    Outcome counts per group; hit_rate = target / (target + invalidation),
+    so scenarios still open or never entered do not dilute it.
+    """
+    by = list(by)
+    if results.empty:
+        return pd.DataFrame(columns=by + ["scenarios", *OUTCOMES, "hit_rate", "median_bars"])
+    counts = pd.crosstab([results[c] for c in by], results["outcome"]).reindex(columns=OUTCOMES, fill_value=0)
+    counts.columns = list(OUTCOMES)
+    counts.insert(0, "scenarios", counts.sum(axis=1))
+    decided = counts["target"] + counts["invalidation"]
+    counts["hit_rate"] = (counts["target"] / decided.where(decided > 0)).round(3)
+    counts["median_bars"] = results[results["outcome"] == "target"].groupby(by)["bars"].median()
+    return counts.reset_index()
@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from .scenarios import parse_zone
+from .trace import span
+
+# ==========================================
+# CHART BUILDER (DOWNSAMPLED + WEBGL)
+# ==========================================
+# Candles are aggregated OHLC-aware down to MAX_CANDLES buckets, so highs and
+# lows survive zooming out. Past WEBGL_ABOVE bars the price is drawn as a
+# WebGL line (LTTB-downsampled) instead of candles. plotly is imported by the
+# functions that build traces, so the downsampling helpers stay import-light.
+
+MAX_CANDLES = 1500
+WEBGL_ABOVE = 5000
+MAX_LINE_POINTS = 2000
+
+UP_COLOR, DOWN_COLOR = '#00E676', '#FF5252'
+SCENARIO_COLORS = ['#00E676', '#FFAB00', '#40C4FF', '#FF4081']
+WAVE_LABELS = {
+    "impulse": ["0", "1", "2", "3", "4", "5"],
+    "diagonal": ["0", "1", "2", "3", "4", "5"],
+    "zigzag": ["0", "A", "B", "C"],
+    "flat": ["0", "A", "B", "C"],
+}
+
+
+def downsample_ohlc(df, max_bars=MAX_CANDLES):
+    """
+    Merges consecutive candles into at most `max_bars` buckets: first open,
+    max high, min low, last close, summed volume, time of the first bar.
+    Buckets are aligned to the newest bar, so only the oldest one is partial.
+    """
+    n = len(df)
+    if n <= max_bars:
+        return df
+    step = -(-n // max_bars)
+    starts = np.arange(n % step, n, step)
+    if n % step:
+        starts = np.concatenate(([0], starts))
+    ends = np.concatenate((starts[1:] - 1, [n - 1]))
+    out = pd.DataFrame({
+        'time': df['time'].to_numpy()[starts],
+        'open': df['open'].to_numpy(dtype=float)[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(dtype=float), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(dtype=float), starts),
+        'close': df['close'].to_numpy(dtype=float)[ends],
+        'volume': np.add.reduceat(df['volume'].to_numpy(dtype=float), starts),
+    })
+    out.attrs['bars_per_candle'] = step
+    return out
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the
+    visual shape of the (x, y) line. First and last points are always kept.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        nxt_lo, nxt_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+
+def add_scenarios(fig, scenarios):
+    """
+    Target (dash), invalidation (dot) and entry zone of every trade scenario.
+    """
+    for i, s in enumerate(scenarios or []):
+        color = s.get('color') or SCENARIO_COLORS[i % len(SCENARIO_COLORS)]
+        name = s.get('name', f"Scenario {i + 1}")
+        for key, dash, tag in (('target', 'dash', 'TP'), ('invalidation', 'dot', 'SL')):
+            try:
+                level = float(s.get(key))
+            except (TypeError, ValueError):
+                continue
+            fig.add_hline(y=level, line_dash=dash, line_color=color, opacity=0.9 if i == 0 else 0.5,
+                          row=1, col=1, annotation_text=f"{name} {tag}", annotation_font_color=color)
+        low, high = parse_zone(s.get('entry_zone'))
+        if low < high:
+            fig.add_hrect(y0=low, y1=high, fillcolor=color, opacity=0.08, line_width=0, row=1, col=1)
+
+
+def add_waves(fig, pivots, counts=None):
+    """
+    ZigZag pivots as one WebGL line, plus wave labels of the best count.
+    """
+    import plotly.graph_objects as go
+    if pivots is None or pivots.empty:
+        return
+    fig.add_trace(go.Scattergl(
+        x=pivots['time'], y=pivots['price'], mode='lines+markers', name="Pivots",
+        line=dict(color='#B0BEC5', width=1), marker=dict(size=5, color='#B0BEC5'),
+    ), row=1, col=1)
+    if counts is None or counts.empty:
+        return
+    best = counts.iloc[0]
+    labels = WAVE_LABELS.get(best['pattern'], [])
+    legs = pivots.iloc[int(best['start']):int(best['end']) + 1]
+    up = (legs['kind'] == 'H').to_numpy()
+    fig.add_trace(go.Scatter(
+        x=legs['time'], y=legs['price'], mode='lines+markers+text', name=f"{best['pattern']} ({best['direction']})",
+        text=labels[:len(legs)], textposition=np.where(up, 'top center', 'bottom center'),
+        line=dict(color='#7C4DFF', width=2), textfont=dict(color='#E0E0E0', size=13),
+    ), row=1, col=1)
+
+
+def add_confluence(fig, fib, zones=5, time_targets=3):
+    if not fib:
+        return
+    for z in fib["zones"].head(zones).itertuples():
+        fig.add_hrect(y0=z.low, y1=z.high, fillcolor="#7c4dff", opacity=0.15, line_width=0, row=1, col=1)
+    for t in fib["time_targets"].head(time_targets).itertuples():
+        fig.add_vline(x=pd.Timestamp(t.time).to_pydatetime(), line_dash="dot", line_color="#7c4dff", opacity=0.6)
+
+
+def add_levels(fig, sr, top=6):
+    """
+    Strongest support (green) / resistance (red) zones and the volume POC.
+    """
+    if not sr:
+        return
+    for z in sr["levels"].head(top).itertuples():
+        color = UP_COLOR if z.kind == 'support' else DOWN_COLOR
+        fig.add_hrect(y0=z.low, y1=z.high, fillcolor=color, opacity=0.12, line_width=0, row=1, col=1,
+                      annotation_text=f"{z.kind[0].upper()} ×{z.touches}", annotation_position="left",
+                      annotation_font_color=color)
+    if sr["poc"] is not None:
+        fig.add_hline(y=sr["poc"], line_dash="dashdot", line_color="#FFD740", opacity=0.6, row=1, col=1,
+                      annotation_text="POC", annotation_position="bottom left", annotation_font_color="#FFD740")
+
+
+def build_chart(df, title="", pivots=None, counts=None, scenarios=None, fib=None, levels=None,
+                max_candles=MAX_CANDLES, webgl_above=WEBGL_ABOVE):
+    """
+    Price + volume figure for any number of bars. Volume colors are computed
+    on whole arrays; pivots/counts come from pivots.zigzag / elliott.current_counts,
+    levels from levels.sr_levels.
+    """
+    with span("chart.build", bars=len(df)) as s:
+        fig = _build_chart(df, title, pivots, counts, scenarios, fib, levels, max_candles, webgl_above)
+        s["traces"] = len(fig.data)
+    return fig
+
+
+def _build_chart(df, title, pivots, counts, scenarios, fib, levels, max_candles, webgl_above):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
+    view = downsample_ohlc(df, max_candles)
+
+    if len(df) > webgl_above:
+        keep = lttb(df['time'].to_numpy().astype('int64'), df['close'].to_numpy(dtype=float), MAX_LINE_POINTS)
+        fig.add_trace(go.Scattergl(x=df['time'].to_numpy()[keep], y=df['close'].to_numpy()[keep],
+                                   mode='lines', name="Close", line=dict(color='#90CAF9', width=1)), row=1, col=1)
+    else:
+        fig.add_trace(go.Candlestick(x=view['time'], open=view['open'], high=view['high'], low=view['low'],
+                                     close=view['close'], name="Price"), row=1, col=1)
+    colors = np.where(view['close'].to_numpy() >= view['open'].to_numpy(), UP_COLOR, DOWN_COLOR)
+    fig.add_trace(go.Bar(x=view['time'], y=view['volume'], marker_color=colors, name="Volume"), row=2, col=1)
+
+    add_waves(fig, pivots, counts)
+    add_scenarios(fig, scenarios)
+    add_confluence(fig, fib)
+    add_levels(fig, levels)
+
+    step = view.attrs.get('bars_per_candle', 1)
+    if step > 1:
+        title = f"{title}  ·  {step}x aggregated"
+    fig.update_layout(height=600, template="plotly_dark", title=title, xaxis_rangeslider_visible=False)
+    return fig
@@ -0,0 +1,101 @@
+import json
+import time
+
+from .llm import record_usage
+from .prompt import estimate_tokens
+from .streaming import iter_text
+from .trace import span
+
+# ==========================================
+# STATEFUL CHAT ABOUT ONE ANALYSIS
+# ==========================================
+# One start_chat session per analysis. The analysis JSON is sent once as the
+# opening turn; older question/answer pairs are folded into a short summary
+# once the history passes HISTORY_TOKEN_BUDGET, so every turn costs about
+# the same no matter how long the conversation gets.
+
+HISTORY_TOKEN_BUDGET = 2000
+KEEP_RECENT_TURNS = 2  # question/answer pairs always kept verbatim
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation about an Elliott Wave analysis in at most 120 words. "
+    "Keep every price level, wave label and conclusion; drop pleasantries.\n\n{text}"
+)
+
+
+def _turn(role, text):
+    return {"role": role, "parts": [text]}
+
+
+class ChatSession:
+    """
+    Wraps model.start_chat() for one analysis. ask() streams the reply text;
+    `stats` holds the estimated prompt tokens and latency of each turn.
+    """
+
+    def __init__(self, model, analysis, budget=HISTORY_TOKEN_BUDGET, keep_recent=KEEP_RECENT_TURNS):
+        self.model = model
+        self.budget = budget
+        self.keep_recent = keep_recent
+        context = {
+            "macro": analysis.get('macro_analysis'),
+            "micro": analysis.get('micro_analysis'),
+            "scenarios": analysis.get('trade_scenarios'),
+        }
+        self.context = [
+            _turn("user", f"You are an Elliott Wave expert. Answer questions about this analysis: {json.dumps(context)}"),
+            _turn("model", "Understood. Ask me about this wave count."),
+        ]
+        self.context_tokens = estimate_tokens(self.context[0]["parts"][0])
+        self.summary = None
+        self.turns = []  # [(question, answer)] not yet summarized
+        self.stats = []
+        self._restart()
+
+    def _history(self):
+        history = list(self.context)
+        if self.summary:
+            history += [_turn("user", f"Summary of our earlier conversation: {self.summary}"), _turn("model", "Noted.")]
+        for q, a in self.turns:
+            history += [_turn("user", q), _turn("model", a)]
+        return history
+
+    def _restart(self):
+        self.chat = self.model.start_chat(history=self._history())
+
+    def history_tokens(self):
+        text = (self.summary or "") + "".join(q + a for q, a in self.turns)
+        return estimate_tokens(text)
+
+    def _compact(self):
+        """
+        Folds all but the newest `keep_recent` pairs into the summary.
+        """
+        if self.history_tokens() <= self.budget or len(self.turns) <= self.keep_recent:
+            return
+        old, self.turns = self.turns[:-self.keep_recent], self.turns[-self.keep_recent:]
+        text = "\n".join(f"Q: {q}\nA: {a}" for q, a in old)
+        if self.summary:
+            text = f"Earlier summary: {self.summary}\n{text}"
+        with span("chat.summarize", turns=len(old)):
+            self.summary = self.model.generate_content(SUMMARY_PROMPT.format(text=text)).text.strip()
+        self._restart()
+
+    def ask(self, question, language="English"):
+        """
+        Sends one question and yields the reply text chunk by chunk. The turn
+        is recorded (and the history compacted) once the reply is complete.
+        """
+        message = f"{question}\n(Answer in {language}.)"
+        prompt_tokens = self.context_tokens + self.history_tokens() + estimate_tokens(message)
+        started = time.perf_counter()
+        answer = []
+        with span("chat.turn", turn=len(self.stats) + 1) as s:
+            response = self.chat.send_message(message, stream=True)
+            for text in iter_text(response):
+                answer.append(text)
+                yield text
+            record_usage(s, "chat", response, prompt_tokens, "".join(answer))
+        self.turns.append((message, "".join(answer)))
+        self.stats.append({"tokens": prompt_tokens, "seconds": round(time.perf_counter() - started, 2)})
+        self._compact()
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import sys
+
+# ==========================================
+# HEADLESS CLI (wave-counter / python -m wave_counter)
+# ==========================================
+# Subcommands import what they use, so `wave-counter scan --top 0` never
+# loads google-generativeai and only --pdf loads fpdf.
+
+
+def _models(fake):
+    from .llm import FakeBackend, GeminiBackend, ModelManager
+    if fake:
+        return ModelManager(FakeBackend())
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise SystemExit("GOOGLE_API_KEY is not set (or pass --fake).")
+    return ModelManager(GeminiBackend(api_key))
+
+
+def _report_path(directory, symbol, tf):
+    return os.path.join(directory, f"{symbol.replace('/', '_')}_{tf}_Analysis.pdf")
+
+
+def analyze(args):
+    from .analysis import analyze_deep_wave
+    from .analysis_cache import AnalysisCache
+    from .data import load_analysis_frames
+    from .fibonacci import fib_confluence
+    from .journal import AnalysisJournal
+    from .store import CandleStore
+
+    symbol = args.symbol.upper().strip()
+    bundle = load_analysis_frames(symbol, args.tf, store=CandleStore())
+    if not bundle.ok:
+        for tf, err in bundle.failures().items():
+            print(f"{tf}: {err}", file=sys.stderr)
+        return 1
+    d1w, d1d, dm = bundle.weekly.df, bundle.daily.df, bundle.micro.df
+    fib = fib_confluence({"1W": d1w, "1D": d1d, args.tf: dm}, args.tf)
+    ai = analyze_deep_wave(
+        _models(args.fake), symbol, args.tf, d1w, d1d, dm, args.lang,
+        prompt_mode=args.prompt, confluence=fib, cache=None if args.no_cache else AnalysisCache(),
+        journal=AnalysisJournal(),
+    )
+
+    if args.pdf:
+        from .report import build_report
+        os.makedirs(args.pdf, exist_ok=True)
+        with open(_report_path(args.pdf, symbol, args.tf), "wb") as f:
+            f.write(build_report(ai, symbol, args.tf, dm))
+
+    if args.json:
+        print(json.dumps(ai, indent=2, ensure_ascii=False))
+        return 0
+    macro = ai.get('macro_analysis', {})
+    print(f"{symbol} {args.tf}  ({bundle.micro.exchange})")
+    print(f"Macro: {macro.get('trend')} - {macro.get('current_structure')}")
+    print(f"Micro: {ai.get('micro_analysis', {}).get('wave_count_status')}")
+    for s in ai.get('trade_scenarios', []):
+        print(f"  {s.get('name')} ({s.get('trade_type')}, {s.get('probability')}): "
+              f"entry {s.get('entry_zone')}  target {s.get('target')}  invalidation {s.get('invalidation')}")
+    return 0
+
+
+def scan(args):
+    from .analysis_cache import AnalysisCache
+    from .journal import AnalysisJournal
+    from .scanner import scan_watchlist
+    from .store import CandleStore
+
+    reports = []
+    if args.pdf:
+        from .report import ReportBuilder
+        builder = ReportBuilder(max_workers=args.workers)
+        os.makedirs(args.pdf, exist_ok=True)
+
+    def queue_report(sym, tf, ai, df):
+        reports.append((_report_path(args.pdf, sym, tf), builder.submit(ai, sym, tf, df)))
+
+    table = scan_watchlist(
+        [s.upper().strip() for s in args.symbols], args.tf, _models(args.fake) if args.top > 0 else None,
+        args.lang, args.top, args.per_exchange, args.workers, store=CandleStore(), cache=AnalysisCache(),
+        on_analysis=queue_report if args.pdf else None, journal=AnalysisJournal(),
+    )
+    for path, job in reports:
+        with open(path, "wb") as f:
+            f.write(job.result())
+    if args.json:
+        print(table.to_json(orient="records", indent=2))
+    else:
+        print(table.to_string(index=False))
+    return 0
+
+
+def backtest(args):
+    from .backtest import hit_rates, run_backtest
+    from .data import fetch_forward
+    from .journal import AnalysisJournal
+    from .store import CandleStore
+
+    journal, store = AnalysisJournal(), CandleStore()
+    if args.refresh:
+        for exchange_id, symbol, tf, first in journal.series():
+            try:
+                # Page forward so the replay window reaches the present.
+                fetch_forward(store, exchange_id, symbol, tf, first)
+            except Exception as e:
+                print(f"{symbol} {tf}: {e}", file=sys.stderr)
+    results = run_backtest(journal, store, args.horizon, not args.no_entry, symbol=args.symbol and args.symbol.upper(), timeframe=args.tf)
+    table = hit_rates(results, args.by)
+    if args.json:
+        print(table.to_json(orient="records", indent=2))
+    else:
+        print(f"{len(results)} scenarios from {results['key'].nunique() if len(results) else 0} analyses")
+        if results.attrs.get("excluded"):
+            print(f"{results.attrs['excluded']} scenarios not replayed (no source exchange journaled)")
+        print(table.to_string(index=False))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="wave-counter", description="Elliott Wave analysis without the Streamlit UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="analyze one symbol (1W + 1D + micro timeframe)")
+    p.add_argument("symbol", help="e.g. BTC/USDT")
+    p.add_argument("--tf", default="15m", help="micro timeframe")
+    p.add_argument("--prompt", default="pivots", choices=["pivots", "compact", "candles"], help="prompt data mode")
+    p.add_argument("--no-cache", action="store_true", help="skip the on-disk analysis cache")
+    p.set_defaults(func=analyze)
+
+    p = sub.add_parser("scan", help="pre-screen a watchlist locally, analyze the top N")
+    p.add_argument("symbols", nargs="+", help="e.g. BTC/USDT ETH/USDT")
+    p.add_argument("--tf", nargs="+", default=["15m"], help="micro timeframes")
+    p.add_argument("--top", type=int, default=5, help="symbols sent to the LLM (0 = local screen only)")
+    p.add_argument("--workers", type=int, default=3, help="concurrent LLM analyses")
+    p.add_argument("--per-exchange", type=int, default=4, help="concurrent requests per exchange")
+    p.set_defaults(func=scan)
+
+    for p in sub.choices.values():
+        p.add_argument("--lang", default="English", choices=["English", "Singlish"])
+        p.add_argument("--fake", action="store_true", help="use the local fake LLM backend")
+        p.add_argument("--pdf", metavar="DIR", help="write PDF report(s) into DIR")
+
+    p = sub.add_parser("backtest", help="score journaled trade scenarios against the candles that followed")
+    p.add_argument("--symbol", help="only this symbol")
+    p.add_argument("--tf", help="only this micro timeframe")
+    p.add_argument("--horizon", type=int, default=500, help="bars replayed after each analysis")
+    p.add_argument("--no-entry", action="store_true", help="count levels from the analysis bar, not from the entry fill")
+    p.add_argument("--by", nargs="+", default=["timeframe", "probability", "language"], help="hit-rate grouping")
+    p.add_argument("--refresh", action="store_true", help="fetch the candles since each series' first analysis")
+    p.set_defaults(func=backtest)
+
+    for p in sub.choices.values():
+        p.add_argument("--json", action="store_true", help="print JSON instead of a summary")
+        p.add_argument("--timings", action="store_true", help="print per-stage timings to stderr")
+        p.add_argument("--trace-jsonl", metavar="FILE", help="append every traced span to FILE")
+        p.add_argument("--metrics", metavar="FILE", help="write Prometheus text metrics to FILE")
+    return parser
+
+
+def main(argv=None):
+    from .trace import TRACER
+    args = build_parser().parse_args(argv)
+    if args.trace_jsonl:
+        TRACER.jsonl_path = args.trace_jsonl
+    try:
+        return args.func(args)
+    finally:
+        if args.metrics:
+            TRACER.write_prometheus(args.metrics)
+        if args.timings:
+            for row in TRACER.summary():
+                print(f"{row['stage']:<16} {row['calls']:>4} calls  {row['total_s']:>8.3f}s  "
+                      f"p95 {row['p95_s']}s  {row['errors']} errors", file=sys.stderr)
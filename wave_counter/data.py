@@ -0,0 +1,412 @@
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .exchanges import get_pool, normalize_symbol
+from .resample import MAX_STALE_MS, covers, derive_from_store, timeframe_ms
+from .singleflight import get_flights
+from .trace import count, span
+
+# ==========================================
+# MARKET DATA (EXCHANGES -> OHLCV)
+# ==========================================
+# ccxt is imported inside the functions that talk to exchanges: it is slow to
+# import and not needed to analyze frames that are already loaded.
+# Async requests go through the shared exchanges.ExchangePool (long-lived
+# clients, markets loaded once) and only to exchanges that list the symbol.
+# Identical fetches already in flight are joined, not repeated (singleflight),
+# and frames a finer stored series covers are built locally (resample).
+
+# Fallback order. The hedged fetch starts them in this order too.
+EXCHANGE_IDS = ["binance", "okx", "kraken", "kucoin"]
+OHLCV_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+# Seconds to wait on an exchange before also asking the next one.
+HEDGE_DELAY = 0.35
+
+
+def bars_to_df(bars, exchange_id=None):
+    """
+    Converts raw ccxt OHLCV rows into the DataFrame used across the app.
+    The source exchange is kept in df.attrs['exchange'].
+    """
+    df = pd.DataFrame(bars, columns=OHLCV_COLUMNS)
+    df['time'] = pd.to_datetime(df['time'], unit='ms')
+    df.attrs['exchange'] = exchange_id
+    return df
+
+
+def fetch_ohlcv_sequential(symbol, timeframe, limit=1000):
+    """
+    Tries each exchange that lists the symbol one after another (pooled
+    clients, see _fetch_from) and returns the first non-empty frame.
+    """
+    pool = get_pool()
+    for exchange_id, _ in pool.route(symbol, EXCHANGE_IDS):
+        try:
+            _, bars = pool.run(_fetch_from(exchange_id, symbol, timeframe, limit))
+        except Exception:
+            continue
+        return bars_to_df(bars, exchange_id)
+    return pd.DataFrame()
+
+
+# --- HEDGED (ASYNC) FETCH ---
+class ExchangeLimiter:
+    """
+    Caps concurrent OHLCV requests per exchange (one asyncio.Semaphore each).
+    Create it inside the event loop that uses it.
+    """
+
+    def __init__(self, per_exchange=4):
+        self.per_exchange = per_exchange
+        self._semaphores = {}
+
+    def __call__(self, exchange_id):
+        if exchange_id not in self._semaphores:
+            self._semaphores[exchange_id] = asyncio.Semaphore(self.per_exchange)
+        return self._semaphores[exchange_id]
+
+
+async def _fetch_from(exchange_id, symbol, timeframe, limit, since=None, limiter=None):
+    pool = get_pool()
+    async with (limiter(exchange_id) if limiter else contextlib.nullcontext()):
+        with span("fetch.exchange", exchange=exchange_id, symbol=symbol, timeframe=timeframe,
+                  incremental=since is not None) as s:
+            async with pool.session(exchange_id) as exchange:
+                market = pool.market_symbol(exchange, exchange_id, symbol)
+                bars = await exchange.fetch_ohlcv(market, timeframe=timeframe, since=since, limit=limit)
+            s["bars"] = len(bars)
+            if not bars:
+                raise ValueError(f"{exchange_id} returned no candles")
+            return exchange_id, bars
+
+
+async def race_ohlcv(symbol, timeframe, limit=1000, hedge_delay=HEDGE_DELAY, limiter=None):
+    """
+    Races the exchanges and returns (exchange_id, bars) from the first valid answer.
+
+    Exchanges are started in EXCHANGE_IDS order, each one `hedge_delay` seconds
+    after the previous (0 = all at once). A failed exchange immediately starts
+    the next one. Requests still running when a winner arrives are cancelled.
+    Returns (None, []) when every exchange fails.
+    Only exchanges that list the symbol are asked (see ExchangePool.route).
+    limiter: optional ExchangeLimiter shared by concurrent fetches.
+    """
+    waiting = [exchange_id for exchange_id, _ in get_pool().route(symbol, EXCHANGE_IDS)]
+    running = set()
+    if not waiting:
+        return None, []
+
+    def start_next():
+        exchange_id = waiting.pop(0)
+        running.add(asyncio.create_task(
+            _fetch_from(exchange_id, symbol, timeframe, limit, limiter=limiter), name=exchange_id
+        ))
+
+    start_next()
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running,
+                timeout=hedge_delay if waiting else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                running.discard(task)
+                if task.exception() is None:
+                    return task.result()
+            # Hedge timer fired, or an exchange failed: bring in the next one.
+            if waiting:
+                start_next()
+        return None, []
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+# --- INCREMENTAL SYNC WITH THE CANDLE STORE ---
+async def sync_ohlcv(store, symbol, timeframe, limit=1000, hedge_delay=HEDGE_DELAY, limiter=None):
+    """
+    Returns (exchange_id, bars) for the newest `limit` candles, downloading only
+    what the CandleStore is missing.
+
+    When the store already holds `limit` candles and the gap to now fits in one
+    request, only the bars from the last stored timestamp onward are fetched
+    (`since` is inclusive, so the still-open bar is refreshed too). Otherwise
+    it falls back to a full hedged fetch. Either way the result is upserted.
+    """
+    exchange_id, last_ts, stored = store.latest(symbol, timeframe, cap=limit)
+    if exchange_id and stored >= limit:
+        missing = (int(time.time() * 1000) - last_ts) // timeframe_ms(timeframe) + 1
+        if missing <= limit:
+            try:
+                _, bars = await _fetch_from(exchange_id, symbol, timeframe, limit, since=last_ts, limiter=limiter)
+            except Exception:
+                bars = []
+            if bars:
+                store.upsert(exchange_id, symbol, timeframe, bars)
+                count("cache", cache="candle_store", result="hit")
+                return exchange_id, store.load(exchange_id, symbol, timeframe, limit)
+
+    count("cache", cache="candle_store", result="miss")
+    exchange_id, bars = await race_ohlcv(symbol, timeframe, limit, hedge_delay, limiter)
+    if bars:
+        store.upsert(exchange_id, symbol, timeframe, bars)
+    return exchange_id, bars
+
+
+async def _fetch_latest(symbol, timeframe, limit, hedge_delay, store, limiter=None, synced=None):
+    if store is not None:
+        # synced: base timeframes this load has just fetched, so fresh at any bar length.
+        # SQLite reads and the resample run off the pool's event loop.
+        derived = await asyncio.to_thread(derive_from_store, store, symbol, timeframe, limit, bases=synced,
+                                          max_stale_ms=None if synced else MAX_STALE_MS)
+        if derived:
+            return derived
+    # Sessions loading the same frame at once share one request.
+    key = f"ohlcv:{normalize_symbol(symbol)}:{timeframe}:{limit}:{'store' if store is not None else 'race'}"
+    if store is None:
+        return await get_flights().run_async(key, lambda: race_ohlcv(symbol, timeframe, limit, hedge_delay, limiter))
+    # After waiting on another process's lease, its sync is read back from the store.
+    return await get_flights().run_async(key, lambda: sync_ohlcv(store, symbol, timeframe, limit, hedge_delay, limiter),
+                                         recheck=lambda: stored_ohlcv(store, symbol, timeframe, limit))
+
+
+def stored_ohlcv(store, symbol, timeframe, limit):
+    """
+    (exchange_id, bars) of the newest `limit` stored candles when the store
+    holds that many up to the currently open bar, else None.
+    """
+    exchange_id, last_ts, stored = store.latest(symbol, timeframe, cap=limit)
+    if not exchange_id or stored < limit or last_ts + timeframe_ms(timeframe) <= time.time() * 1000:
+        return None
+    return exchange_id, store.load(exchange_id, symbol, timeframe, limit)
+
+
+def fetch_ohlcv_hedged(symbol, timeframe, limit=1000, hedge_delay=HEDGE_DELAY, store=None):
+    """
+    Sync wrapper around race_ohlcv (or sync_ohlcv when a store is given)
+    for the Streamlit script thread.
+    """
+    exchange_id, bars = get_pool().run(_fetch_latest(symbol, timeframe, limit, hedge_delay, store))
+    if not bars:
+        return pd.DataFrame()
+    return bars_to_df(bars, exchange_id)
+
+
+def price_tick(symbol, df):
+    """
+    Price tick of `symbol` on the exchange that served `df`
+    (df.attrs['exchange']), from its loaded markets; None when unknown.
+    """
+    exchange_id = df.attrs.get('exchange')
+    return get_pool().tick_size(exchange_id, symbol) if exchange_id else None
+
+
+def fetch_since(exchange_id, symbol, timeframe, since, limit=1000, store=None):
+    """
+    Candles from `since` (ms, inclusive) onward from one exchange, as raw ccxt
+    rows; used by live mode to poll the exchange that served the frame.
+    """
+    _, bars = get_pool().run(_fetch_from(exchange_id, symbol, timeframe, limit, since=since))
+    if store is not None:
+        store.upsert(exchange_id, symbol, timeframe, bars)
+    return bars
+
+
+def fetch_forward(store, exchange_id, symbol, timeframe, since, page_limit=1000, max_pages=200):
+    """
+    Pages fetch_since forward from `since` (ms) to the currently open bar,
+    upserting every page into the store; returns the number of bars fetched.
+    Stops early when a page does not advance or after max_pages.
+    """
+    step = timeframe_ms(timeframe)
+    fetched = 0
+    for _ in range(max_pages):
+        bars = fetch_since(exchange_id, symbol, timeframe, since, page_limit, store)
+        fetched += len(bars)
+        if bars[-1][0] <= since or bars[-1][0] + step > time.time() * 1000:
+            break
+        since = bars[-1][0]
+    return fetched
+
+
+# --- MULTI-TIMEFRAME LOADER ---
+# (label, timeframe, limit) used by one "Analyze Structure" run. None = micro tf.
+ANALYSIS_FRAMES = [("weekly", "1w", 200), ("daily", "1d", 300), ("micro", None, 1000)]
+
+
+@dataclass
+class TimeframeResult:
+    timeframe: str
+    limit: int
+    df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    exchange: str = None
+    error: str = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None and not self.df.empty
+
+
+@dataclass
+class MultiTimeframeBundle:
+    symbol: str
+    weekly: TimeframeResult
+    daily: TimeframeResult
+    micro: TimeframeResult
+
+    @property
+    def ok(self):
+        # The analysis can run without the daily frame, not without weekly/micro.
+        return self.weekly.ok and self.micro.ok
+
+    def results(self):
+        return [self.weekly, self.daily, self.micro]
+
+    def failures(self):
+        return {r.timeframe: r.error for r in self.results() if not r.ok}
+
+
+async def load_frame(symbol, timeframe, limit, hedge_delay=HEDGE_DELAY, store=None, limiter=None, synced=None):
+    """
+    Fetches one frame as a TimeframeResult; errors are captured, not raised.
+    With a store the frame may be resampled from a finer stored series instead.
+    """
+    started = time.perf_counter()
+    with span("fetch.frame", symbol=symbol, timeframe=timeframe, limit=limit) as s:
+        try:
+            exchange_id, bars = await _fetch_latest(symbol, timeframe, limit, hedge_delay, store, limiter, synced)
+        except Exception as e:
+            exchange_id, bars = None, []
+            error = str(e)
+        else:
+            error = None if bars else _no_data_reason(symbol)
+        s.update(exchange=exchange_id, bars=len(bars))
+        if error:
+            s["error"] = error
+    return TimeframeResult(
+        timeframe=timeframe,
+        limit=limit,
+        df=bars_to_df(bars, exchange_id) if bars else pd.DataFrame(),
+        exchange=exchange_id,
+        error=error,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def _no_data_reason(symbol):
+    if not get_pool().route(symbol, EXCHANGE_IDS):
+        return f"{symbol} is not listed on {', '.join(EXCHANGE_IDS)}"
+    return "All exchanges failed"
+
+
+async def load_frames_async(symbol, micro_tf, hedge_delay=HEDGE_DELAY, store=None, limiter=None):
+    """
+    Fetches the 1W, 1D and micro frames concurrently on one event loop.
+
+    A frame the store can build from a finer frame of this load (e.g. 1W
+    from a backfilled 1D) waits for that frame's sync and is resampled from
+    it instead of fetched.
+    """
+    specs = {label: (tf or micro_tf, limit) for label, tf, limit in ANALYSIS_FRAMES}
+    base_of = {}  # label -> label of its base frame; a base is never derived itself
+
+    def plan():
+        for label, (tf, limit) in sorted(specs.items(), key=lambda item: timeframe_ms(item[1][0])):
+            base = next((other for other, (b, _) in specs.items()
+                         if other not in base_of and covers(store, symbol, tf, limit, b)), None)
+            if base:
+                base_of[label] = base
+
+    if store is not None:
+        await asyncio.to_thread(plan)
+
+    async def load(label):
+        tf, limit = specs[label]
+        synced = None
+        if label in base_of:
+            await tasks[base_of[label]]
+            synced = [specs[base_of[label]][0]]
+        return await load_frame(symbol, tf, limit, hedge_delay, store, limiter, synced)
+
+    tasks = {label: asyncio.ensure_future(load(label)) for label in specs}
+    results = await asyncio.gather(*tasks.values())
+    return MultiTimeframeBundle(symbol=symbol, **dict(zip(tasks, results)))
+
+
+def load_analysis_frames(symbol, micro_tf, hedge_delay=HEDGE_DELAY, store=None):
+    """
+    Sync wrapper around load_frames_async. Never raises for fetch errors;
+    check bundle.ok / bundle.failures() instead.
+    """
+    return get_pool().run(load_frames_async(symbol, micro_tf, hedge_delay, store))
+
+
+# --- DEEP HISTORY BACKFILL ---
+@dataclass
+class BackfillReport:
+    exchange: str
+    symbol: str
+    timeframe: str
+    pages: int = 0
+    candles: int = 0
+    # (last_ts_before_gap, first_ts_after_gap, missing_bars) over everything stored
+    gaps: list = field(default_factory=list)
+
+
+def find_gaps(timestamps, step_ms):
+    """
+    Returns (before_ts, after_ts, missing_bars) for every hole in a sorted ms series.
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    if ts.size < 2:
+        return []
+    deltas = np.diff(ts)
+    idx = np.flatnonzero(deltas > step_ms)
+    return [(int(ts[i]), int(ts[i + 1]), int(deltas[i] // step_ms) - 1) for i in idx]
+
+
+async def backfill_async(store, exchange_id, symbol, timeframe, start_ts=0, page_limit=500, max_pages=200):
+    """
+    Pages backwards from the oldest stored candle (or now) until start_ts,
+    writing each page straight into the CandleStore.
+
+    The pooled exchange client is used for every page so ccxt's rate limiter
+    spaces the requests. Stops on an empty page (listing date reached, or the
+    exchange ignores `since` that far back) or after max_pages.
+    """
+    pool = get_pool()
+    step = timeframe_ms(timeframe)
+    report = BackfillReport(exchange_id, symbol, timeframe)
+    cursor = store.first_timestamp(exchange_id, symbol, timeframe) or int(time.time() * 1000)
+
+    async with pool.session(exchange_id) as exchange:
+        market = pool.market_symbol(exchange, exchange_id, symbol)
+        while report.pages < max_pages and cursor > start_ts:
+            since = max(start_ts, cursor - page_limit * step)
+            bars = await exchange.fetch_ohlcv(market, timeframe=timeframe, since=since, limit=page_limit)
+            report.pages += 1
+            bars = [b for b in bars if b[0] < cursor]
+            if not bars:
+                break
+            store.upsert(exchange_id, symbol, timeframe, bars)
+            report.candles += len(bars)
+            cursor = bars[0][0]
+
+    report.gaps = find_gaps(store.timestamps(exchange_id, symbol, timeframe), step)
+    return report
+
+
+def backfill_history(store, exchange_id, symbol, timeframe, start_ts=0, page_limit=500, max_pages=200):
+    """
+    Sync wrapper around backfill_async.
+    """
+    return get_pool().run(backfill_async(store, exchange_id, symbol, timeframe, start_ts, page_limit, max_pages))
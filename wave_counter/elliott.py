@@ -0,0 +1,261 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ==========================================
+# LOCAL ELLIOTT WAVE RULE ENGINE
+# ==========================================
+# Hard rules from knowledge.py (PART 2 / PART 3). Ids are shared by the
+# vectorized enumerator and the scalar validator below.
+RULES = {
+    "wrong_direction": "Waves do not alternate in direction",
+    "w2_beyond_w1_start": "Wave 2 retraced more than 100% of wave 1",
+    "w3_not_beyond_w1": "Wave 3 did not move beyond the end of wave 1",
+    "w3_shortest": "Wave 3 is the shortest actionary wave",
+    "w4_overlaps_w1": "Wave 4 entered wave 1 price territory",
+    "diagonal_no_overlap": "Diagonal without wave 4 overlapping wave 1",
+    "diagonal_shape": "Diagonal waves neither contract nor expand",
+    "b_beyond_a_start": "Wave B retraced more than 100% of wave A",
+    "c_not_beyond_a": "Wave C did not move beyond the end of wave A",
+    "b_too_shallow_for_flat": "Wave B retraced less than 90% of wave A",
+}
+
+# Waves (pivots - 1) in a complete pattern
+PATTERN_WAVES = {"impulse": 5, "diagonal": 5, "zigzag": 3, "flat": 3}
+
+COUNT_COLUMNS = [
+    'pattern', 'direction', 'waves', 'complete', 'start', 'end', 'start_time', 'end_time',
+    'points', 'score', 'fib', 'alternation', 'equality', 'channel',
+]
+
+
+# --- SCORING HELPERS ---
+def _closeness(ratio, targets, tol=0.25):
+    """
+    1.0 on a Fibonacci target, falling to 0 once the log-distance to the
+    nearest target exceeds `tol`. NaN ratios stay NaN.
+    """
+    r = np.asarray(ratio, dtype=float)[..., None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = np.min(np.abs(np.log(r / np.asarray(targets, dtype=float))), axis=-1)
+    return np.clip(1.0 - d / tol, 0.0, 1.0)
+
+
+def _nanmean(*cols):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(np.stack(cols, axis=1), axis=1)
+
+
+# --- VECTORIZED PATTERN TABLES ---
+# Each takes (n, k) windows of pivot prices x and bar indices t, flipped so the
+# first leg points up (motive) or down (corrective). Pivots that have not
+# formed yet are NaN; every rule is written as "broken if ..." so a NaN
+# comparison (False) never breaks a rule that cannot be judged yet.
+
+def _motive_table(x, t):
+    x0, x1, x2, x3, x4, x5 = x.T
+    t1, t2, t3, t4, t5 = t.T[1:]
+    w1, w2, w3, w4, w5 = x1 - x0, x1 - x2, x3 - x2, x3 - x4, x5 - x4
+    legs = np.stack([w1, w2, w3, w4, w5], axis=1)
+
+    common = (
+        np.any(legs <= 0, axis=1)
+        | (x2 <= x0)                   # w2_beyond_w1_start
+        | (x3 <= x1)                   # w3_not_beyond_w1
+        | ((w3 < w1) & (w3 < w5))      # w3_shortest
+    )
+    overlap = x4 <= x1
+    contracting = ~((w3 >= w1) | (w5 >= w3) | (w4 >= w2))
+    expanding = ~((w3 <= w1) | (w5 <= w3) | (w4 <= w2))
+    valid = {
+        "impulse": ~common & ~overlap,
+        "diagonal": ~common & overlap & (contracting | expanding),
+    }
+
+    fib = _nanmean(
+        _closeness(w2 / w1, [0.5, 0.618]),
+        _closeness(w3 / w1, [1.618, 2.618]),
+        _closeness(w4 / w3, [0.236, 0.382]),
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_alt = np.where(np.isnan(w4), np.nan, ((w2 / w1) >= 0.5) != ((w4 / w3) >= 0.5))
+        time_alt = np.clip(np.abs(np.log((t4 - t3) / (t2 - t1))) / np.log(2.0), 0.0, 1.0)
+        channel_at_5 = x3 + (x4 - x2) / (t4 - t2) * (t5 - t3)
+        channel = np.clip(1.0 - np.abs(x5 - channel_at_5) / w5, 0.0, 1.0)
+    alternation = _nanmean(price_alt.astype(float), time_alt)
+    extended_3 = (w3 > w1) & (w3 > w5)
+    equality = np.where(extended_3, _closeness(w5 / w1, [0.618, 1.0]), np.nan)
+    truncated = x5 < x3
+    scores = dict(fib=fib, alternation=alternation, equality=equality, channel=channel)
+    return valid, scores, np.where(truncated, 0.8, 1.0)
+
+
+def _corrective_table(x, t):
+    x0, x1, x2, x3 = x.T
+    a, b, c = x0 - x1, x2 - x1, x2 - x3
+    wrong = (a <= 0) | (b <= 0) | (c <= 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        depth_b, c_to_a = b / a, c / a
+    valid = {
+        "zigzag": ~wrong & ~(x2 >= x0) & ~(x3 >= x1),
+        # Expanded flats (B beyond A's start) need C beyond A's end too.
+        "flat": ~wrong & ~(depth_b < 0.9) & ~((depth_b > 1.0) & (x3 >= x1)),
+    }
+    scores = {
+        "zigzag": dict(fib=_nanmean(_closeness(depth_b, [0.5, 0.618]), _closeness(c_to_a, [0.618, 1.0, 1.618]))),
+        "flat": dict(fib=_nanmean(_closeness(depth_b, [1.0, 1.236, 1.382]), _closeness(c_to_a, [1.0, 1.618]))),
+    }
+    return valid, scores
+
+
+def _windows(values, size):
+    # NaN padding adds windows that end on the last pivot with fewer than
+    # `size` pivots formed (in-progress counts with at least two legs).
+    padded = np.concatenate([np.asarray(values, dtype=float), np.full(size - 3, np.nan)])
+    return sliding_window_view(padded, size)
+
+
+def enumerate_counts(pivots):
+    """
+    Labels every run of pivots as impulse / diagonal (6 pivots) and zigzag /
+    flat (4 pivots), keeps the labelings that pass the cardinal rules, and
+    scores them 0..1 with the guidelines (Fibonacci ratios, alternation,
+    equality, channeling). In-progress counts ending on the last pivot are
+    included with complete=False.
+
+    `pivots` is a pivots.zigzag() frame. Returns a DataFrame (COUNT_COLUMNS)
+    sorted by score, best first.
+    """
+    prices = pivots['price'].to_numpy(dtype=float)
+    n = len(prices)
+    if n < 3:
+        return pd.DataFrame(columns=COUNT_COLUMNS)
+    bars = pivots['idx'].to_numpy(dtype=float)
+    times = pivots['time'].to_numpy()
+
+    rows = []
+    for size, corrective in ((6, False), (4, True)):
+        xw, tw = _windows(prices, size), _windows(bars, size)
+        first_up = xw[:, 1] >= xw[:, 0]
+        sign = np.where(first_up != corrective, 1.0, -1.0)[:, None]
+        formed = np.sum(~np.isnan(xw), axis=1)
+
+        if corrective:
+            valid, pattern_scores = _corrective_table(xw * sign, tw)
+            factor = np.ones(len(xw))
+        else:
+            valid, scores, factor = _motive_table(xw * sign, tw)
+            pattern_scores = {p: scores for p in valid}
+
+        for pattern, ok in valid.items():
+            cols = pattern_scores[pattern]
+            score = np.nan_to_num(_nanmean(*cols.values()), nan=0.5) * factor
+            for i in np.flatnonzero(ok):
+                end = i + formed[i] - 1
+                rows.append({
+                    'pattern': pattern,
+                    'direction': 'up' if first_up[i] else 'down',
+                    'waves': int(formed[i] - 1),
+                    'complete': bool(formed[i] == size),
+                    'start': int(i),
+                    'end': int(end),
+                    'start_time': times[i],
+                    'end_time': times[end],
+                    'points': prices[i:end + 1].tolist(),
+                    'score': round(float(score[i]), 3),
+                    **{k: (None if np.isnan(cols[k][i]) else round(float(cols[k][i]), 3))
+                       for k in ('fib', 'alternation', 'equality', 'channel') if k in cols},
+                })
+
+    counts = pd.DataFrame(rows, columns=COUNT_COLUMNS)
+    return counts.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def current_counts(pivots, top=3, counts=None):
+    """
+    Best-scoring counts that are still relevant now: those ending on the last
+    pivot (in progress) or on the one before it (just completed).
+    """
+    if counts is None:
+        counts = enumerate_counts(pivots)
+    return counts[counts['end'] >= len(pivots) - 2].head(top)
+
+
+def counts_for_prompt(counts):
+    """
+    Compact rows for the LLM: pattern, direction, waves formed, start/end time, points, score.
+    """
+    return [
+        {
+            "pattern": r.pattern, "direction": r.direction, "waves": r.waves,
+            "from": pd.Timestamp(r.start_time).strftime('%Y-%m-%dT%H:%M'),
+            "to": pd.Timestamp(r.end_time).strftime('%Y-%m-%dT%H:%M'),
+            "points": [float(f"{p:.6g}") for p in r.points], "score": r.score,
+        }
+        for r in counts.itertuples()
+    ]
+
+
+# --- SCALAR FAST PATH ---
+def validate_count(points, pattern="impulse"):
+    """
+    Checks one labeled count against the hard rules, e.g. the wave_points of a
+    trade scenario. points = [origin, end of wave 1, end of wave 2, ...]; any
+    prefix of a pattern is accepted. Returns the broken rule ids (see RULES),
+    an empty list when the count is valid. Plain float math, no NumPy.
+    """
+    try:
+        p = [float(v) for v in points]
+    except (TypeError, ValueError):
+        return ["wrong_direction"]
+    if len(p) < 2 or p[1] == p[0]:
+        return [] if len(p) < 2 else ["wrong_direction"]
+
+    corrective = pattern in ("zigzag", "flat")
+    s = 1.0 if (p[1] > p[0]) != corrective else -1.0
+    x = [v * s for v in p]
+    # Odd legs move with the first leg, even legs against it.
+    legs = [(x[k] - x[k - 1]) * (1 if k % 2 else -1) for k in range(1, len(x))]
+    if corrective:
+        legs = [-leg for leg in legs]
+
+    broken = []
+    if any(leg <= 0 for leg in legs):
+        broken.append("wrong_direction")
+
+    if corrective:
+        b = legs[1] / legs[0] if len(legs) > 1 else None
+        if pattern == "zigzag":
+            if len(x) > 2 and x[2] >= x[0]:
+                broken.append("b_beyond_a_start")
+            if len(x) > 3 and x[3] >= x[1]:
+                broken.append("c_not_beyond_a")
+        else:
+            if b is not None and b < 0.9:
+                broken.append("b_too_shallow_for_flat")
+            if b is not None and b > 1.0 and len(x) > 3 and x[3] >= x[1]:
+                broken.append("c_not_beyond_a")
+        return broken
+
+    if len(x) > 2 and x[2] <= x[0]:
+        broken.append("w2_beyond_w1_start")
+    if len(x) > 3 and x[3] <= x[1]:
+        broken.append("w3_not_beyond_w1")
+    if len(legs) > 4 and legs[2] < legs[0] and legs[2] < legs[4]:
+        broken.append("w3_shortest")
+    if len(x) > 4:
+        overlap = x[4] <= x[1]
+        if pattern == "impulse" and overlap:
+            broken.append("w4_overlaps_w1")
+        if pattern == "diagonal":
+            if not overlap:
+                broken.append("diagonal_no_overlap")
+            w = legs + [None] * (5 - len(legs))
+            pairs = [(w[2], w[0]), (w[4], w[2]), (w[3], w[1])]
+            known = [(a, b) for a, b in pairs if a is not None]
+            if not (all(a < b for a, b in known) or all(a > b for a, b in known)):
+                broken.append("diagonal_shape")
+    return broken
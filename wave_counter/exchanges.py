@@ -0,0 +1,312 @@
+import asyncio
+import atexit
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .trace import count, span
+
+# ==========================================
+# POOLED EXCHANGE CLIENTS + SYMBOL ROUTING INDEX
+# ==========================================
+# ccxt.async_support clients hold an aiohttp session, their loaded markets
+# and their rate-limit clock, all bound to the event loop they first ran on.
+# The ExchangePool therefore owns one background event loop: the sync
+# wrappers in data.py submit their coroutines to it (pool.run) and every
+# request reuses one long-lived client per exchange. Markets are loaded once
+# and reloaded every MARKETS_TTL seconds by a task on that loop.
+#
+# Each markets load also refreshes the RoutingIndex (SQLite), which maps a
+# normalized symbol ("BTC/USDT", or "BTCUSDT" for spot pairs) to the
+# exchanges that list it and their native market ids. Fetches skip
+# exchanges whose markets are known and do not carry the pair.
+
+ROUTES_PATH = os.environ.get("WAVE_ROUTES_PATH", os.path.join(".wave_cache", "routes.sqlite"))
+MARKETS_TTL = 6 * 3600   # seconds between markets reloads
+MARKETS_RETRY = 60       # seconds before retrying an exchange whose markets failed to load
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    exchange TEXT NOT NULL,
+    symbol   TEXT NOT NULL,
+    compact  TEXT,
+    native   TEXT,
+    active   INTEGER NOT NULL,
+    PRIMARY KEY (exchange, symbol)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS loaded (
+    exchange TEXT PRIMARY KEY,
+    updated  REAL NOT NULL
+);
+"""
+
+
+def normalize_symbol(symbol):
+    """
+    The user-facing form used as routing key: upper case, "-" / "_" as "/".
+    """
+    return symbol.upper().strip().replace("-", "/").replace("_", "/")
+
+
+class RoutingIndex:
+    """
+    Persistent symbol -> {exchange: (ccxt symbol, native id)} map, held in
+    memory and mirrored to SQLite so a restart routes correctly before any
+    markets have been loaded.
+    """
+
+    def __init__(self, path=ROUTES_PATH):
+        self.path = path
+        self._routes = {}   # key -> {exchange: (symbol, native)}
+        self.loaded = {}    # exchange -> unix time of its last markets load
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            rows = conn.execute("SELECT exchange, symbol, compact, native FROM markets WHERE active = 1").fetchall()
+            self.loaded = dict(conn.execute("SELECT exchange, updated FROM loaded").fetchall())
+        for exchange_id, symbol, compact, native in rows:
+            self._add(exchange_id, symbol, compact, native)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _add(self, exchange_id, symbol, compact, native):
+        for key in (symbol.upper(), compact):
+            if key:
+                self._routes.setdefault(key, {})[exchange_id] = (symbol, native)
+
+    def update(self, exchange_id, markets):
+        """
+        Replaces everything known about one exchange with its ccxt `markets` dict.
+        """
+        rows = []
+        for symbol, m in markets.items():
+            compact = f"{m.get('base', '')}{m.get('quote', '')}".upper() if m.get('spot') else None
+            rows.append((exchange_id, symbol, compact, m.get('id'), 0 if m.get('active') is False else 1))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM markets WHERE exchange = ?", (exchange_id,))
+            conn.executemany("INSERT OR REPLACE INTO markets VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO loaded VALUES (?, ?)", (exchange_id, now))
+        with self._lock:
+            for listed in self._routes.values():
+                listed.pop(exchange_id, None)
+            for _, symbol, compact, native, active in rows:
+                if active:
+                    self._add(exchange_id, symbol, compact, native)
+            self.loaded[exchange_id] = now
+
+    def listings(self, symbol):
+        """
+        {exchange: (ccxt symbol, native id)} of the exchanges listing `symbol`.
+        """
+        key = normalize_symbol(symbol)
+        with self._lock:
+            return dict(self._routes.get(key) or self._routes.get(key.replace("/", "")) or {})
+
+    def route(self, symbol, exchange_ids):
+        """
+        [(exchange, ccxt symbol)] worth asking, in `exchange_ids` order:
+        exchanges known to list the pair, then exchanges whose markets were
+        never loaded. Exchanges known *not* to list it are left out.
+        """
+        listed = self.listings(symbol)
+        known = [(e, listed[e][0]) for e in exchange_ids if e in listed]
+        unknown = [(e, normalize_symbol(symbol)) for e in exchange_ids if e not in self.loaded]
+        return known + unknown
+
+
+class ExchangePool:
+    """
+    Process-wide ccxt.async_support clients on one background event loop.
+
+    run(coro) executes a coroutine on the pool loop from any other thread.
+    Inside it, `async with pool.session(exchange_id)` yields the shared client
+    with markets loaded. Called from a different loop (e.g. a bare
+    asyncio.run), session() yields a throwaway client seeded with the cached
+    markets and closes it afterwards.
+    """
+
+    def __init__(self, index=None, markets_ttl=MARKETS_TTL, retry_after=MARKETS_RETRY, config=None):
+        self._index = index
+        self.markets_ttl = markets_ttl
+        self.retry_after = retry_after
+        self.config = {'enableRateLimit': True, **(config or {})}
+        self._clients = {}
+        self._markets = {}     # exchange -> (markets, loaded_at)
+        self._precision = {}   # exchange -> ccxt precisionMode of its markets
+        self._failed = {}      # exchange -> (failed_at, exception)
+        self._locks = {}
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = RoutingIndex()
+        return self._index
+
+    # --- LOOP ---
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="exchange-pool", daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._refresh_forever(), loop)
+                self._loop = loop
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        """
+        Runs `coro` on the pool loop and waits for its result. The task starts
+        in a copy of the caller's context, so trace spans keep their parent.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+    # --- CLIENTS ---
+    def _new_client(self, exchange_id):
+        import ccxt.async_support as ccxt_async
+        return getattr(ccxt_async, exchange_id)(dict(self.config))
+
+    async def _load_markets(self, client, exchange_id, reload=False):
+        failed = self._failed.get(exchange_id)
+        if failed and time.time() - failed[0] < self.retry_after:
+            raise RuntimeError(f"{exchange_id} markets unavailable: {failed[1]}")
+        with span("exchange.markets", exchange=exchange_id, reload=reload) as s:
+            try:
+                markets = await client.load_markets(reload)
+            except Exception as e:
+                self._failed[exchange_id] = (time.time(), e)
+                raise
+            s["markets"] = len(markets)
+        self._failed.pop(exchange_id, None)
+        self._markets[exchange_id] = (markets, time.time())
+        self._precision[exchange_id] = getattr(client, 'precisionMode', None)
+        self.index.update(exchange_id, markets)
+        return markets
+
+    async def _shared(self, exchange_id):
+        lock = self._locks.setdefault(exchange_id, asyncio.Lock())
+        async with lock:
+            client = self._clients.get(exchange_id)
+            if client is None:
+                client = self._clients[exchange_id] = self._new_client(exchange_id)
+            if exchange_id not in self._markets:
+                await self._load_markets(client, exchange_id)
+                count("cache", cache="markets", result="miss")
+            else:
+                count("cache", cache="markets", result="hit")
+            return client
+
+    @contextlib.asynccontextmanager
+    async def session(self, exchange_id):
+        if asyncio.get_running_loop() is self._loop:
+            yield await self._shared(exchange_id)
+            return
+        client = self._new_client(exchange_id)
+        try:
+            cached = self._markets.get(exchange_id)
+            if cached and time.time() - cached[1] < self.markets_ttl:
+                client.set_markets(cached[0])
+            else:
+                await self._load_markets(client, exchange_id)
+            yield client
+        finally:
+            await client.close()
+
+    def market_symbol(self, client, exchange_id, symbol):
+        """
+        The ccxt symbol of `symbol` on this exchange; raises when its loaded
+        markets do not list it (no request is made).
+        """
+        symbol = normalize_symbol(symbol)
+        if client.markets and symbol in client.markets:
+            return symbol
+        listed = self.index.listings(symbol).get(exchange_id)
+        if listed:
+            return listed[0]
+        if client.markets:
+            count("routing", result="unlisted", exchange=exchange_id)
+            raise ValueError(f"{exchange_id} does not list {symbol}")
+        return symbol
+
+    def route(self, symbol, exchange_ids):
+        return self.index.route(symbol, exchange_ids)
+
+    def tick_size(self, exchange_id, symbol):
+        """
+        Price tick of `symbol` from the markets already loaded for the
+        exchange, or None when they are not loaded (no request is made).
+        The market is looked up like market_symbol does (compact pairs, ccxt keys).
+        """
+        cached = self._markets.get(exchange_id)
+        if not cached:
+            return None
+        listed = self.index.listings(symbol).get(exchange_id)
+        market = cached[0].get(listed[0] if listed else normalize_symbol(symbol))
+        price = ((market or {}).get('precision') or {}).get('price')
+        if not price:
+            return None
+        from ccxt.base.decimal_to_precision import DECIMAL_PLACES, TICK_SIZE
+        mode = self._precision.get(exchange_id)
+        if mode == TICK_SIZE:
+            return float(price)
+        if mode == DECIMAL_PLACES:
+            return 10.0 ** -int(price)
+        return None  # significant digits: no fixed tick
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.markets_ttl)
+            for exchange_id, client in list(self._clients.items()):
+                try:
+                    await self._load_markets(client, exchange_id, reload=True)
+                except Exception:
+                    pass  # keep the previous markets; retried next round
+
+    # --- SHUTDOWN ---
+    async def _close_all(self):
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()  # the markets refresher and any request still in flight
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+
+    def close(self):
+        if self._loop is None:
+            return
+        loop, self._loop = self._loop, None
+        asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(10)
+        self._markets.clear()
+        self._locks.clear()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    The process-wide ExchangePool (created on first use, closed at exit).
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ExchangePool()
+            atexit.register(_default.close)
+        return _default
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+from .pivots import atr, zigzag
+
+# ==========================================
+# FIBONACCI PRICE / TIME CONFLUENCE
+# ==========================================
+# Ratios from knowledge.py PART 5 (price) and PART 7 (time).
+RETRACEMENTS = np.array([0.236, 0.382, 0.5, 0.618, 0.786])
+EXTENSIONS = np.array([1.272, 1.618, 2.0, 2.618])
+PROJECTIONS = np.array([0.618, 1.0, 1.618])  # wave C / wave 5 style: from the next pivot
+FIB_BARS = np.array([5, 8, 13, 21, 34, 55, 89, 144])
+TIME_RATIOS = np.array([0.618, 1.0, 1.618])
+
+KEY_RATIOS = (0.5, 0.618, 1.0, 1.618)
+TF_WEIGHT = {"1W": 3.0, "1D": 2.0}  # anything else (micro) = 1.0
+
+ZONE_COLUMNS = ['price', 'low', 'high', 'strength', 'count', 'sources']
+TIME_COLUMNS = ['bars_ahead', 'time', 'count']
+
+
+def _ratio_weights(ratios):
+    return np.where(np.isin(ratios, KEY_RATIOS), 1.5, 1.0)
+
+
+def price_levels(pivots, label, legs=3):
+    """
+    Retracement, extension and projection levels of the last `legs` swing legs.
+    Returns (prices, weights, sources) as flat arrays/lists for one timeframe.
+    """
+    p = pivots['price'].to_numpy(dtype=float)[-(legs + 1):]
+    if p.size < 2:
+        return np.empty(0), np.empty(0), []
+    a, b = p[:-1], p[1:]
+    move = (b - a)[:, None]
+    blocks = [
+        ("ret", RETRACEMENTS, b[:, None] - move * RETRACEMENTS),
+        ("ext", EXTENSIONS, a[:, None] + move * EXTENSIONS),
+        ("proj", PROJECTIONS, p[2:, None] + move[:-1] * PROJECTIONS),
+    ]
+    tf_weight = TF_WEIGHT.get(label, 1.0)
+    prices, weights, sources = [], [], []
+    for kind, ratios, levels in blocks:
+        if not levels.size:
+            continue
+        # Newer legs weigh more: 1/legs .. 1
+        recency = np.linspace(1.0 / len(levels), 1.0, len(levels))[:, None]
+        prices.append(levels.ravel())
+        weights.append((recency * _ratio_weights(ratios) * tf_weight).ravel())
+        sources += [f"{label} {kind} {r:g}" for _ in range(len(levels)) for r in ratios]
+    return np.concatenate(prices), np.concatenate(weights), sources
+
+
+def cluster_levels(prices, weights, sources, tol):
+    """
+    Groups sorted levels into zones at most `tol` wide, ranked by summed weight.
+    """
+    if len(prices) == 0:
+        return pd.DataFrame(columns=ZONE_COLUMNS)
+    order = np.argsort(prices)
+    p, w = prices[order], weights[order]
+    # Each zone starts at the first level not covered by the previous one
+    # (one binary search per zone, so zones cannot chain into wide bands).
+    starts = [0]
+    while True:
+        nxt = int(np.searchsorted(p, p[starts[-1]] + tol, side='right'))
+        if nxt >= len(p):
+            break
+        starts.append(nxt)
+    starts = np.asarray(starts)
+    gid = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(p))))
+    strength = np.bincount(gid, weights=w)
+    src = np.asarray(sources, dtype=object)[order]
+    zones = pd.DataFrame({
+        'price': np.bincount(gid, weights=w * p) / strength,
+        'low': np.minimum.reduceat(p, starts),
+        'high': np.maximum.reduceat(p, starts),
+        'strength': strength.round(2),
+        'count': np.bincount(gid),
+        'sources': [sorted(set(s)) for s in np.split(src, starts[1:])],
+    })
+    return zones.sort_values('strength', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def time_targets(df, pivots, legs=3, tol_bars=1):
+    """
+    Fibonacci bar counts (5, 8, 13 ...) from the last pivots plus 0.618/1/1.618
+    multiples of the last leg durations, kept when still in the future and
+    clustered within `tol_bars`.
+    """
+    idx = pivots['idx'].to_numpy(dtype=float)[-(legs + 1):]
+    last = len(df) - 1
+    if idx.size < 2 or len(df) < 2:
+        return pd.DataFrame(columns=TIME_COLUMNS)
+    counts = (idx[:, None] + FIB_BARS).ravel()
+    ratios = (idx[-1] + np.diff(idx)[:, None] * TIME_RATIOS).ravel()
+    bars = np.round(np.concatenate([counts, ratios]))
+    bars = np.sort(bars[bars > last])
+    if not bars.size:
+        return pd.DataFrame(columns=TIME_COLUMNS)
+    new_group = np.concatenate(([True], np.diff(bars) > tol_bars))
+    gid = np.cumsum(new_group) - 1
+    count = np.bincount(gid)
+    ahead = (np.bincount(gid, weights=bars) / count).round().astype(int) - last
+    step = df['time'].diff().median()
+    targets = pd.DataFrame({
+        'bars_ahead': ahead,
+        'time': df['time'].iloc[-1] + step * ahead,
+        'count': count,
+    })
+    return targets.sort_values(['count', 'bars_ahead'], ascending=[False, True], kind='stable').reset_index(drop=True)
+
+
+def fib_confluence(frames, micro_label, pivots=None, legs=3, tol=None, max_distance=0.15):
+    """
+    One batch over every timeframe: price levels from the last `legs` legs of
+    each frame, clustered into ranked zones, plus micro-timeframe time targets.
+
+    frames: {label: OHLCV df}, e.g. {"1W": d1w, "1D": d1d, "15m": dm}.
+    pivots: optional {label: zigzag frame} to reuse already computed pivots.
+    tol: zone width, default half the micro ATR. Zones further than
+    `max_distance` (fraction of the last close) are dropped.
+    Returns {"zones": DataFrame, "time_targets": DataFrame}.
+    """
+    pivots = dict(pivots or {})
+    for label, df in frames.items():
+        if label not in pivots and df is not None and not df.empty:
+            pivots[label] = zigzag(df)
+
+    micro = frames[micro_label]
+    last_close = float(micro['close'].iloc[-1])
+    if tol is None:
+        tol = 0.5 * float(atr(micro['high'], micro['low'], micro['close'])[-1]) or last_close * 0.0025
+
+    parts = [price_levels(piv, label, legs) for label, piv in pivots.items()]
+    prices = np.concatenate([pr for pr, _, _ in parts])
+    weights = np.concatenate([w for _, w, _ in parts])
+    sources = [s for _, _, src in parts for s in src]
+    near = np.abs(prices - last_close) <= last_close * max_distance
+    zones = cluster_levels(prices[near], weights[near], np.asarray(sources, dtype=object)[near], tol)
+    return {"zones": zones, "time_targets": time_targets(micro, pivots[micro_label], legs)}
+
+
+def confluence_for_prompt(conf, top_zones=6, top_times=3):
+    zones = conf["zones"].head(top_zones)
+    times = conf["time_targets"].head(top_times)
+    return {
+        "price_zones": [
+            {"low": float(f"{r.low:.6g}"), "high": float(f"{r.high:.6g}"), "strength": float(r.strength), "sources": list(r.sources)}
+            for r in zones.itertuples()
+        ],
+        "time_targets": [
+            {"time": pd.Timestamp(r.time).strftime('%Y-%m-%dT%H:%M'), "bars_ahead": int(r.bars_ahead), "hits": int(r.count)}
+            for r in times.itertuples()
+        ],
+    }
@@ -0,0 +1,307 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+from .trace import count, span
+
+# ==========================================
+# BACKGROUND JOB QUEUE (LLM ANALYSES OFF THE SCRIPT THREAD)
+# ==========================================
+# submit() records a job in SQLite and hands the work function to a thread
+# pool (the work is waiting on Gemini, and it needs the in-memory frames and
+# ModelManager, so threads rather than processes). The script thread only
+# polls status(); results land in SQLite as JSON and the caller copies them
+# into st.session_state.
+#
+# Each attempt runs on its own daemon thread so it can time out: the job
+# moves on (retry after backoff, or fails) and a late result of the abandoned
+# attempt is dropped. A thread cannot be killed, so a hung attempt (a model
+# call that never returns) keeps its thread until the call ends; at most
+# max_hung of them are tolerated, after that attempts fail fast instead of
+# piling up threads. Cancellation is cooperative: a queued job never starts,
+# a running one is discarded, and Job.progress() raises inside streaming calls.
+
+JOBS_PATH = os.environ.get("WAVE_JOBS_PATH", os.path.join(".wave_cache", "jobs.sqlite"))
+JOB_WORKERS = int(os.environ.get("WAVE_JOB_WORKERS", "4"))
+JOB_TIMEOUT = 180   # seconds per attempt
+JOB_RETRIES = 2     # extra attempts after a failure or timeout
+JOB_BACKOFF = 2.0   # seconds before the first retry, doubled each time
+KEEP_DAYS = 7       # finished jobs older than this are pruned at start-up
+
+ACTIVE = ("queued", "running", "retrying")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id       TEXT PRIMARY KEY,
+    session  TEXT,
+    label    TEXT,
+    status   TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created  REAL NOT NULL,
+    started  REAL,
+    updated  REAL NOT NULL,
+    finished REAL,
+    error    TEXT,
+    result   TEXT
+)
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    Handle passed to the work function of one attempt. Work with side
+    effects beyond its result (cache, journal) checks `cancelled` first: a
+    timed-out attempt keeps running after its retry has started.
+    """
+
+    def __init__(self, job_id, attempt, cancel_event):
+        self.id = job_id
+        self.attempt = attempt
+        self.abandoned = False  # set when this attempt timed out
+        self._cancel = cancel_event
+        self.sections = []
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set() or self.abandoned
+
+    def progress(self, key, index, value):
+        """
+        on_section callback for analyze_deep_wave: keeps the streamed sections
+        for a live preview and stops the stream once the job is cancelled.
+        """
+        if self.cancelled:
+            raise JobCancelled(self.id)
+        self.sections.append((key, index, value))
+
+
+class JobQueue:
+    """
+    SQLite-backed job table + worker thread pool. Thread-safe; share one per process.
+    """
+
+    def __init__(self, path=JOBS_PATH, max_workers=JOB_WORKERS, timeout=JOB_TIMEOUT,
+                 retries=JOB_RETRIES, backoff=JOB_BACKOFF, max_hung=None):
+        self.path = path
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_hung = max_workers if max_hung is None else max_hung
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._cancel = {}    # job id -> threading.Event
+        self._current = {}   # job id -> Job of the running attempt
+        self._hung = set()   # Jobs of timed-out attempts whose thread is still running
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            # Jobs left active by a dead process can never finish.
+            stale = now - (timeout + backoff * 2 ** retries) * (retries + 1)
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'interrupted (process restarted)', updated = ? "
+                f"WHERE status IN ({', '.join('?' * len(ACTIVE))}) AND updated < ?", (now, *ACTIVE, stale),
+            )
+            conn.execute("DELETE FROM jobs WHERE finished < ?", (now - KEEP_DAYS * 86400,))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _set(self, job_id, **cols):
+        cols["updated"] = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in cols)} WHERE id = ?", (*cols.values(), job_id)
+            )
+
+    # --- SUBMIT / CANCEL ---
+    def submit(self, fn, label="", session=None, timeout=None, retries=None):
+        """
+        Queues fn(job) and returns the job id. fn receives a Job handle and
+        must return something JSON-serializable.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, session, label, status, created, updated) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, session, label, now, now),
+            )
+        with self._lock:
+            self._cancel[job_id] = threading.Event()
+        count("jobs", status="submitted")
+        self._pool.submit(self._run, job_id, fn, label,
+                          self.timeout if timeout is None else timeout,
+                          self.retries if retries is None else retries)
+        return job_id
+
+    def cancel(self, job_id):
+        """
+        Requests cancellation; returns False when the job is already finished.
+        """
+        with self._lock:
+            event = self._cancel.get(job_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    # --- WORKER ---
+    def _run(self, job_id, fn, label, timeout, retries):
+        cancel = self._cancel[job_id]
+        try:
+            with span("job", label=label) as s:
+                status, result, error = self._attempt_loop(job_id, fn, cancel, timeout, retries)
+                s["status"] = status
+                if error:
+                    s["error"] = error
+            self._set(job_id, status=status, finished=time.time(), error=error,
+                      result=None if result is None else json.dumps(result))
+            count("jobs", status=status)
+        finally:
+            with self._lock:
+                self._cancel.pop(job_id, None)
+                self._current.pop(job_id, None)
+
+    def _attempt_loop(self, job_id, fn, cancel, timeout, retries):
+        error = None
+        for attempt in range(1, retries + 2):
+            if cancel.is_set():
+                return "cancelled", None, None
+            self._set(job_id, status="running", attempts=attempt, started=time.time())
+            job = Job(job_id, attempt, cancel)
+            with self._lock:
+                self._current[job_id] = job
+                hung = len(self._hung)
+            if hung >= self.max_hung:
+                future = Future()
+                future.set_exception(RuntimeError(f"{hung} timed-out attempts still running"))
+            else:
+                future = self._start(fn, job)
+            try:
+                result = self._wait(future, cancel, timeout)
+            except JobCancelled:
+                return "cancelled", None, None
+            except FutureTimeout:
+                job.abandoned = True
+                with self._lock:
+                    if not future.done():
+                        self._hung.add(job)
+                count("jobs", status="timeout")
+                error = f"timed out after {timeout:g}s"
+            except Exception as e:
+                if cancel.is_set():
+                    return "cancelled", None, None
+                error = f"{type(e).__name__}: {e}"
+            else:
+                return "done", result, None
+            if attempt <= retries:
+                self._set(job_id, status="retrying", error=error)
+                cancel.wait(self.backoff * 2 ** (attempt - 1))
+        return "failed", None, error
+
+    def _start(self, fn, job):
+        future = Future()
+
+        def attempt():
+            try:
+                result = fn(job)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self._hung.discard(job)
+
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=attempt, name=f"job-{job.id}-{job.attempt}", daemon=True).start()
+        return future
+
+    def hung(self):
+        """
+        Number of timed-out attempts whose thread has not returned yet.
+        """
+        with self._lock:
+            return len(self._hung)
+
+    @staticmethod
+    def _wait(future, cancel, timeout):
+        # Short waits so a cancel does not have to sit out the whole attempt.
+        deadline = time.monotonic() + timeout
+        while True:
+            if cancel.is_set():
+                raise JobCancelled()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FutureTimeout()
+            try:
+                return future.result(min(remaining, 0.25))
+            except FutureTimeout:
+                continue
+
+    # --- READ SIDE ---
+    @staticmethod
+    def _row(row):
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def status(self, job_id):
+        """
+        The job row as a dict (result parsed), or None for an unknown id.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def statuses(self, job_ids):
+        """
+        {id: row} for several jobs in one query (the UI polls this).
+        """
+        job_ids = list(job_ids)
+        if not job_ids:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE id IN ({', '.join('?' * len(job_ids))})", job_ids
+            ).fetchall()
+        return {r["id"]: self._row(r) for r in rows}
+
+    def sections(self, job_id):
+        """
+        Sections streamed so far by the running attempt (empty when none).
+        """
+        with self._lock:
+            job = self._current.get(job_id)
+        return list(job.sections) if job else []
+
+    def jobs(self, session=None, limit=20):
+        sql, args = "SELECT * FROM jobs", []
+        if session is not None:
+            sql, args = sql + " WHERE session = ?", [session]
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY created DESC LIMIT ?", (*args, limit)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def stats(self):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
@@ -0,0 +1,105 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# ==========================================
+# ANALYSIS JOURNAL (EVERY ANALYSIS + ITS MARKET SNAPSHOT)
+# ==========================================
+# Unlike the AnalysisCache (TTL + LRU eviction) the journal keeps every
+# analysis for backtesting. Rows are keyed by analysis_key, so a cached
+# repeat of the same analysis is recorded once. The snapshot is the micro
+# candle the analysis was made on (as_of = its open time, in ms) plus the
+# exchange whose candles the backtester replays afterwards.
+
+JOURNAL_PATH = os.environ.get("WAVE_JOURNAL_PATH", os.path.join(".wave_cache", "journal.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    key            TEXT PRIMARY KEY,
+    created        REAL NOT NULL,
+    symbol         TEXT NOT NULL,
+    timeframe      TEXT NOT NULL,
+    exchange       TEXT,
+    language       TEXT,
+    prompt_mode    TEXT,
+    model          TEXT,
+    prompt_version TEXT,
+    as_of          INTEGER NOT NULL,
+    close          REAL,
+    payload        TEXT NOT NULL
+)
+"""
+INDEX = "CREATE INDEX IF NOT EXISTS analyses_series ON analyses (symbol, timeframe, as_of)"
+
+
+class AnalysisJournal:
+    """
+    Append-only SQLite log of analyses for the backtester.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            conn.execute(INDEX)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, key, analysis, symbol, timeframe, df_micro, language, prompt_mode, model, prompt_version):
+        """
+        Stores one analysis with the last micro candle as its snapshot; no-op
+        for a key that is already journaled or an empty frame.
+        """
+        if df_micro is None or df_micro.empty:
+            return
+        last = df_micro.iloc[-1]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, time.time(), symbol, timeframe, df_micro.attrs.get('exchange'), language, prompt_mode,
+                 model, prompt_version, int(last['time'].value // 1_000_000), float(last['close']),
+                 json.dumps(analysis)),
+            )
+
+    def rows(self, symbol=None, timeframe=None, since=None):
+        """
+        Journaled analyses (oldest first) as dicts with the payload parsed.
+        since: only analyses made after this unix time.
+        """
+        sql, args = "SELECT * FROM analyses WHERE 1 = 1", []
+        for column, value in (("symbol", symbol), ("timeframe", timeframe)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                args.append(value)
+        if since is not None:
+            sql += " AND created >= ?"
+            args.append(since)
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(sql + " ORDER BY as_of", args).fetchall()
+        return [{**dict(r), "payload": json.loads(r["payload"])} for r in rows]
+
+    def series(self):
+        """
+        [(exchange, symbol, timeframe, first as_of)] the backtester needs candles for.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT exchange, symbol, timeframe, MIN(as_of) FROM analyses "
+                "WHERE exchange IS NOT NULL GROUP BY exchange, symbol, timeframe"
+            ).fetchall()
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
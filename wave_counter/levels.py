@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from .fibonacci import TF_WEIGHT, cluster_levels
+from .pivots import atr, zigzag
+
+# ==========================================
+# SUPPORT / RESISTANCE + VOLUME PROFILE
+# ==========================================
+# Levels come from two sources, computed for every timeframe in one batch:
+# swing pivots (zigzag highs/lows) and the volume-at-price profile (POC and
+# high-volume nodes). Both are clustered into zones like the Fibonacci
+# levels, then ranked by touches (pivots inside the zone, weighted by
+# timeframe) plus the share of traded volume inside the zone.
+#
+# The profile spreads each candle's volume evenly over its high-low range on
+# one price grid shared by all frames. Each frame is normalized to its own
+# total volume first, so 1W bars do not drown the micro frame.
+
+PROFILE_BINS = 80
+VALUE_AREA = 0.7      # share of volume inside the value area
+VOLUME_WEIGHT = 10.0  # score points for a zone holding all the volume
+POC_WEIGHT, NODE_WEIGHT = 2.0, 1.0
+
+LEVEL_COLUMNS = ['price', 'low', 'high', 'kind', 'touches', 'volume', 'score', 'sources']
+
+
+def volume_profile(frames, lo, hi, bins=PROFILE_BINS):
+    """
+    Volume-at-price of several frames on one grid from lo to hi.
+    frames: {label: OHLCV df}. Returns (bin edges, volume share per bin);
+    the shares sum to 1 over the volume traded inside the grid.
+    """
+    edges = np.linspace(lo, hi, bins + 1)
+    parts = [(label, df) for label, df in frames.items() if df is not None and not df.empty]
+    if not parts:
+        return edges, np.zeros(bins)
+    low = np.concatenate([df['low'].to_numpy(dtype=float) for _, df in parts])
+    high = np.concatenate([df['high'].to_numpy(dtype=float) for _, df in parts])
+    volume = np.concatenate([
+        df['volume'].to_numpy(dtype=float) * TF_WEIGHT.get(label, 1.0) / max(df['volume'].sum(), 1e-12)
+        for label, df in parts
+    ])
+    # Doji candles get a sliver of range so they land in the bin of their price.
+    span = np.maximum(high - low, (hi - lo) * 1e-9)
+    overlap = np.minimum(low[:, None] + span[:, None], edges[1:]) - np.maximum(low[:, None], edges[:-1])
+    profile = (np.clip(overlap, 0, None) / span[:, None] * volume[:, None]).sum(axis=0)
+    total = profile.sum()
+    return edges, profile / total if total > 0 else profile
+
+
+def value_area(edges, share, area=VALUE_AREA):
+    """
+    (low, high) of the smallest set of bins holding `area` of the volume
+    (bins taken by volume, highest first).
+    """
+    order = np.argsort(share)[::-1]
+    n = int(np.searchsorted(np.cumsum(share[order]), area)) + 1
+    chosen = order[:n]
+    return float(edges[chosen.min()]), float(edges[chosen.max() + 1])
+
+
+def volume_nodes(edges, share):
+    """
+    (prices, weights, sources) of the POC and the high-volume nodes: local
+    maxima of the smoothed profile above the average bin.
+    """
+    if not share.any():
+        return np.empty(0), np.empty(0), []
+    centers = (edges[:-1] + edges[1:]) / 2
+    smooth = np.convolve(share, np.ones(3) / 3, mode='same')
+    peak = (smooth >= np.roll(smooth, 1)) & (smooth >= np.roll(smooth, -1)) & (smooth > share.mean())
+    poc = int(np.argmax(share))
+    peak[poc] = False
+    prices = np.concatenate(([centers[poc]], centers[peak]))
+    weights = np.concatenate(([POC_WEIGHT], np.full(peak.sum(), NODE_WEIGHT)))
+    return prices, weights, ["POC"] + ["HVN"] * int(peak.sum())
+
+
+def pivot_levels(pivots, label):
+    """
+    (prices, weights, sources) of the confirmed swing pivots of one frame.
+    """
+    piv = pivots[pivots['confirmed'].astype(bool)]
+    prices = piv['price'].to_numpy(dtype=float)
+    weights = np.full(len(prices), TF_WEIGHT.get(label, 1.0))
+    return prices, weights, [f"{label} swing {k}" for k in piv['kind']]
+
+
+def sr_levels(frames, micro_label, pivots=None, tol=None, max_distance=0.15, bins=PROFILE_BINS):
+    """
+    Ranked support/resistance zones of all frames plus their volume profile.
+
+    frames: {label: OHLCV df}, e.g. {"1W": d1w, "1D": d1d, "15m": dm}.
+    pivots: optional {label: zigzag frame} to reuse already computed pivots.
+    tol: zone width, default the micro ATR. Only prices within `max_distance`
+    (fraction of the last close) are considered.
+    Returns {"levels": DataFrame, "profile": DataFrame, "poc": float,
+    "value_area": (low, high)}.
+    """
+    pivots = dict(pivots or {})
+    for label, df in frames.items():
+        if label not in pivots and df is not None and not df.empty:
+            pivots[label] = zigzag(df)
+
+    micro = frames[micro_label]
+    last_close = float(micro['close'].iloc[-1])
+    if tol is None:
+        tol = float(atr(micro['high'], micro['low'], micro['close'])[-1]) or last_close * 0.005
+    lo, hi = last_close * (1 - max_distance), last_close * (1 + max_distance)
+
+    edges, share = volume_profile(frames, lo, hi, bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    swing = [pivot_levels(piv, label) for label, piv in pivots.items()]
+    piv_prices = np.concatenate([p for p, _, _ in swing]) if swing else np.empty(0)
+    node_prices, node_weights, node_sources = volume_nodes(edges, share)
+
+    prices = np.concatenate([piv_prices, node_prices])
+    weights = np.concatenate([w for _, w, _ in swing] + [node_weights])
+    sources = np.asarray([s for _, _, src in swing for s in src] + node_sources, dtype=object)
+    near = (prices >= lo) & (prices <= hi)
+    zones = cluster_levels(prices[near], weights[near], sources[near], tol)
+
+    # Touches: pivots inside each zone. Volume: profile share of the bins
+    # whose centers fall inside the zone (widened by half a bin).
+    piv_sorted = np.sort(piv_prices)
+    half_bin = (edges[1] - edges[0]) / 2
+    low, high = zones['low'].to_numpy(dtype=float), zones['high'].to_numpy(dtype=float)
+    touches = np.searchsorted(piv_sorted, high, side='right') - np.searchsorted(piv_sorted, low, side='left')
+    cum = np.concatenate(([0.0], np.cumsum(share)))
+    volume = cum[np.searchsorted(centers, high + half_bin, side='right')] - cum[np.searchsorted(centers, low - half_bin)]
+    levels = zones.assign(
+        kind=np.where(zones['price'].to_numpy(dtype=float) <= last_close, 'support', 'resistance'),
+        touches=touches,
+        volume=volume.round(4),
+        score=(zones['strength'].to_numpy(dtype=float) + VOLUME_WEIGHT * volume).round(2),
+    )[LEVEL_COLUMNS]
+    levels = levels.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
+
+    return {
+        "levels": levels,
+        "profile": pd.DataFrame({'price': centers, 'volume': share}),
+        "poc": float(centers[np.argmax(share)]) if share.any() else None,
+        "value_area": value_area(edges, share) if share.any() else None,
+    }
+
+
+def levels_for_prompt(sr, top=8):
+    def num(x):
+        return float(f"{x:.6g}")
+    return {
+        "levels": [
+            {"low": num(r.low), "high": num(r.high), "kind": r.kind, "touches": int(r.touches),
+             "volume_pct": round(r.volume * 100, 1), "sources": list(r.sources)}
+            for r in sr["levels"].head(top).itertuples()
+        ],
+        "poc": num(sr["poc"]) if sr["poc"] is not None else None,
+        "value_area": [num(v) for v in sr["value_area"]] if sr["value_area"] else None,
+    }
@@ -0,0 +1,129 @@
+import pandas as pd
+
+from .data import bars_to_df, fetch_since
+from .pivots import ZigZagTracker
+from .scenarios import trade_levels
+
+# ==========================================
+# LIVE MODE (INCREMENTAL MONITORING)
+# ==========================================
+# New candles are appended to the micro frame, closed bars are pushed into a
+# ZigZagTracker and every bar is checked against the scenario levels. Only a
+# newly confirmed pivot or a crossed invalidation asks for a new LLM analysis.
+
+MAX_EVENTS = 50
+
+
+def scenario_levels(scenarios):
+    """
+    [{name, side, target, invalidation, status}] from trade_scenarios. side is
+    1 for longs and -1 for shorts (see scenarios.trade_levels). Scenarios
+    without numeric levels are skipped.
+    """
+    levels = []
+    for s in scenarios or []:
+        parsed = trade_levels(s)
+        if parsed is None:
+            continue
+        side, target, invalidation = parsed
+        levels.append({
+            'name': s.get('name', 'Scenario'), 'side': side,
+            'target': target, 'invalidation': invalidation, 'status': 'active',
+        })
+    return levels
+
+
+class LiveMonitor:
+    """
+    Keeps one symbol/timeframe up to date between LLM analyses.
+
+    The last row of `df` is the still-forming candle; it is only pushed into
+    the zigzag once a newer candle arrives. `trigger` holds the reason a new
+    analysis is needed (None otherwise) until rebase() is called.
+    """
+
+    def __init__(self, symbol, timeframe, df, scenarios, exchange=None, store=None, max_rows=2000, **zigzag_kw):
+        self.symbol, self.timeframe = symbol, timeframe
+        self.exchange = exchange or df.attrs.get('exchange')
+        self.store = store
+        self.max_rows = max_rows
+        self.zigzag_kw = zigzag_kw
+        self.events = []
+        self.rebase(df, scenarios)
+
+    def rebase(self, df, scenarios):
+        """
+        Starts over from `df` and the scenarios of a fresh analysis.
+        """
+        self.df = df.reset_index(drop=True)
+        self.df.attrs['exchange'] = self.exchange
+        self.tracker = ZigZagTracker.from_frame(self.df.iloc[:-1], **self.zigzag_kw)
+        self.levels = scenario_levels(scenarios)
+        self.trigger = None
+
+    def _event(self, time, kind, price, detail, trigger=False):
+        event = {'time': time, 'kind': kind, 'price': price, 'detail': detail}
+        self.events = (self.events + [event])[-MAX_EVENTS:]
+        if trigger and self.trigger is None:
+            self.trigger = detail
+        return event
+
+    def _check_levels(self, time, high, low):
+        events = []
+        for lv in self.levels:
+            if lv['status'] != 'active':
+                continue
+            # Invalidation first: a bar that spans both levels counts as a stop.
+            if (low <= lv['invalidation']) if lv['side'] == 1 else (high >= lv['invalidation']):
+                lv['status'] = 'invalidated'
+                events.append(self._event(time, 'invalidated', lv['invalidation'],
+                                          f"{lv['name']} invalidated at {lv['invalidation']:g}", trigger=True))
+            elif (high >= lv['target']) if lv['side'] == 1 else (low <= lv['target']):
+                lv['status'] = 'target hit'
+                events.append(self._event(time, 'target', lv['target'], f"{lv['name']} target {lv['target']:g} reached"))
+        return events
+
+    def on_bars(self, bars):
+        """
+        Merges raw ccxt rows (usually the forming candle again plus any newer
+        ones) into the frame and returns the events they produced.
+        """
+        new = bars_to_df(bars)
+        last_time = self.df['time'].iloc[-1]
+        new = new[new['time'] >= last_time]
+        if new.empty:
+            return []
+        base = self.df.iloc[:-1] if new['time'].iloc[0] == last_time else self.df
+        self.df = pd.concat([base, new], ignore_index=True).tail(self.max_rows).reset_index(drop=True)
+        self.df.attrs['exchange'] = self.exchange
+
+        events = []
+        newest = new['time'].iloc[-1]
+        rows = self.df[self.df['time'] >= last_time]
+        for t, h, l, c, v in zip(rows['time'], rows['high'], rows['low'], rows['close'], rows['volume']):
+            if t < newest:
+                pivot = self.tracker.push(t, h, l, c, v)
+                if pivot:
+                    name = "swing high" if pivot['kind'] == 'H' else "swing low"
+                    events.append(self._event(t, 'pivot', pivot['price'],
+                                              f"New {name} confirmed at {pivot['price']:g}", trigger=True))
+            events.extend(self._check_levels(t, h, l))
+        return events
+
+    def poll(self):
+        """
+        Fetches candles from the forming one onward and applies them.
+        """
+        since = int(self.df['time'].iloc[-1].value // 1_000_000)
+        bars = fetch_since(self.exchange, self.symbol, self.timeframe, since, store=self.store)
+        return self.on_bars(bars)
+
+    def status(self):
+        last = self.df.iloc[-1]
+        pivot = self.tracker.confirmed[-1] if self.tracker.confirmed else None
+        return {
+            'time': last['time'],
+            'close': float(last['close']),
+            'last_pivot': f"{pivot['kind']} {pivot['price']:g} @ {pivot['time']:%m-%d %H:%M}" if pivot else "-",
+            'levels': pd.DataFrame(self.levels, columns=['name', 'side', 'target', 'invalidation', 'status']),
+        }
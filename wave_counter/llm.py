@@ -0,0 +1,230 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from .prompt import estimate_tokens
+from .trace import count
+
+# ==========================================
+# LLM BACKENDS + MODEL MANAGER
+# ==========================================
+# A backend builds model objects with the google.generativeai surface used by
+# the app: generate_content(prompt, generation_config=None, stream=False)
+# returning a response with .text, or an iterator of chunks (.parts / .text)
+# when streaming. ModelManager builds each (model, system instruction) pair
+# once per process.
+
+CONTEXT_CACHE_TTL = 3600  # seconds a server-side cached system context lives
+
+
+class GeminiBackend:
+    """
+    Real Gemini models. With use_context_cache the system instruction (the
+    ELLIOTT_KNOWLEDGE block) is uploaded once as server-side cached content
+    and every request only references it. If the model or the content size
+    does not qualify for context caching, a plain GenerativeModel with
+    system_instruction is built instead (construction is still reused).
+    """
+    name = "gemini"
+
+    def __init__(self, api_key, use_context_cache=True, cache_ttl=CONTEXT_CACHE_TTL):
+        import google.generativeai as genai
+        self.genai = genai
+        self.use_context_cache = use_context_cache
+        self.cache_ttl = cache_ttl
+        genai.configure(api_key=api_key)
+
+    def build(self, model_name, system_instruction=None):
+        """
+        Returns (model, expires_at, context_cached).
+        """
+        if system_instruction and self.use_context_cache:
+            try:
+                from google.generativeai import caching
+                cached = caching.CachedContent.create(
+                    model=model_name,
+                    system_instruction=system_instruction,
+                    ttl=timedelta(seconds=self.cache_ttl),
+                )
+                model = self.genai.GenerativeModel.from_cached_content(cached_content=cached)
+                # Rebuild a minute before the server drops the cached context.
+                return model, time.time() + self.cache_ttl - 60, True
+            except Exception:
+                pass
+        model = self.genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        return model, float("inf"), False
+
+
+# --- LOCAL FAKE (tests / offline runs) ---
+FAKE_ANALYSIS = {
+    "macro_analysis": {
+        "trend": "Bullish", "current_structure": "Primary Wave [3]",
+        "detailed_breakdown": "Fake backend response.", "key_levels": "n/a",
+    },
+    "micro_analysis": {
+        "timeframe": "", "current_wave_degree": "Minuette", "wave_count_status": "Wave (iii) extending",
+        "sub_wave_structure": "5-3-5", "fib_confluence": "n/a", "volume_validation": "n/a",
+    },
+    "trade_scenarios": [
+        {
+            "name": "Primary Setup", "trade_type": "Long", "probability": "High", "summary": "Fake.",
+            "entry_zone": "100 - 101", "target": 120.0, "invalidation": 95.0,
+            "pattern": "impulse", "wave_points": [95.0, 105.0, 100.0], "color": "#00E676",
+        },
+        {
+            "name": "Alternative", "trade_type": "Short", "probability": "Low", "summary": "Fake.",
+            "entry_zone": "104 - 105", "target": 90.0, "invalidation": 110.0,
+            "pattern": "zigzag", "wave_points": [110.0, 100.0, 105.0], "color": "#FFAB00",
+        },
+    ],
+}
+
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+class FakeModel:
+    """
+    Deterministic stand-in for a GenerativeModel. JSON requests get
+    FAKE_ANALYSIS (or `responder(prompt, generation_config)`), others an echo.
+    `latency` seconds are slept per call, spread over chunks when streaming.
+    """
+
+    def __init__(self, model_name, system_instruction=None, latency=0.0, responder=None, chunk_size=64):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.latency = latency
+        self.responder = responder
+        self.chunk_size = chunk_size
+        self.calls = []
+
+    def _answer(self, prompt, generation_config):
+        if self.responder is not None:
+            return self.responder(prompt, generation_config)
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            return json.dumps(FAKE_ANALYSIS)
+        digest = hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()[:8]
+        return f"Fake answer {digest}."
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        self.calls.append(prompt)
+        text = self._answer(prompt, generation_config)
+        if not stream:
+            time.sleep(self.latency)
+            return _FakeChunk(text)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        return self._stream(chunks)
+
+    def _stream(self, chunks):
+        for chunk in chunks:
+            time.sleep(self.latency / max(len(chunks), 1))
+            yield _FakeChunk(chunk)
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+
+class FakeChat:
+    """
+    Minimal ChatSession: send_message() passes the whole history plus the new
+    message to generate_content and records both turns.
+    """
+
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False, **kwargs):
+        contents = self.history + [{"role": "user", "parts": [content]}]
+        response = self.model.generate_content(contents, stream=stream, **kwargs)
+        if not stream:
+            self.history = contents + [{"role": "model", "parts": [response.text]}]
+            return response
+        return self._record(contents, response)
+
+    def _record(self, contents, response):
+        text = []
+        for chunk in response:
+            text.append(chunk.text)
+            yield chunk
+        self.history = contents + [{"role": "model", "parts": ["".join(text)]}]
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, latency=0.0, responder=None):
+        self.latency = latency
+        self.responder = responder
+
+    def build(self, model_name, system_instruction=None):
+        model = FakeModel(model_name, system_instruction, self.latency, self.responder)
+        return model, float("inf"), False
+
+
+def usage_tokens(response):
+    """
+    (prompt_tokens, response_tokens) reported by Gemini in usage_metadata,
+    or (None, None) when the response carries none (fake backend, or a
+    stream that was not fully consumed).
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+def record_usage(attrs, stage, response, prompt_tokens, text):
+    """
+    Puts prompt/response token counts on a trace span and the "tokens"
+    counters. Gemini's usage_metadata wins; otherwise `prompt_tokens` (the
+    caller's local estimate) and an estimate of the reply `text` are used.
+    """
+    used_prompt, used_response = usage_tokens(response)
+    attrs["token_source"] = "usage" if used_prompt is not None else "estimate"
+    prompt_tokens = used_prompt if used_prompt is not None else prompt_tokens
+    response_tokens = used_response if used_response is not None else estimate_tokens(text)
+    attrs.update(prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+    count("tokens", prompt_tokens, stage=stage, kind="prompt")
+    count("tokens", response_tokens, stage=stage, kind="response")
+
+
+# --- MANAGER ---
+class ModelManager:
+    """
+    Process-wide cache of built models keyed by model name and a hash of the
+    system instruction. Thread-safe; expired context caches are rebuilt.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._models = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, model_name, system_instruction=None):
+        key = (model_name, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest() if system_instruction else None)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None or entry[1] <= time.time():
+                entry = self.backend.build(model_name, system_instruction)
+                self._models[key] = entry
+                self.builds += 1
+            return entry[0]
+
+    def info(self):
+        now = time.time()
+        return [
+            {
+                "model": name,
+                "system": bool(system),
+                "context_cached": cached,
+                "expires_in": None if expires == float("inf") else round(expires - now),
+            }
+            for (name, system), (_, expires, cached) in self._models.items()
+        ]
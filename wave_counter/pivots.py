@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# SWING PIVOTS (ZIGZAG)
+# ==========================================
+
+PIVOT_COLUMNS = ['idx', 'time', 'kind', 'price', 'volume', 'leg_volume', 'confirmed']
+
+
+def atr(high, low, close, period=14):
+    """
+    Wilder's Average True Range as a NumPy array (same length as the input).
+    """
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    # Wilder smoothing == EWM with alpha = 1/period
+    return pd.Series(tr).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+
+def reversal_thresholds(df, pct=None, atr_mult=2.0, atr_period=14):
+    """
+    Minimum price move that counts as a reversal, per bar.
+    pct (e.g. 0.05 = 5% of close) wins over the ATR multiple when given.
+    """
+    if pct is not None:
+        return df['close'].to_numpy(dtype=float) * pct
+    return atr(df['high'], df['low'], df['close'], atr_period) * atr_mult
+
+
+def zigzag(df, pct=None, atr_mult=2.0, atr_period=14):
+    """
+    Extracts alternating swing highs ('H') and lows ('L') from an OHLCV frame.
+
+    A swing is confirmed once price reverses from the running extreme by at
+    least the bar's threshold (see reversal_thresholds). Thresholds, volumes
+    and the output table are computed on whole arrays; the reversal scan is a
+    single pass over plain floats. The final, still-running extreme is
+    appended with confirmed=False.
+    """
+    if len(df) < 2:
+        return pd.DataFrame(columns=PIVOT_COLUMNS)
+
+    highs = df['high'].to_numpy(dtype=float)
+    lows = df['low'].to_numpy(dtype=float)
+    thr = reversal_thresholds(df, pct, atr_mult, atr_period).tolist()
+    h, l = highs.tolist(), lows.tolist()
+
+    idx, kinds = [], []
+    direction = 0  # 1 = up leg (tracking a high), -1 = down leg (tracking a low)
+    hi_i = lo_i = 0
+    for i in range(1, len(h)):
+        if direction >= 0 and h[i] >= h[hi_i]:
+            hi_i = i
+        if direction <= 0 and l[i] <= l[lo_i]:
+            lo_i = i
+        if direction >= 0 and h[hi_i] - l[i] >= thr[i] and hi_i < i:
+            if direction == 0 and lo_i < hi_i:
+                idx.append(lo_i); kinds.append('L')
+            idx.append(hi_i); kinds.append('H')
+            direction, lo_i = -1, i
+        elif direction <= 0 and h[i] - l[lo_i] >= thr[i] and lo_i < i:
+            if direction == 0 and hi_i < lo_i:
+                idx.append(hi_i); kinds.append('H')
+            idx.append(lo_i); kinds.append('L')
+            direction, hi_i = 1, i
+
+    confirmed = [True] * len(idx)
+    if direction != 0:
+        idx.append(hi_i if direction == 1 else lo_i)
+        kinds.append('H' if direction == 1 else 'L')
+        confirmed.append(False)
+
+    idx = np.asarray(idx, dtype=int)
+    is_high = np.asarray(kinds) == 'H'
+    volume = df['volume'].to_numpy(dtype=float)
+    cum_vol = np.cumsum(volume)
+    leg_start = np.concatenate(([0], idx[:-1])) if idx.size else idx
+    return pd.DataFrame({
+        'idx': idx,
+        'time': df['time'].to_numpy()[idx],
+        'kind': np.asarray(kinds),
+        'price': np.where(is_high, highs[idx], lows[idx]),
+        'volume': volume[idx],
+        'leg_volume': cum_vol[idx] - cum_vol[leg_start],
+        'confirmed': np.asarray(confirmed, dtype=bool),
+    })
+
+
+class ZigZagTracker:
+    """
+    Incremental zigzag: push() one closed bar at a time in O(1) and get the
+    pivot it confirms (or None). Same rules, Wilder ATR and output columns as
+    zigzag(); `idx` counts bars pushed since the tracker was created.
+    """
+
+    def __init__(self, pct=None, atr_mult=2.0, atr_period=14):
+        self.pct, self.atr_mult, self.atr_period = pct, atr_mult, atr_period
+        self.n = 0
+        self.direction = 0
+        self.atr = self.prev_close = None
+        self.cum_vol = 0.0
+        self.hi = self.lo = None  # running extremes: (idx, time, price, volume, cum_vol)
+        self.confirmed = []
+
+    @classmethod
+    def from_frame(cls, df, **zigzag_kw):
+        tracker = cls(**zigzag_kw)
+        for row in zip(df['time'], df['high'], df['low'], df['close'], df['volume']):
+            tracker.push(*row)
+        return tracker
+
+    def _confirm(self, ext, kind):
+        leg_start = self.confirmed[-1] if self.confirmed else None
+        pivot = {
+            'idx': ext[0], 'time': ext[1], 'kind': kind, 'price': ext[2], 'volume': ext[3],
+            'leg_volume': ext[4] - (leg_start['_cum'] if leg_start else self._cum0),
+            'confirmed': True, '_cum': ext[4],
+        }
+        self.confirmed.append(pivot)
+        return pivot
+
+    def push(self, time, high, low, close, volume):
+        i = self.n
+        self.n += 1
+        high, low, close, volume = float(high), float(low), float(close), float(volume)
+        prev = close if self.prev_close is None else self.prev_close
+        tr = max(high - low, abs(high - prev), abs(low - prev))
+        self.atr = tr if self.atr is None else self.atr + (tr - self.atr) / self.atr_period
+        self.prev_close = close
+        self.cum_vol += volume
+        at_high = (i, time, high, volume, self.cum_vol)
+        at_low = (i, time, low, volume, self.cum_vol)
+        if i == 0:
+            self._cum0 = self.cum_vol
+            self.hi, self.lo = at_high, at_low
+            return None
+
+        thr = close * self.pct if self.pct is not None else self.atr * self.atr_mult
+        if self.direction >= 0 and high >= self.hi[2]:
+            self.hi = at_high
+        if self.direction <= 0 and low <= self.lo[2]:
+            self.lo = at_low
+        pivot = None
+        if self.direction >= 0 and self.hi[2] - low >= thr and self.hi[0] < i:
+            if self.direction == 0 and self.lo[0] < self.hi[0]:
+                self._confirm(self.lo, 'L')
+            pivot = self._confirm(self.hi, 'H')
+            self.direction, self.lo = -1, at_low
+        elif self.direction <= 0 and high - self.lo[2] >= thr and self.lo[0] < i:
+            if self.direction == 0 and self.hi[0] < self.lo[0]:
+                self._confirm(self.hi, 'H')
+            pivot = self._confirm(self.lo, 'L')
+            self.direction, self.hi = 1, at_high
+        return pivot
+
+    def pivots(self):
+        """
+        Confirmed pivots plus the running extreme (confirmed=False), like zigzag().
+        """
+        rows = list(self.confirmed)
+        if self.direction != 0:
+            ext, kind = (self.hi, 'H') if self.direction == 1 else (self.lo, 'L')
+            leg_start = rows[-1]['_cum'] if rows else self._cum0
+            rows.append({
+                'idx': ext[0], 'time': ext[1], 'kind': kind, 'price': ext[2], 'volume': ext[3],
+                'leg_volume': ext[4] - leg_start, 'confirmed': False,
+            })
+        return pd.DataFrame(rows, columns=PIVOT_COLUMNS)
+
+
+def _sig(x, digits=6):
+    return float(f"{x:.{digits}g}")
+
+
+def pivot_records(pivots):
+    """
+    Compact JSON-ready rows: [time, kind, price, volume, leg_volume].
+    """
+    times = pd.to_datetime(pivots['time']).dt.strftime('%Y-%m-%dT%H:%M').tolist()
+    return [
+        [t, k, _sig(p), _sig(v, 4), _sig(lv, 4)]
+        for t, k, p, v, lv in zip(times, pivots['kind'], pivots['price'], pivots['volume'], pivots['leg_volume'])
+    ]
+
+
+def pivot_prompt(df, tail=10, pivots=None, **zigzag_kw):
+    """
+    Prompt payload for one timeframe: swing pivots over the whole frame plus the
+    last `tail` raw candles, instead of a full candle dump.
+      pivots: [time, kind, price, volume, leg_volume]
+      recent_candles: [time, open, high, low, close, volume]
+    Pass already computed `pivots` to skip the zigzag pass. A missing frame
+    (empty df, e.g. a failed 1D fetch) gives an empty payload.
+    """
+    if df.empty:
+        return {"pivots": [], "recent_candles": []}
+    if pivots is None:
+        pivots = zigzag(df, **zigzag_kw)
+    recent = df.tail(tail)
+    times = recent['time'].dt.strftime('%Y-%m-%dT%H:%M').tolist()
+    ohlcv = recent[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float).tolist()
+    return {
+        "pivots": pivot_records(pivots),
+        "recent_candles": [[t] + [_sig(x) for x in row] for t, row in zip(times, ohlcv)],
+    }
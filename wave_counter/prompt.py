@@ -0,0 +1,127 @@
+import io
+import math
+import re
+
+import numpy as np
+
+# ==========================================
+# COMPACT PROMPT ENCODING + TOKEN BUDGET
+# ==========================================
+
+# Share of the candle token budget per frame role.
+BUDGET_WEIGHTS = {"1W": 0.15, "1D": 0.25, "micro": 0.60}
+MIN_ROWS = 20
+
+_TOKEN_RE = re.compile(r"\d+|[A-Za-z]+|\S")
+
+
+def estimate_tokens(text):
+    """
+    Local token-count estimate for Gemini-style tokenizers: digit runs cost
+    one token per 3 digits, letter runs one per 4 letters, every other
+    non-space character one token. Good enough for budgeting, not billing.
+    """
+    total = 0
+    for tok in _TOKEN_RE.findall(text):
+        if tok[0].isdigit():
+            total += math.ceil(len(tok) / 3)
+        elif tok[0].isalpha():
+            total += math.ceil(len(tok) / 4)
+        else:
+            total += 1
+    return total
+
+
+def price_decimals(df, tick_size=None, max_decimals=8):
+    """
+    Decimals needed for the symbol's prices: from the exchange tick size when
+    known, otherwise the fewest decimals that represent every OHLC value,
+    capped at 7 significant digits of the typical price.
+    """
+    if tick_size:
+        return max(0, -int(math.floor(math.log10(tick_size) + 1e-9)))
+    prices = df[['open', 'high', 'low', 'close']].to_numpy(dtype=float).ravel()
+    typical = float(np.median(np.abs(prices)))
+    if typical > 0:
+        max_decimals = min(max_decimals, max(0, 6 - int(math.floor(math.log10(typical)))))
+    for d in range(max_decimals + 1):
+        if np.allclose(np.round(prices, d), prices, rtol=0, atol=10 ** -(d + 2)):
+            return d
+    return max_decimals
+
+
+def _volume_decimals(volume):
+    med = float(np.median(volume)) if len(volume) else 0.0
+    if med >= 100:
+        return 0
+    if med <= 0:
+        return 2
+    return max(0, 2 - int(math.floor(math.log10(med))))
+
+
+def encode_candles(df, tick_size=None):
+    """
+    Columnar CSV: one header line with the start time and fixed bar step, then
+    bare o,h,l,c,v rows. Prices use the tick-size precision. If bars are
+    missing, a leading bar-number column `n` keeps the timeline exact.
+    """
+    if df.empty:
+        return "no data"
+    times = df['time']
+    step = times.diff().median() if len(df) > 1 else None
+    values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+    decimals = price_decimals(df, tick_size)
+    fmt = [f"%.{decimals}f"] * 4 + [f"%.{_volume_decimals(values[:, 4])}f"]
+    cols = "o,h,l,c,v"
+
+    if step is not None and step.value > 0:
+        n = ((times - times.iloc[0]) / step).round().to_numpy(dtype=int)
+        if not np.array_equal(n, np.arange(len(df))):
+            values = np.column_stack([n, values])
+            fmt = ["%d"] + fmt
+            cols = "n," + cols
+
+    buf = io.StringIO()
+    np.savetxt(buf, values, fmt=fmt, delimiter=",")
+    step_txt = f"{int(step.total_seconds())}s" if step is not None else "-"
+    header = f"start={times.iloc[0]:%Y-%m-%dT%H:%M} step={step_txt} rows={len(df)} cols={cols}"
+    return header + "\n" + buf.getvalue().rstrip("\n")
+
+
+def tokens_per_row(df, tick_size=None, sample=50):
+    tail = df.tail(sample)
+    if tail.empty:
+        return 1.0
+    return max(1.0, estimate_tokens(encode_candles(tail, tick_size)) / len(tail))
+
+
+def plan_candles(frames, budget, weights=None, min_rows=MIN_ROWS, ticks=None):
+    """
+    How many of the newest candles of each frame fit in `budget` tokens.
+
+    frames: {role: df} with roles as in BUDGET_WEIGHTS ("1W", "1D", "micro").
+    Each role gets its weighted share; budget a frame cannot use (short
+    history) is handed to the others in proportion to their weights.
+    ticks: optional {role: price tick} as passed to encode_candles.
+    Returns {role: rows}.
+    """
+    weights = weights or BUDGET_WEIGHTS
+    ticks = ticks or {}
+    cost = {r: tokens_per_row(df, ticks.get(r)) for r, df in frames.items()}
+    avail = {r: len(df) for r, df in frames.items()}
+    rows = {r: 0 for r in frames}
+    remaining, open_roles = float(budget), [r for r in frames if avail[r]]
+    while open_roles and remaining >= min(cost[r] for r in open_roles):
+        total_w = sum(weights.get(r, 0.1) for r in open_roles)
+        spent = 0.0
+        for r in list(open_roles):
+            share = remaining * weights.get(r, 0.1) / total_w
+            add = min(avail[r] - rows[r], int(share // cost[r]))
+            rows[r] += add
+            spent += add * cost[r]
+            if rows[r] >= avail[r]:
+                open_roles.remove(r)
+        remaining -= spent
+        if spent == 0:
+            break
+    return {r: max(rows[r], min(min_rows, avail[r])) for r in frames}
@@ -0,0 +1,230 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from fpdf import FPDF
+
+from .analysis_cache import make_key
+from .chart import DOWN_COLOR, SCENARIO_COLORS, UP_COLOR, downsample_ohlc
+from .trace import count, span
+
+# ==========================================
+# PDF REPORTS (LAZY, MEMOIZED, BACKGROUND)
+# ==========================================
+# Reports are built by ReportBuilder's worker threads only when asked for and
+# memoized by a hash of the analysis, so Streamlit reruns never pay for them.
+
+# A TTF with wide Unicode coverage; WAVE_PDF_FONT wins (e.g. Noto Sans Sinhala).
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+CHART_BARS = 120
+
+
+def find_font():
+    for path in [os.environ.get("WAVE_PDF_FONT")] + FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def _hex_rgb(color):
+    color = str(color or "#888888").lstrip("#")
+    try:
+        return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return (136, 136, 136)
+
+
+class ReportPDF(FPDF):
+    def __init__(self, font_path=None):
+        super().__init__()
+        self.font_name = "Helvetica"
+        self.unicode = False
+        if font_path:
+            bold = font_path.replace(".ttf", "-Bold.ttf")
+            self.add_font("Report", "", font_path)
+            self.add_font("Report", "B", bold if os.path.exists(bold) else font_path)
+            self.add_font("Report", "I", font_path)
+            self.font_name, self.unicode = "Report", True
+
+    def safe(self, value):
+        """
+        With a Unicode font text is kept as is; the core font only knows latin-1.
+        """
+        value = str(value) if value is not None else ""
+        return value if self.unicode else value.encode('latin-1', 'replace').decode('latin-1')
+
+    def header(self):
+        self.set_font(self.font_name, 'B', 15)
+        self.cell(0, 10, 'Elliott Wave AI - Analysis Report', align='C', new_x="LMARGIN", new_y="NEXT")
+        self.ln(4)
+
+    def section(self, title):
+        self.set_font(self.font_name, 'B', 12)
+        self.cell(0, 10, self.safe(title), new_x="LMARGIN", new_y="NEXT")
+        self.set_font(self.font_name, size=10)
+
+    def paragraph(self, text):
+        self.multi_cell(0, 6, self.safe(text), new_x="LMARGIN", new_y="NEXT")
+        self.ln(3)
+
+
+def draw_chart(pdf, df, scenarios, x, y, w, h, bars=CHART_BARS):
+    """
+    Static candlestick snapshot of the newest bars with every scenario's
+    target / invalidation, drawn as PDF vector graphics.
+    """
+    view = downsample_ohlc(df.tail(bars * 3), bars)
+    lo, hi = float(view['low'].min()), float(view['high'].max())
+    levels = []
+    for i, s in enumerate(scenarios or []):
+        for key, tag in (('target', 'TP'), ('invalidation', 'SL')):
+            try:
+                levels.append((float(s.get(key)), s.get('color') or SCENARIO_COLORS[i % len(SCENARIO_COLORS)],
+                               f"{s.get('name', i + 1)} {tag}"))
+            except (TypeError, ValueError):
+                continue
+    # Levels far outside the visible range would squash the candles.
+    span = hi - lo or abs(hi) or 1.0
+    levels = [lv for lv in levels if lo - span <= lv[0] <= hi + span]
+    lo = min([lo] + [lv[0] for lv in levels])
+    hi = max([hi] + [lv[0] for lv in levels])
+    scale = h / ((hi - lo) or 1.0)
+    py = lambda price: y + (hi - price) * scale
+
+    pdf.set_draw_color(200, 200, 200)
+    pdf.rect(x, y, w, h)
+    step = w / len(view)
+    for i, (o, hh, ll, c) in enumerate(zip(view['open'], view['high'], view['low'], view['close'])):
+        rgb = _hex_rgb(UP_COLOR if c >= o else DOWN_COLOR)
+        cx = x + (i + 0.5) * step
+        pdf.set_draw_color(*rgb)
+        pdf.set_fill_color(*rgb)
+        pdf.line(cx, py(hh), cx, py(ll))
+        top, bottom = py(max(o, c)), py(min(o, c))
+        pdf.rect(cx - step * 0.35, top, step * 0.7, max(bottom - top, 0.2), style='F')
+
+    pdf.set_font(pdf.font_name, size=7)
+    pdf.set_dash_pattern(dash=1.5, gap=1)
+    for price, color, label in levels:
+        pdf.set_draw_color(*_hex_rgb(color))
+        pdf.set_text_color(*_hex_rgb(color))
+        pdf.line(x, py(price), x + w, py(price))
+        pdf.set_xy(x + w - 40, py(price) - 3.5)
+        pdf.cell(40, 3, pdf.safe(f"{label} {price:g}"), align='R')
+    pdf.set_dash_pattern()
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_xy(pdf.l_margin, y + h + 3)
+
+
+def build_report(analysis, symbol, tf, df=None, font_path=None):
+    """
+    The analysis report as PDF bytes. `df` (the micro frame) adds a chart.
+    """
+    with span("report.pdf", symbol=symbol, timeframe=tf, chart=df is not None and not df.empty) as s:
+        pdf = _render_report(analysis, symbol, tf, df, font_path)
+        s["bytes"] = len(pdf)
+    return pdf
+
+
+def _render_report(analysis, symbol, tf, df, font_path):
+    macro = analysis.get('macro_analysis', {})
+    micro = analysis.get('micro_analysis', {})
+    scenarios = analysis.get('trade_scenarios', [])
+
+    pdf = ReportPDF(font_path if font_path is not None else find_font())
+    pdf.add_page()
+
+    # 1. Header Info
+    pdf.set_font(pdf.font_name, 'B', 12)
+    pdf.cell(0, 8, pdf.safe(f"Symbol: {symbol}  |  Timeframe: {tf}"), new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 8, f"Date: {datetime.now():%Y-%m-%d %H:%M}", new_x="LMARGIN", new_y="NEXT")
+    pdf.line(10, pdf.get_y() + 1, 200, pdf.get_y() + 1)
+    pdf.ln(4)
+
+    if df is not None and not df.empty:
+        draw_chart(pdf, df, scenarios, pdf.l_margin, pdf.get_y(), pdf.epw, 70)
+
+    # 2. Macro Analysis
+    pdf.section("1. Macro Trend (1W/1D)")
+    pdf.paragraph(
+        f"Trend: {macro.get('trend')}\n"
+        f"Structure: {macro.get('current_structure')}\n"
+        f"Details: {macro.get('detailed_breakdown')}\n"
+        f"Key Levels: {macro.get('key_levels')}"
+    )
+
+    # 3. Micro Analysis
+    pdf.section(f"2. Micro Structure ({tf})")
+    pdf.paragraph(
+        f"Wave Degree: {micro.get('current_wave_degree')}\n"
+        f"Status: {micro.get('wave_count_status')}\n"
+        f"Structure: {micro.get('sub_wave_structure')}\n"
+        f"Volume: {micro.get('volume_validation')}"
+    )
+
+    # 4. Scenarios
+    pdf.section("3. Trade Setups")
+    for s in scenarios:
+        pdf.set_font(pdf.font_name, 'B', 10)
+        pdf.set_text_color(0, 0, 139)  # Dark Blue
+        pdf.cell(0, 8, pdf.safe(f"> {s.get('name')} ({s.get('trade_type')})"), new_x="LMARGIN", new_y="NEXT")
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font(pdf.font_name, size=10)
+        pdf.paragraph(
+            f"Reasoning: {s.get('summary')}\n"
+            f"Entry: {s.get('entry_zone')}\n"
+            f"Target: {s.get('target')}\n"
+            f"Invalidation: {s.get('invalidation')}"
+        )
+
+    pdf.ln(6)
+    pdf.set_font(pdf.font_name, 'I', 8)
+    pdf.cell(0, 10, "Generated by Deep Wave AI. Not financial advice.", align='C', new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+class ReportBuilder:
+    """
+    Builds reports on a small worker pool and memoizes the futures by a hash
+    of (analysis, symbol, timeframe, last candle). Failed builds are retried
+    on the next request; the oldest entries are dropped past max_entries.
+    """
+
+    def __init__(self, max_workers=2, max_entries=64, font_path=None):
+        self.font_path = font_path
+        self.max_entries = max_entries
+        self.builds = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, analysis, symbol, tf, df=None):
+        last = df['time'].iloc[-1] if df is not None and not df.empty else None
+        key = make_key(analysis=analysis, symbol=symbol, timeframe=tf, last_candle=last)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or (job.done() and job.exception() is not None):
+                job = self._pool.submit(build_report, analysis, symbol, tf, df, self.font_path)
+                self.builds += 1
+                count("cache", cache="report", result="miss")
+            else:
+                count("cache", cache="report", result="hit")
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, analysis, symbol, tf, df=None, timeout=None):
+        """
+        PDF bytes, building them if needed (blocks until the worker is done).
+        """
+        return self.submit(analysis, symbol, tf, df).result(timeout)
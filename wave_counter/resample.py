@@ -0,0 +1,186 @@
+import time
+
+import numpy as np
+
+from .trace import count, span
+
+# ==========================================
+# HIGHER TIMEFRAMES FROM A STORED BASE SERIES
+# ==========================================
+# A coarser frame (3m .. 12h, 1d, 1w) is an aggregation of a finer one:
+# first open, max high, min low, last close, summed volume per bucket. When
+# the CandleStore holds enough fresh candles of a finer timeframe, the frame
+# is built locally instead of fetched.
+#
+# Buckets start at multiples of the timeframe since the epoch plus an
+# offset. Weeks open on Monday 00:00 UTC by default (the epoch was a
+# Thursday); when native candles of the target timeframe are stored for the
+# exchange, their open times decide the offset instead (exchanges that open
+# days on UTC+8, or weeks on another weekday). Those native candles also
+# check the result: a derivation that disagrees with them is not used.
+#
+# Derived rows are never written to the store: the stored series of a
+# timeframe holds only candles an exchange served, so they stay a check on
+# the derivation and a reliable base for delta syncs.
+
+DAY_MS = 86_400_000
+WEEK_START = 4 * DAY_MS  # 1970-01-05, the first Monday
+
+DERIVED = ["3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "1w"]
+BASES = ["1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "1d"]
+MAX_STALE_MS = 5 * 60_000  # bars of a stored base older than this may lag (see derive_from_store)
+
+VERIFY_RTOL = 1e-6       # open/high/low/close against native candles
+VOLUME_RTOL = 1e-2       # exchanges round volumes per candle
+MAX_MISMATCH = 0.01      # share of compared candles allowed to differ
+
+
+def timeframe_ms(timeframe):
+    """
+    Bar length in ms of a ccxt timeframe string ("15m", "4h", "1w").
+    """
+    import ccxt
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def can_derive(timeframe, base):
+    """
+    True when whole `base` bars tile every `timeframe` bar.
+    """
+    if timeframe not in DERIVED or base not in BASES:
+        return False
+    step, base_step = timeframe_ms(timeframe), timeframe_ms(base)
+    return base_step < step and step % base_step == 0
+
+
+def bucket_offset(timeframe, native_ts=None):
+    """
+    Bucket start relative to the epoch grid: taken from a native candle open
+    time when one is known, else Monday weeks and UTC days/hours.
+    """
+    step = timeframe_ms(timeframe)
+    if native_ts is not None:
+        return int(native_ts) % step
+    return WEEK_START if timeframe[-1] == "w" else 0
+
+
+def resample_bars(bars, timeframe, base, offset=None, now=None):
+    """
+    Aggregates ccxt-style rows of `base` into `timeframe` rows.
+
+    Only the newest run of complete buckets is returned, plus the bucket
+    that is still open at `now` (ms): a bucket missing base bars (the first
+    one, cut off by the data, or one with a gap) ends the run, since its
+    open/high/low would be wrong.
+    """
+    if not len(bars):
+        return []
+    data = np.asarray(bars, dtype=float)
+    ts = data[:, 0].astype(np.int64)
+    step, base_step = timeframe_ms(timeframe), timeframe_ms(base)
+    offset = bucket_offset(timeframe) if offset is None else offset
+    now = int(time.time() * 1000) if now is None else now
+
+    bucket = (ts - offset) // step * step + offset
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1
+    sizes = np.diff(np.concatenate((starts, [len(ts)])))
+    complete = sizes == step // base_step
+    # The open bucket counts as complete when its bars run without a gap up to
+    # now; a partial last bucket of a series that stopped earlier is dropped.
+    open_start = bucket[starts[-1]]
+    if open_start + step > now and ts[-1] + base_step > now:
+        complete[-1] = sizes[-1] == (ts[-1] - open_start) // base_step + 1
+    elif not complete[-1]:
+        starts, ends, complete = starts[:-1], ends[:-1], complete[:-1]
+    broken = np.flatnonzero(~complete)
+    first = broken[-1] + 1 if broken.size else 0
+
+    starts, ends = starts[first:], ends[first:]
+    if not starts.size:
+        return []
+    out = np.column_stack([
+        bucket[starts],
+        data[starts, 1],
+        np.maximum.reduceat(data[:, 2], starts),
+        np.minimum.reduceat(data[:, 3], starts),
+        data[ends, 4],
+        np.add.reduceat(data[:, 5], starts),
+    ])
+    return [[int(r[0]), *r[1:].tolist()] for r in out]
+
+
+def verify(derived, native):
+    """
+    Compares derived rows with native candles of the same timeframe on their
+    common closed bars. Returns {"compared", "mismatched", "max_rel_error"}.
+    """
+    if not derived or not native:
+        return {"compared": 0, "mismatched": 0, "max_rel_error": 0.0}
+    d, n = np.asarray(derived, dtype=float), np.asarray(native, dtype=float)
+    common, di, ni = np.intersect1d(d[:, 0], n[:, 0], return_indices=True)
+    last_open = max(d[-1, 0], n[-1, 0])
+    closed = common < last_open
+    d, n = d[di[closed]], n[ni[closed]]
+    if not len(d):
+        return {"compared": 0, "mismatched": 0, "max_rel_error": 0.0}
+    rel = np.abs(d[:, 1:] - n[:, 1:]) / np.maximum(np.abs(n[:, 1:]), 1e-12)
+    bad = (rel[:, :4] > VERIFY_RTOL).any(axis=1) | (rel[:, 4] > VOLUME_RTOL)
+    return {"compared": len(d), "mismatched": int(bad.sum()), "max_rel_error": float(rel[:, :4].max())}
+
+
+def covers(store, symbol, timeframe, limit, base):
+    """
+    True when the store holds enough `base` candles to build `limit` bars of
+    `timeframe` (gaps and freshness are only checked by derive_from_store).
+    """
+    if not can_derive(timeframe, base):
+        return False
+    need = limit * (timeframe_ms(timeframe) // timeframe_ms(base))
+    return store.latest(symbol, base, cap=need)[2] >= need
+
+
+def derive_from_store(store, symbol, timeframe, limit, bases=None, max_stale_ms=MAX_STALE_MS, now=None):
+    """
+    (exchange, rows) of the newest `limit` candles of `timeframe` built from
+    a finer series in the CandleStore, or None when no stored base covers
+    the span (the caller fetches instead). Blocking SQLite I/O: async
+    callers run it in a thread.
+
+    bases: candidate base timeframes (default: every finer one, coarsest
+    first). The base must hold the currently open bar; max_stale_ms caps the
+    base bar length, since its last bar may be as old as one bar (None: the
+    caller has just synced the base).
+    """
+    if timeframe not in DERIVED:
+        return None
+    now = int(time.time() * 1000) if now is None else now
+    step = timeframe_ms(timeframe)
+    need = {}  # base -> stored candles needed for `limit` bars
+    for base in (bases or reversed(BASES)):
+        if can_derive(timeframe, base) and (max_stale_ms is None or timeframe_ms(base) <= max_stale_ms):
+            need[base] = limit * (step // timeframe_ms(base))
+    if not need:
+        return None
+    latest = store.latest_each(symbol, need)
+    fresh = [b for b in need if latest[b][0] and latest[b][2] >= need[b] and latest[b][1] + timeframe_ms(b) > now]
+    native = {}  # exchange -> stored candles of `timeframe`
+    for base in fresh:
+        exchange_id = latest[base][0]
+        with span("fetch.resample", symbol=symbol, timeframe=timeframe, base=base, exchange=exchange_id) as s:
+            if exchange_id not in native:
+                native[exchange_id] = store.load(exchange_id, symbol, timeframe, limit)
+            stored = native[exchange_id]
+            offset = bucket_offset(timeframe, stored[-1][0] if stored else None)
+            rows = store.load(exchange_id, symbol, base, need[base] + step // timeframe_ms(base))
+            derived = resample_bars(rows, timeframe, base, offset, now)[-limit:]
+            check = verify(derived, stored)
+            s.update(bars=len(derived), **check)
+            if len(derived) < limit or check["mismatched"] > check["compared"] * MAX_MISMATCH:
+                s["used"] = False
+                count("cache", cache="resample", result="miss")
+                continue
+            s["used"] = True
+        count("cache", cache="resample", result="hit")
+        return exchange_id, derived
+    return None
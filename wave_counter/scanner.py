@@ -0,0 +1,144 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .analysis import analyze_deep_wave
+from .data import ExchangeLimiter, MultiTimeframeBundle, load_frame
+from .elliott import current_counts
+from .exchanges import get_pool
+from .fibonacci import fib_confluence
+from .pivots import atr, zigzag
+
+# ==========================================
+# WATCHLIST BATCH SCANNER
+# ==========================================
+# fetch everything (bounded per exchange) -> cheap local screen on every
+# symbol/timeframe -> LLM analysis for the top N only (bounded worker pool).
+
+SCAN_COLUMNS = [
+    'symbol', 'timeframe', 'exchange', 'last_close', 'pattern', 'direction', 'waves',
+    'count_score', 'zone', 'zone_dist_atr', 'screen_score', 'trend', 'setup',
+    'fetch_s', 'screen_s', 'llm_s', 'error',
+]
+
+
+async def _fetch_watchlist(symbols, timeframes, store, per_exchange):
+    limiter = ExchangeLimiter(per_exchange)
+    jobs = {}
+    for sym in symbols:
+        # 1W / 1D context is fetched once per symbol and shared by its timeframes.
+        jobs[(sym, "1w", 200)] = load_frame(sym, "1w", 200, store=store, limiter=limiter)
+        jobs[(sym, "1d", 300)] = load_frame(sym, "1d", 300, store=store, limiter=limiter)
+        for tf in timeframes:
+            jobs[(sym, tf, 1000)] = load_frame(sym, tf, 1000, store=store, limiter=limiter)
+    results = await asyncio.gather(*jobs.values())
+    return dict(zip(jobs, results))
+
+
+def screen(df_1w, df_1d, df_micro, micro_tf):
+    """
+    Local structure check for one symbol/timeframe, no network or LLM.
+    screen_score = best current Elliott count score, scaled down the further
+    the last close is from the strongest nearby Fibonacci zone (in ATRs).
+    """
+    piv = zigzag(df_micro)
+    best = current_counts(piv, top=1)
+    conf = fib_confluence({"1W": df_1w, "1D": df_1d, micro_tf: df_micro}, micro_tf, pivots={micro_tf: piv})
+    last = float(df_micro['close'].iloc[-1])
+    unit = float(atr(df_micro['high'], df_micro['low'], df_micro['close'])[-1]) or last * 0.01
+
+    zones = conf["zones"].head(5)
+    if zones.empty:
+        zone, dist = None, np.inf
+    else:
+        nearest = np.argmin(np.abs(zones['price'].to_numpy() - last))
+        zone = float(zones['price'].iloc[nearest])
+        dist = abs(last - zone) / unit
+
+    row = best.iloc[0] if not best.empty else None
+    count_score = float(row['score']) if row is not None else 0.0
+    return {
+        'last_close': last,
+        'pattern': row['pattern'] if row is not None else None,
+        'direction': row['direction'] if row is not None else None,
+        'waves': int(row['waves']) if row is not None else None,
+        'count_score': count_score,
+        'zone': zone,
+        'zone_dist_atr': round(dist, 2) if np.isfinite(dist) else None,
+        'screen_score': round(count_score * (0.5 + 0.5 * float(np.exp(-dist))), 3),
+    }
+
+
+def scan_watchlist(symbols, timeframes, models=None, language="English", top_n=5, per_exchange=4,
+                   llm_workers=3, store=None, cache=None, prompt_mode="pivots", on_progress=None, on_analysis=None,
+                   journal=None):
+    """
+    Scans every symbol x timeframe and returns a DataFrame (SCAN_COLUMNS)
+    sorted by screen_score. Only the top_n rows are sent to analyze_deep_wave,
+    at most llm_workers at a time; with models=None the LLM step is skipped.
+    on_progress(done, total, label) is called after each LLM analysis and
+    on_analysis(symbol, timeframe, analysis, df_micro) after each success.
+    """
+    fetched = get_pool().run(_fetch_watchlist(symbols, timeframes, store, per_exchange))
+
+    rows, frames = [], {}
+    for sym in symbols:
+        weekly, daily = fetched[(sym, "1w", 200)], fetched[(sym, "1d", 300)]
+        for tf in timeframes:
+            micro = fetched[(sym, tf, 1000)]
+            row = {'symbol': sym, 'timeframe': tf, 'exchange': micro.exchange,
+                   'fetch_s': round(max(weekly.seconds, daily.seconds, micro.seconds), 3)}
+            # Same readiness rule as one analysis: weekly + micro, daily optional
+            # (a failed daily frame is an empty DataFrame the screen and prompt skip).
+            bundle = MultiTimeframeBundle(sym, weekly, daily, micro)
+            if not bundle.ok:
+                missing = {tf: err for tf, err in bundle.failures().items() if tf != daily.timeframe}
+                row['error'] = "data unavailable: " + "; ".join(f"{tf} {err}" for tf, err in missing.items())
+                rows.append(row)
+                continue
+            started = time.perf_counter()
+            try:
+                row.update(screen(weekly.df, daily.df, micro.df, tf))
+            except Exception as e:
+                row['error'] = f"screen: {e}"
+            row['screen_s'] = round(time.perf_counter() - started, 4)
+            frames[(sym, tf)] = (weekly.df, daily.df, micro.df)
+            rows.append(row)
+
+    table = pd.DataFrame(rows, columns=SCAN_COLUMNS)
+    table[['trend', 'setup', 'error']] = table[['trend', 'setup', 'error']].astype(object)
+    table = table.sort_values('screen_score', ascending=False, na_position='last', kind='stable').reset_index(drop=True)
+    if models is None or top_n <= 0:
+        return table
+
+    candidates = [i for i in table.index[:top_n] if (table.at[i, 'symbol'], table.at[i, 'timeframe']) in frames]
+
+    def run(i):
+        sym, tf = table.at[i, 'symbol'], table.at[i, 'timeframe']
+        d1w, d1d, dm = frames[(sym, tf)]
+        started = time.perf_counter()
+        ai = analyze_deep_wave(models, sym, tf, d1w, d1d, dm, language, prompt_mode=prompt_mode,
+                               cache=cache, journal=journal)
+        return ai, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=llm_workers) as pool:
+        futures = {pool.submit(run, i): i for i in candidates}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                ai, seconds = future.result()
+                table.at[i, 'llm_s'] = round(seconds, 3)
+                table.at[i, 'trend'] = (ai.get('macro_analysis') or {}).get('trend')
+                primary = (ai.get('trade_scenarios') or [{}])[0]
+                table.at[i, 'setup'] = f"{primary.get('trade_type')} ({primary.get('probability')})"
+                if on_analysis:
+                    sym, tf = table.at[i, 'symbol'], table.at[i, 'timeframe']
+                    on_analysis(sym, tf, ai, frames[(sym, tf)][2])
+            except Exception as e:
+                table.at[i, 'error'] = f"llm: {e}"
+            if on_progress:
+                on_progress(done, len(candidates), f"{table.at[i, 'symbol']} {table.at[i, 'timeframe']}")
+    return table
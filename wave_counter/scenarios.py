@@ -0,0 +1,47 @@
+import re
+
+import numpy as np
+
+# ==========================================
+# TRADE SCENARIO LEVELS
+# ==========================================
+# The model writes levels as text ("100 - 101", "~0.52", "$1,250") or as
+# numbers. Live mode, the chart and the backtester read them through these
+# helpers, so a scenario means the same thing to all three.
+
+_NUMBER = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")  # unsigned: "100-101" is a range
+
+
+def parse_zone(value):
+    """
+    (low, high) of an entry zone such as "100 - 101", "~0.52" or 100.0;
+    (nan, nan) when it holds no number.
+    """
+    if isinstance(value, (int, float)):
+        return float(value), float(value)
+    numbers = [float(n.replace(",", "")) for n in _NUMBER.findall(str(value or ""))]
+    if not numbers:
+        return np.nan, np.nan
+    return min(numbers), max(numbers)
+
+
+def parse_level(value):
+    """
+    A single price level ("$1,250", 1250.0); nan for a range or no number.
+    """
+    low, high = parse_zone(value)
+    return low if low == high else np.nan
+
+
+def trade_levels(scenario):
+    """
+    (side, target, invalidation) of one trade scenario, or None when it has
+    no distinct numeric target and invalidation. side is 1 for longs and -1
+    for shorts (from trade_type, else target vs invalidation).
+    """
+    target, invalidation = parse_level(scenario.get("target")), parse_level(scenario.get("invalidation"))
+    if np.isnan(target) or np.isnan(invalidation) or target == invalidation:
+        return None
+    kind = str(scenario.get("trade_type", "")).lower()
+    side = 1 if "long" in kind else -1 if "short" in kind else (1 if target > invalidation else -1)
+    return side, target, invalidation
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from .trace import count, span
+
+# ==========================================
+# SINGLE-FLIGHT REQUEST COALESCING
+# ==========================================
+# st.cache_data only helps once a call has finished: ten sessions pressing
+# Analyze on the same symbol at once still make ten fetches and ten model
+# calls. SingleFlight collapses identical in-flight calls: the first caller
+# of a key (the leader) runs the work, every caller arriving meanwhile waits
+# for it and receives the same result or exception.
+#
+# run() coalesces threads (analyses); run_async() coalesces tasks on one
+# event loop (the exchange fetches on the ExchangePool loop).
+#
+# With WAVE_SINGLEFLIGHT_PATH set, leaders also take a lease in a shared
+# SQLite file, so processes on the same machine coalesce too: a leader that
+# finds the key leased elsewhere waits for the lease to go, then checks the
+# on-disk caches (AnalysisCache / CandleStore) the other process filled
+# before doing the work itself. Leases expire, so a crashed process only
+# delays others by LEASE_TTL.
+
+SINGLEFLIGHT_PATH = os.environ.get("WAVE_SINGLEFLIGHT_PATH")  # unset = coalesce within this process only
+LEASE_TTL = 300     # seconds a cross-process lease is honoured
+LEASE_POLL = 0.1    # seconds between lease checks while waiting
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key     TEXT PRIMARY KEY,
+    owner   TEXT NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def _cancelled(error):
+    # A leader whose job was cancelled has no result to share; its
+    # followers run the call themselves.
+    return type(error).__name__ in ("JobCancelled", "CancelledError")
+
+
+class LeaseTable:
+    """
+    Cross-process leases in SQLite: one row per key being worked on.
+    """
+
+    def __init__(self, path, ttl=LEASE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def acquire(self, key):
+        """
+        True when this process now holds the lease on `key`.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            cur = conn.execute("INSERT OR IGNORE INTO leases VALUES (?, ?, ?)", (key, self.owner, now + self.ttl))
+            return cur.rowcount == 1
+
+    def release(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key. Thread-safe; share one per process.
+    """
+
+    def __init__(self, lease_path=SINGLEFLIGHT_PATH, lease_ttl=LEASE_TTL, poll=LEASE_POLL):
+        self.leases = LeaseTable(lease_path, lease_ttl) if lease_path else None
+        self.poll = poll
+        self._calls = {}   # key -> concurrent.futures.Future (threads)
+        self._tasks = {}   # (loop id, key) -> asyncio.Task
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _kind(key):
+        return key.split(":", 1)[0]
+
+    # --- THREADS ---
+    def run(self, key, fn, recheck=None):
+        """
+        fn() once per key at a time; concurrent callers share its outcome.
+        recheck(): called after waiting on another process's lease; a
+        non-None value is returned instead of running fn.
+        """
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+            if leader:
+                break
+            count("singleflight", kind=self._kind(key), role="follower")
+            with span("singleflight.wait", kind=self._kind(key)):
+                try:
+                    return future.result()
+                except BaseException as e:
+                    if not _cancelled(e):
+                        raise
+            # The leader was cancelled: try to lead instead.
+
+        count("singleflight", kind=self._kind(key), role="leader")
+        try:
+            result = self._lead(key, fn, recheck)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def _lead(self, key, fn, recheck):
+        if self.leases is None:
+            return fn()
+        waited = False
+        while not self.leases.acquire(key):
+            waited = True
+            time.sleep(self.poll)
+        try:
+            if waited:
+                count("singleflight", kind=self._kind(key), role="leased")
+                result = recheck() if recheck else None
+                if result is not None:
+                    return result
+            return fn()
+        finally:
+            self.leases.release(key)
+
+    # --- ASYNCIO ---
+    async def run_async(self, key, factory, recheck=None):
+        """
+        Awaits factory() once per key at a time on the running loop. The work
+        runs as its own task, so a caller that is cancelled does not cancel
+        it for the others.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        task = self._tasks.get(slot)
+        if task is None:
+            count("singleflight", kind=self._kind(key), role="leader")
+            task = self._tasks[slot] = loop.create_task(self._lead_async(key, factory, recheck))
+            task.add_done_callback(lambda t: self._done(slot, t))
+            return await asyncio.shield(task)
+        count("singleflight", kind=self._kind(key), role="follower")
+        with span("singleflight.wait", kind=self._kind(key)):
+            return await asyncio.shield(task)
+
+    def _done(self, slot, task):
+        if self._tasks.get(slot) is task:
+            del self._tasks[slot]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an unawaited failure is not logged
+
+    async def _lead_async(self, key, factory, recheck):
+        if self.leases is None:
+            return await factory()
+        # Lease and recheck calls are blocking SQLite (30 s busy timeout):
+        # they run in threads so a contended lock does not stall the loop.
+        waited = False
+        while not await asyncio.to_thread(self.leases.acquire, key):
+            waited = True
+            await asyncio.sleep(self.poll)
+        try:
+            if waited:
+                count("singleflight", kind=self._kind(key), role="leased")
+                result = await asyncio.to_thread(recheck) if recheck else None
+                if result is not None:
+                    return result
+            return await factory()
+        finally:
+            await asyncio.to_thread(self.leases.release, key)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_flights():
+    """
+    The process-wide SingleFlight shared by every Streamlit session.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SingleFlight()
+        return _default
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import numpy as np
+
+# ==========================================
+# ON-DISK CANDLE STORE (SQLITE)
+# ==========================================
+
+STORE_PATH = os.environ.get("WAVE_STORE_PATH", os.path.join(".wave_cache", "candles.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    exchange  TEXT NOT NULL,
+    symbol    TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    ts        INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (exchange, symbol, timeframe, ts)
+) WITHOUT ROWID
+"""
+
+# latest() looks candles up by symbol/timeframe across exchanges; the primary
+# key leads with the exchange, so without this index it scans the table.
+INDEX = "CREATE INDEX IF NOT EXISTS candles_by_symbol ON candles (symbol, timeframe, exchange, ts)"
+
+# Newest candle per exchange as index seeks: the exchanges holding the series
+# are walked one MIN() at a time instead of grouping every stored row.
+LATEST = """
+WITH RECURSIVE ex(exchange) AS (
+    SELECT MIN(exchange) FROM candles WHERE symbol = :symbol AND timeframe = :timeframe
+    UNION ALL
+    SELECT (SELECT MIN(exchange) FROM candles
+            WHERE symbol = :symbol AND timeframe = :timeframe AND exchange > ex.exchange)
+    FROM ex WHERE ex.exchange IS NOT NULL
+)
+SELECT exchange, (SELECT MAX(ts) FROM candles
+                  WHERE symbol = :symbol AND timeframe = :timeframe AND exchange = ex.exchange) AS last_ts
+FROM ex WHERE exchange IS NOT NULL
+ORDER BY last_ts DESC LIMIT 1
+"""
+
+
+class CandleStore:
+    """
+    Persistent OHLCV candles keyed by exchange/symbol/timeframe/timestamp (ms).
+    Writes are upserts, so re-saving overlapping bars is idempotent and the
+    still-open last candle is simply overwritten by its newer version.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            conn.execute(INDEX)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the store safe to share
+        # between Streamlit session threads.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def latest(self, symbol, timeframe, cap=None):
+        """
+        Returns (exchange, last_ts, count) for the exchange holding the newest
+        candle of symbol/timeframe, or (None, None, 0) when nothing is stored.
+        cap: count at most this many candles, for callers that only check
+        whether enough are stored (a long backfilled history is not counted).
+        """
+        return self.latest_each(symbol, {timeframe: cap})[timeframe]
+
+    def latest_each(self, symbol, caps):
+        """
+        latest() for several timeframes of one symbol over one connection:
+        {timeframe: (exchange, last_ts, count)} for caps = {timeframe: cap}.
+        """
+        out = {}
+        with self._connect() as conn:
+            for timeframe, cap in caps.items():
+                row = conn.execute(LATEST, {"symbol": symbol, "timeframe": timeframe}).fetchone()
+                if row is None:
+                    out[timeframe] = (None, None, 0)
+                    continue
+                stored = conn.execute(
+                    "SELECT COUNT(*) FROM (SELECT 1 FROM candles "
+                    "WHERE symbol = ? AND timeframe = ? AND exchange = ? LIMIT ?)",
+                    (symbol, timeframe, row[0], -1 if cap is None else cap),
+                ).fetchone()[0]
+                out[timeframe] = (row[0], row[1], stored)
+        return out
+
+    def first_timestamp(self, exchange, symbol, timeframe):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MIN(ts) FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ?",
+                (exchange, symbol, timeframe),
+            ).fetchone()
+        return row[0]
+
+    def timestamps(self, exchange, symbol, timeframe):
+        """
+        All stored timestamps (ms, ascending) as an int64 array, streamed from the cursor.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT ts FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ? ORDER BY ts",
+                (exchange, symbol, timeframe),
+            )
+            return np.fromiter((r[0] for r in cursor), dtype=np.int64)
+
+    def upsert(self, exchange, symbol, timeframe, bars):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(exchange, symbol, timeframe, int(b[0]), *b[1:6]) for b in bars],
+            )
+
+    def load(self, exchange, symbol, timeframe, limit=None):
+        """
+        Returns the newest `limit` candles (all when None) as ccxt-style rows, oldest first.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ts, open, high, low, close, volume FROM candles "
+                "WHERE exchange = ? AND symbol = ? AND timeframe = ? "
+                "ORDER BY ts DESC LIMIT ?",
+                (exchange, symbol, timeframe, -1 if limit is None else limit),
+            ).fetchall()
+        return [list(r) for r in reversed(rows)]
+
+    def arrays_since(self, exchange, symbol, timeframe, since):
+        """
+        (ts, high, low) NumPy arrays of every candle from `since` (ms) onward.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ts, high, low FROM candles "
+                "WHERE exchange = ? AND symbol = ? AND timeframe = ? AND ts >= ? ORDER BY ts",
+                (exchange, symbol, timeframe, since),
+            ).fetchall()
+        data = np.array(rows, dtype=float).reshape(-1, 3)
+        return data[:, 0].astype(np.int64), data[:, 1], data[:, 2]
@@ -0,0 +1,74 @@
+import json
+
+# ==========================================
+# INCREMENTAL JSON FOR STREAMED LLM OUTPUT
+# ==========================================
+
+
+class SectionStream:
+    """
+    Incremental scanner for one streamed JSON object.
+
+    feed() takes raw text chunks and returns (key, index, value) events for
+    every value of a top-level key that is an object/array once it closes
+    (index=None), and for every element of a top-level array as soon as that
+    element closes (index=0, 1, ...). Scalars are not reported; parse the
+    full text at the end for the authoritative result.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack = []  # (bracket, start, key)
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._last_str = None
+        self._key = None
+        self._counts = {}
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == '\\':
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    self._last_str = text[self._str_start:i + 1]
+                continue
+            if c == '"':
+                self._in_str, self._str_start = True, i
+            elif c == ':' and len(self._stack) == 1:
+                self._key = json.loads(self._last_str)
+            elif c in '{[':
+                key = None
+                if len(self._stack) == 1:
+                    key = self._key
+                elif len(self._stack) == 2 and self._stack[1][0] == '[':
+                    key = self._stack[1][2]
+                self._stack.append((c, i, key))
+            elif c in '}]' and self._stack:
+                _, start, key = self._stack.pop()
+                if len(self._stack) == 1:
+                    events.append((key, None, json.loads(text[start:i + 1])))
+                elif len(self._stack) == 2 and self._stack[1][0] == '[':
+                    index = self._counts.get(key, 0)
+                    self._counts[key] = index + 1
+                    events.append((key, index, json.loads(text[start:i + 1])))
+        self._pos = len(text)
+        return events
+
+
+def iter_text(response):
+    """
+    Text of each chunk of a stream=True Gemini response, skipping empty chunks.
+    """
+    for chunk in response:
+        if chunk.parts:
+            yield chunk.text
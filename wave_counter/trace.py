@@ -0,0 +1,199 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# ==========================================
+# TRACING SPANS + DIAGNOSTICS EXPORT
+# ==========================================
+# Every pipeline stage runs inside span(name, **attrs): fetch.frame /
+# fetch.exchange (one per exchange attempt), analysis (with analysis.prompt,
+# analysis.llm, analysis.parse inside), chat.turn, chart.build, report.pdf.
+# Spans nest per thread / asyncio task through a context variable, so the
+# exchange attempts of one race share the parent of the frame that started it.
+# Counters (count()) hold cache hits/misses and token totals.
+#
+# WAVE_TRACE_JSONL=path appends every finished span as one JSON line;
+# write_prometheus(path) writes a node-exporter textfile snapshot
+# (WAVE_METRICS_PATH for the app, --metrics for the CLI).
+
+TRACE_JSONL = os.environ.get("WAVE_TRACE_JSONL")
+METRICS_PATH = os.environ.get("WAVE_METRICS_PATH")  # Prometheus textfile the app rewrites each run
+MAX_SPANS = 2000
+METRIC_PREFIX = "wave"
+
+_current = contextvars.ContextVar("wave_span", default=None)
+
+
+class Tracer:
+    """
+    Thread-safe, in-process span recorder. Keeps the last `max_spans` spans
+    for the diagnostics panel, plus per-stage aggregates and counters that
+    cover the whole process lifetime.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS, jsonl_path=TRACE_JSONL):
+        self.jsonl_path = jsonl_path
+        self.spans = deque(maxlen=max_spans)
+        self.counters = defaultdict(float)  # (name, sorted label items) -> value
+        self._stages = defaultdict(lambda: {"count": 0, "errors": 0, "seconds": 0.0, "max": 0.0})
+        self._ids = iter(range(1, 1 << 62))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        Times the block. Yields the attrs dict so the stage can add results
+        (exchange, bytes, tokens, ...). Exceptions are recorded and re-raised.
+        """
+        parent = _current.get()
+        with self._lock:
+            span_id = next(self._ids)
+        token = _current.set(span_id)
+        status = "ok"
+        started, wall = time.perf_counter(), time.time()
+        try:
+            yield attrs
+        except GeneratorExit:
+            # A streamed reply abandoned by its consumer.
+            status = "cancelled"
+            raise
+        except BaseException as e:
+            status = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+            attrs.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            try:
+                _current.reset(token)
+            except ValueError:  # generator finalized from another context
+                pass
+            self._finish({
+                "id": span_id, "parent": parent, "name": name, "start": round(wall, 3),
+                "seconds": round(time.perf_counter() - started, 6), "status": status, **attrs,
+            })
+
+    def _finish(self, record):
+        with self._lock:
+            self.spans.append(record)
+            stage = self._stages[record["name"]]
+            stage["count"] += 1
+            stage["errors"] += record["status"] == "error"
+            stage["seconds"] += record["seconds"]
+            stage["max"] = max(stage["max"], record["seconds"])
+        if self.jsonl_path:
+            line = json.dumps(record, default=str)
+            with self._lock, open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def count(self, name, value=1, **labels):
+        """
+        Adds to a counter, e.g. count("cache", cache="analysis", result="hit").
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    # --- READ SIDE ---
+    def summary(self):
+        """
+        One row per stage: calls, errors, total/mean/max seconds and the p50/p95
+        of the spans still held in memory.
+        """
+        with self._lock:
+            stages = {name: dict(s) for name, s in self._stages.items()}
+            recent = defaultdict(list)
+            for s in self.spans:
+                recent[s["name"]].append(s["seconds"])
+        rows = []
+        for name, s in sorted(stages.items()):
+            times = sorted(recent[name])
+            rows.append({
+                "stage": name, "calls": s["count"], "errors": s["errors"],
+                "total_s": round(s["seconds"], 3), "mean_s": round(s["seconds"] / s["count"], 4),
+                "p50_s": round(times[len(times) // 2], 4) if times else None,
+                "p95_s": round(times[int(len(times) * 0.95)], 4) if times else None,
+                "max_s": round(s["max"], 4),
+            })
+        return rows
+
+    def hit_rates(self):
+        """
+        {cache name: (hits, misses, hit rate)} from the "cache" counters.
+        """
+        with self._lock:
+            items = list(self.counters.items())
+        tally = defaultdict(lambda: [0, 0])
+        for (name, labels), value in items:
+            if name == "cache":
+                labels = dict(labels)
+                tally[labels.get("cache")][labels.get("result") != "hit"] += int(value)
+        return {c: (h, m, round(h / (h + m), 3) if h + m else None) for c, (h, m) in tally.items()}
+
+    def recent(self, n=50, name=None):
+        with self._lock:
+            spans = [s for s in self.spans if name is None or s["name"] == name]
+        return spans[-n:]
+
+    # --- EXPORT ---
+    def to_jsonl(self):
+        with self._lock:
+            return "".join(json.dumps(s, default=str) + "\n" for s in self.spans)
+
+    def prometheus_text(self, prefix=METRIC_PREFIX):
+        """
+        Prometheus text exposition: per-stage duration sum/count/max and
+        error totals, then every counter as <prefix>_<name>_total.
+        """
+        with self._lock:
+            stages = {name: dict(s) for name, s in self._stages.items()}
+            counters = list(self.counters.items())
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, s in sorted(stages.items()):
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {s["seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines += [f"# TYPE {prefix}_stage_max_seconds gauge"]
+        lines += [f'{prefix}_stage_max_seconds{{stage="{n}"}} {s["max"]:.6f}' for n, s in sorted(stages.items())]
+        lines += [f"# TYPE {prefix}_stage_errors_total counter"]
+        lines += [f'{prefix}_stage_errors_total{{stage="{n}"}} {s["errors"]}' for n, s in sorted(stages.items())]
+
+        typed = set()
+        for (name, labels), value in sorted(counters):
+            metric = f"{prefix}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_text}}} {value:g}" if label_text else f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Atomic write, safe for the node-exporter textfile collector.
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self._stages.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide tracer used by the pipeline modules.
+TRACER = Tracer()
+span = TRACER.span
+count = TRACER.count